@@ -0,0 +1,537 @@
+"""
+Benchmark dos fluxos do ERP contra o simulador do Innovaro e um Postgres local.
+
+Para cada fluxo (RequisitarItem, TransferirItem, DesmancharItem e
+SaldoAoVivo) abre um Chrome headless, entra no simulador (core/simulador.py),
+processa as linhas pendentes semeadas na fixture do apontamento_v2
+(benchmarks/fixture.sql) e mede:
+
+    linhas_hora         linhas concluídas com sucesso por hora
+    segundos_por_linha  duração da execução dividida pelas linhas
+    comandos_por_linha  comandos WebDriver enviados por linha
+    passos              p50/p95 de cada passo (@log_passo) e da linha (profiler)
+
+O resultado é comparado com benchmarks/baseline.json: se as linhas/hora de
+algum fluxo caírem mais que a tolerância (padrão 15%), o benchmark termina
+com código 1 e um aviso de REGRESSÃO. Com --gravar-baseline o resultado
+atual passa a ser a baseline.
+
+O banco é configurado por BENCHMARK_DB_NAME/HOST/PORT/USER/PASSWORD e só
+pode ser local: a fixture recria o schema apontamento_v2 do zero. Os status
+que iriam para a API do Django são entregues ao próprio simulador, e os
+checkpoints e a caixa de saída ficam em um diretório temporário.
+
+Uso:
+    python -m benchmarks.executar
+    python -m benchmarks.executar requisitar_item transferir_item --linhas 20
+    python -m benchmarks.executar --gravar-baseline
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BASELINE = BENCHMARKS_DIR / "baseline.json"
+FIXTURE = BENCHMARKS_DIR / "fixture.sql"
+
+HOSTS_LOCAIS = {"localhost", "127.0.0.1", "::1"}
+# Schema das tabelas do RPA (reservas, tentativas) durante o benchmark
+SCHEMA_RPA = "rpa_benchmark"
+
+TOLERANCIA_PADRAO = 0.15
+
+
+# =============================
+# AMBIENTE
+# =============================
+
+def configurar_banco() -> None:
+    """
+    Aponta o core.db para o Postgres do benchmark. Precisa rodar antes de
+    qualquer acesso ao banco: as variáveis do ambiente têm precedência sobre o .env.
+    """
+    nome = os.getenv("BENCHMARK_DB_NAME")
+    host = os.getenv("BENCHMARK_DB_HOST", "127.0.0.1")
+
+    if not nome:
+        raise SystemExit("[ERRO] Defina BENCHMARK_DB_NAME com um banco Postgres local de testes.")
+    if host not in HOSTS_LOCAIS:
+        raise SystemExit(f"[ERRO] BENCHMARK_DB_HOST={host} não é local: a fixture apaga o schema apontamento_v2.")
+
+    os.environ.update({
+        "DB_HOST": host,
+        "DB_PORT": os.getenv("BENCHMARK_DB_PORT", "5432"),
+        "DB_NAME": nome,
+        "DB_USER": os.getenv("BENCHMARK_DB_USER", "postgres"),
+        "DB_PASSWORD": os.getenv("BENCHMARK_DB_PASSWORD", ""),
+        "DB_SCHEMA_DEPLOY": SCHEMA_RPA,
+    })
+
+
+def isolar_estado_local() -> Path:
+    """Checkpoints e caixa de saída do benchmark em um diretório temporário."""
+    from core import checkpoints, outbox
+
+    raiz = Path(tempfile.mkdtemp(prefix="rpa_benchmark_"))
+    checkpoints.CHECKPOINTS_DIR = raiz / "checkpoints"
+    checkpoints.CHECKPOINTS_DB = checkpoints.CHECKPOINTS_DIR / "checkpoints.sqlite3"
+    outbox.OUTBOX_DIR = raiz / "outbox"
+    outbox.OUTBOX_DB = outbox.OUTBOX_DIR / "outbox.sqlite3"
+    return raiz
+
+
+def semear(linhas: int) -> None:
+    """
+    Recria a fixture do apontamento_v2 com `linhas` requisições e transferências
+    pendentes, e a fila do desmanche com `linhas` itens em dois pares de depósitos.
+    """
+    from core.db import get_db_connection
+    from bots.desmancharItem.desmanches import garantir_tabela, tabela_desmanches
+
+    conn = get_db_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(FIXTURE.read_text(encoding="utf-8"))
+                cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA_RPA} CASCADE")
+                cur.execute(f"CREATE SCHEMA {SCHEMA_RPA}")
+
+                garantir_tabela(cur)
+                cur.execute(
+                    f"""
+                    INSERT INTO {tabela_desmanches()}
+                        (deposito_origem, deposito_destino, recurso, quantidade, mp, quantidade_mp)
+                    SELECT CASE WHEN n %% 2 = 0 THEN 'Almox Mont Carretas' ELSE 'Almox Serra' END,
+                           CASE WHEN n %% 2 = 0 THEN 'Almox Serra' ELSE 'Almox Mont Carretas' END,
+                           '033316', 10, '110565', 219.39
+                    FROM generate_series(1, %(linhas)s) AS n
+                    """,
+                    {"linhas": linhas},
+                )
+
+                cur.execute(
+                    """
+                    INSERT INTO apontamento_v2.solicitacao_almox_solicitacaorequisicao
+                        (quantidade, obs, data_solicitacao, data_entrega, cc_id,
+                         classe_requisicao_id, funcionario_id, item_id)
+                    SELECT 1 + n %% 5, 'benchmark ' || n, now() - make_interval(mins => %(linhas)s - n), now(),
+                           1 + n %% 3, 1 + n %% 2, 1 + n %% 3, 1 + n %% 3
+                    FROM generate_series(1, %(linhas)s) AS n
+                    """,
+                    {"linhas": linhas},
+                )
+                cur.execute(
+                    """
+                    INSERT INTO apontamento_v2.solicitacao_almox_solicitacaotransferencia
+                        (quantidade, obs, data_solicitacao, data_entrega, funcionario_id,
+                         item_id, deposito_destino_id)
+                    SELECT 1 + n %% 4, 'benchmark ' || n, now() - make_interval(mins => %(linhas)s - n), now(),
+                           1 + n %% 3, 1 + n %% 2, 1 + n %% 2
+                    FROM generate_series(1, %(linhas)s) AS n
+                    """,
+                    {"linhas": linhas},
+                )
+    finally:
+        conn.close()
+
+
+class Simulador:
+    """Simulador do Innovaro em uma thread deste processo, ou um já no ar (url)."""
+
+    def __init__(self, porta: int, url: Optional[str] = None):
+        self.url = (url or f"http://127.0.0.1:{porta}").rstrip("/")
+        self.porta = porta
+        self.servidor = None
+        self.thread = None
+
+    def iniciar(self, externo: bool) -> None:
+        if not externo:
+            import uvicorn
+            from core.simulador import app
+
+            self.servidor = uvicorn.Server(
+                uvicorn.Config(app, host="127.0.0.1", port=self.porta, log_level="warning")
+            )
+            self.thread = threading.Thread(target=self.servidor.run, daemon=True)
+            self.thread.start()
+
+        limite = time.monotonic() + 15
+        while time.monotonic() < limite:
+            try:
+                self.estado()
+                return
+            except Exception:
+                time.sleep(.2)
+        raise SystemExit(f"[ERRO] Simulador do Innovaro não respondeu em {self.url}")
+
+    def parar(self) -> None:
+        if self.servidor is not None:
+            self.servidor.should_exit = True
+            self.thread.join(5)
+
+    def _post(self, caminho: str, dados: Optional[Dict] = None) -> Dict:
+        import requests
+
+        resp = requests.post(f"{self.url}{caminho}", json=dados or {}, timeout=10)
+        resp.raise_for_status()
+        return resp.json()
+
+    def estado(self) -> Dict:
+        import requests
+
+        resp = requests.get(f"{self.url}/simulador/estado", timeout=5)
+        resp.raise_for_status()
+        return resp.json()
+
+    def configurar(self, **config) -> Dict:
+        return self._post("/simulador/config", config)
+
+    def reiniciar(self) -> Dict:
+        return self._post("/simulador/reiniciar")
+
+
+# =============================
+# EXECUÇÃO DE UM FLUXO
+# =============================
+
+class Rodada:
+    """Um navegador logado no simulador para medir um fluxo."""
+
+    def __init__(self, simulador: Simulador, modo_espera: str, abas: int, visivel: bool):
+        self.simulador = simulador
+        self.modo_espera = modo_espera
+        self.abas = abas
+        self.visivel = visivel
+        self.driver = None
+        self.duracao = 0.0
+
+    def url_status(self, rota: str) -> str:
+        """Endereço do simulador que recebe os status no lugar da API do Django."""
+        return f"{self.simulador.url}/simulador/rpa/{rota}"
+
+    def abrir(self, classe_fluxo):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from core import rastreio
+
+        options = Options()
+        if not self.visivel:
+            options.add_argument("--headless=new")
+        options.add_argument("--window-size=1600,1000")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+
+        self.driver = rastreio.rastrear(webdriver.Chrome(options=options))
+
+        fluxo = classe_fluxo(self.driver, modo_espera=self.modo_espera)
+        fluxo.abas_simultaneas = self.abas
+        fluxo.abrir_url(f"{self.simulador.url}/sistema")
+        fluxo.login("benchmark", "benchmark")
+        fluxo.esperar(5)
+        return fluxo
+
+    @contextmanager
+    def medir(self):
+        """Mede só o processamento das linhas (login e abertura do navegador ficam de fora)."""
+        from core import profiler, rastreio
+
+        profiler.limpar()
+        rastreio.limpar()
+        inicio = time.monotonic()
+        try:
+            yield
+        finally:
+            self.duracao = time.monotonic() - inicio
+
+    def fechar(self) -> None:
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+
+
+def bench_requisitar_item(rodada: Rodada):
+    from bots.requisitarItem import requisicoes
+    from bots.requisitarItem.flow import RequisitarItem
+
+    requisicoes.DJANGO_API_URL = rodada.url_status("update-status/")
+    rows = requisicoes.verificar_requisicoes()
+    if not rows:
+        raise RuntimeError("a fixture não tem requisições pendentes")
+
+    fluxo = rodada.abrir(RequisitarItem)
+    with rodada.medir():
+        resultados = fluxo.executar(rows)
+    return len(rows), sum(1 for r in resultados if r["status"] == "OK")
+
+
+def bench_transferir_item(rodada: Rodada):
+    from bots.transferirItem import transferencias
+    from bots.transferirItem.flow import TransferirItem
+
+    transferencias.DJANGO_API_URL = rodada.url_status("update-transfer/")
+    rows = transferencias.verificar_transferencias()
+    if not rows:
+        raise RuntimeError("a fixture não tem transferências pendentes")
+
+    fluxo = rodada.abrir(TransferirItem)
+    with rodada.medir():
+        resultados = fluxo.executar(rows)
+    return len(rows), sum(1 for r in resultados if r["status"] == "OK")
+
+
+def bench_desmanchar_item(rodada: Rodada):
+    from bots.desmancharItem.desmanches import verificar_desmanches
+    from bots.desmancharItem.flow import DesmancharItem
+
+    rows = verificar_desmanches()
+    if not rows:
+        raise RuntimeError("a fixture não tem desmanches pendentes")
+
+    fluxo = rodada.abrir(DesmancharItem)
+    with rodada.medir():
+        resultados = fluxo.executar(rows)
+    return len(rows), sum(1 for r in resultados if r["status"] == "OK")
+
+
+def bench_saldo_ao_vivo(rodada: Rodada):
+    from core import profiler
+    from bots.saldoAoVivo import flow as saldo_flow
+    from bots.saldoAoVivo.saldo_ao_vivo import ultimo_arquivo
+
+    # As planilhas do Google ficam de fora: só confere que o CSV baixado é legível
+    def sem_planilha():
+        ultimo_arquivo()
+
+    for nome in (
+        "inserir_gspread_saldo_central_mp",
+        "inserir_gspread_saldo_levantamento",
+        "inserir_gspread_saldo_levantamento_incluindo_em_processo",
+    ):
+        setattr(saldo_flow, nome, sem_planilha)
+
+    fluxo = rodada.abrir(saldo_flow.SaldoAoVivo)
+    with rodada.medir(), profiler.medir_linha("saldo"):
+        fluxo.executar()
+    return 1, 1
+
+
+FLUXOS = {
+    "requisitar_item": bench_requisitar_item,
+    "transferir_item": bench_transferir_item,
+    "desmanchar_item": bench_desmanchar_item,
+    "saldo_ao_vivo": bench_saldo_ao_vivo,
+}
+
+
+def medir_fluxo(nome: str, rodada: Rodada) -> Dict:
+    from core import profiler, rastreio
+
+    os.environ["BOT_NAME"] = f"benchmark_{nome}"
+    linhas, concluidas = FLUXOS[nome](rodada)
+
+    passos = {
+        chave: {"contagem": dados["contagem"], "p50": dados["p50"], "p95": dados["p95"]}
+        for chave, dados in profiler.resumo()["passos"].items()
+        # Pares passo | seletor ficam no perfil normal; aqui só os passos
+        if " | " not in chave
+    }
+    duracao = rodada.duracao
+    comandos = rastreio.resumo()
+
+    return {
+        "linhas": linhas,
+        "linhas_ok": concluidas,
+        "duracao_s": round(duracao, 2),
+        "linhas_hora": round(concluidas / duracao * 3600, 1) if duracao else 0.0,
+        "segundos_por_linha": round(duracao / linhas, 3) if linhas else 0.0,
+        "comandos_por_linha": round(comandos["comandos"] / linhas, 1) if linhas else 0.0,
+        "comandos": {comando: dados["contagem"] for comando, dados in comandos["por_comando"].items()},
+        "comandos_por_passo": {passo: dados["comandos"] for passo, dados in comandos["por_passo"].items()},
+        "passos": passos,
+    }
+
+
+# =============================
+# BASELINE
+# =============================
+
+def carregar_baseline() -> Dict:
+    try:
+        with open(BASELINE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def gravar_baseline(resultado: Dict) -> None:
+    with open(BASELINE, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    print(f"[INFO] Baseline gravada em {BASELINE}")
+
+
+def comparar(resultado: Dict, baseline: Dict, tolerancia: float) -> List[str]:
+    """Compara com a baseline; retorna as regressões de vazão acima da tolerância."""
+    if not baseline.get("fluxos"):
+        print("[AVISO] Sem baseline para comparar (grave uma com --gravar-baseline).")
+        return []
+
+    if baseline.get("config") != resultado["config"]:
+        print(f"[AVISO] Configuração diferente da baseline: {baseline.get('config')} -> {resultado['config']}")
+
+    regressoes = []
+    for nome, atual in resultado["fluxos"].items():
+        base = baseline["fluxos"].get(nome)
+        if not base or "erro" in atual or not base.get("linhas_hora"):
+            continue
+
+        variacao = atual["linhas_hora"] / base["linhas_hora"] - 1
+        print(f"{nome}: {atual['linhas_hora']:.1f} linhas/h (baseline {base['linhas_hora']:.1f}, {variacao:+.1%})")
+        if variacao < -tolerancia:
+            regressoes.append(
+                f"{nome}: {atual['linhas_hora']:.1f} linhas/h contra {base['linhas_hora']:.1f} da baseline ({variacao:+.1%})"
+            )
+
+        if base.get("comandos_por_linha") and atual["comandos_por_linha"] > base["comandos_por_linha"] * (1 + tolerancia):
+            print(f"  [AVISO] comandos WebDriver por linha: {base['comandos_por_linha']} -> {atual['comandos_por_linha']}")
+
+        for passo, medidas in atual["passos"].items():
+            anterior = (base.get("passos") or {}).get(passo)
+            if anterior and anterior["p95"] and medidas["p95"] > anterior["p95"] * (1 + tolerancia):
+                print(f"  [AVISO] p95 de {passo}: {anterior['p95']:.3f}s -> {medidas['p95']:.3f}s")
+
+    return regressoes
+
+
+# =============================
+# RELATÓRIO
+# =============================
+
+def imprimir(resultado: Dict) -> None:
+    print("")
+    print(f"{'fluxo':<18} {'linhas':>7} {'ok':>5} {'linhas/h':>10} {'s/linha':>9} {'cmds/linha':>11}")
+    for nome, dados in resultado["fluxos"].items():
+        if "erro" in dados:
+            print(f"{nome:<18} ERRO: {dados['erro']}")
+            continue
+        print(
+            f"{nome:<18} {dados['linhas']:>7} {dados['linhas_ok']:>5} {dados['linhas_hora']:>10.1f} "
+            f"{dados['segundos_por_linha']:>9.2f} {dados['comandos_por_linha']:>11.1f}"
+        )
+
+    for nome, dados in resultado["fluxos"].items():
+        if "erro" in dados:
+            continue
+        print(f"\n{nome} - passos mais lentos (p95):")
+        lentos = sorted(dados["passos"].items(), key=lambda item: item[1]["p95"], reverse=True)[:8]
+        for passo, medidas in lentos:
+            print(f"  {passo:<40} n={medidas['contagem']:<5} p50={medidas['p50']:.3f}s p95={medidas['p95']:.3f}s")
+    print("")
+
+
+def salvar(resultado: Dict) -> Path:
+    from core.profiler import PERFIL_DIR
+
+    PERFIL_DIR.mkdir(exist_ok=True)
+    caminho = PERFIL_DIR / f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    return caminho
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark dos fluxos do ERP contra o simulador do Innovaro.")
+    parser.add_argument("fluxos", nargs="*", help=f"fluxos a medir: {', '.join(FLUXOS)} (padrão: todos)")
+    parser.add_argument("--linhas", type=int, default=10, help="linhas pendentes semeadas por fluxo")
+    parser.add_argument("--latencia-ms", type=float, default=100, help="latência do simulador")
+    parser.add_argument("--variacao-ms", type=float, default=0, help="variação aleatória da latência")
+    parser.add_argument("--modo-espera", default="condicional", choices=["condicional", "fixo"])
+    parser.add_argument("--abas", type=int, default=1, help="abas simultâneas (requisições e transferências)")
+    parser.add_argument("--tolerancia", type=float,
+                        default=float(os.getenv("BENCHMARK_TOLERANCIA", TOLERANCIA_PADRAO)),
+                        help="queda de linhas/h tolerada em relação à baseline (0.15 = 15%%)")
+    parser.add_argument("--porta", type=int, default=8765, help="porta do simulador iniciado pelo benchmark")
+    parser.add_argument("--simulador-url", help="usa um simulador já no ar em vez de iniciar um")
+    parser.add_argument("--visivel", action="store_true", help="abre o Chrome com janela (depuração)")
+    parser.add_argument("--gravar-baseline", action="store_true", help="grava o resultado como nova baseline")
+    args = parser.parse_args(argv)
+
+    fluxos = args.fluxos or list(FLUXOS)
+    desconhecidos = [nome for nome in fluxos if nome not in FLUXOS]
+    if desconhecidos:
+        parser.error(f"fluxo desconhecido: {', '.join(desconhecidos)}")
+
+    configurar_banco()
+    isolar_estado_local()
+    semear(args.linhas)
+
+    simulador = Simulador(args.porta, args.simulador_url)
+    simulador.iniciar(externo=bool(args.simulador_url))
+    simulador.configurar(latencia_ms=args.latencia_ms, variacao_ms=args.variacao_ms, taxa_erro=0)
+
+    resultado = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "linhas": args.linhas,
+            "latencia_ms": args.latencia_ms,
+            "variacao_ms": args.variacao_ms,
+            "modo_espera": args.modo_espera,
+            "abas": args.abas,
+        },
+        "fluxos": {},
+    }
+
+    try:
+        for nome in fluxos:
+            print(f"[INFO] Medindo {nome}...")
+            simulador.reiniciar()
+            rodada = Rodada(simulador, args.modo_espera, args.abas, args.visivel)
+            try:
+                resultado["fluxos"][nome] = medir_fluxo(nome, rodada)
+            except Exception as e:
+                print(f"[ERRO] {nome} falhou: {e}")
+                resultado["fluxos"][nome] = {"erro": str(e)}
+            finally:
+                rodada.fechar()
+    finally:
+        simulador.parar()
+
+    imprimir(resultado)
+    print(f"[INFO] Resultado salvo em {salvar(resultado)}")
+
+    if args.gravar_baseline:
+        gravar_baseline(resultado)
+        return 0
+
+    regressoes = comparar(resultado, carregar_baseline(), args.tolerancia)
+    erros = [nome for nome, dados in resultado["fluxos"].items() if "erro" in dados]
+
+    if regressoes or erros:
+        print("=" * 72)
+        print(f"  REGRESSÃO DE DESEMPENHO (tolerância {args.tolerancia:.0%})")
+        for linha in regressoes:
+            print(f"  - {linha}")
+        for nome in erros:
+            print(f"  - {nome}: o fluxo não terminou ({resultado['fluxos'][nome]['erro']})")
+        print("=" * 72)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
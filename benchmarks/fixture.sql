@@ -0,0 +1,102 @@
+-- Fixture local das tabelas do apontamento_v2 lidas pelos bots (ver benchmarks/executar.py).
+-- Recria o schema do zero: rodar SOMENTE em um Postgres local de testes.
+
+DROP SCHEMA IF EXISTS apontamento_v2 CASCADE;
+CREATE SCHEMA apontamento_v2;
+
+CREATE TABLE apontamento_v2.cadastro_almox_cc (
+    id SERIAL PRIMARY KEY,
+    codigo TEXT NOT NULL,
+    nome TEXT
+);
+
+CREATE TABLE apontamento_v2.cadastro_almox_classerequisicao (
+    id SERIAL PRIMARY KEY,
+    nome TEXT NOT NULL
+);
+
+CREATE TABLE apontamento_v2.cadastro_almox_funcionario (
+    id SERIAL PRIMARY KEY,
+    matricula TEXT NOT NULL,
+    nome TEXT
+);
+
+CREATE TABLE apontamento_v2.cadastro_almox_itenssolicitacao (
+    id SERIAL PRIMARY KEY,
+    codigo TEXT NOT NULL,
+    nome TEXT
+);
+
+CREATE TABLE apontamento_v2.cadastro_almox_itenstransferencia (
+    id SERIAL PRIMARY KEY,
+    codigo TEXT NOT NULL,
+    nome TEXT
+);
+
+CREATE TABLE apontamento_v2.cadastro_almox_depositodestino (
+    id SERIAL PRIMARY KEY,
+    nome TEXT NOT NULL
+);
+
+CREATE TABLE apontamento_v2.solicitacao_almox_solicitacaorequisicao (
+    id SERIAL PRIMARY KEY,
+    quantidade NUMERIC(12, 2) NOT NULL,
+    obs TEXT,
+    data_solicitacao TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+    data_entrega TIMESTAMP WITHOUT TIME ZONE,
+    rpa TEXT,
+    cc_id INTEGER NOT NULL REFERENCES apontamento_v2.cadastro_almox_cc (id),
+    classe_requisicao_id INTEGER REFERENCES apontamento_v2.cadastro_almox_classerequisicao (id),
+    funcionario_id INTEGER REFERENCES apontamento_v2.cadastro_almox_funcionario (id),
+    item_id INTEGER REFERENCES apontamento_v2.cadastro_almox_itenssolicitacao (id)
+);
+
+CREATE TABLE apontamento_v2.solicitacao_almox_solicitacaotransferencia (
+    id SERIAL PRIMARY KEY,
+    quantidade NUMERIC(12, 2) NOT NULL,
+    obs TEXT,
+    data_solicitacao TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+    data_entrega TIMESTAMP WITHOUT TIME ZONE,
+    rpa TEXT,
+    funcionario_id INTEGER REFERENCES apontamento_v2.cadastro_almox_funcionario (id),
+    item_id INTEGER REFERENCES apontamento_v2.cadastro_almox_itenstransferencia (id),
+    deposito_destino_id INTEGER REFERENCES apontamento_v2.cadastro_almox_depositodestino (id)
+);
+
+-- Destino do saldo exportado pelo SaldoAoVivo (inserir_postgres_saldo_central_mp)
+CREATE TABLE apontamento_v2.core_consultasaldoinnovaro (
+    agrupamento TEXT,
+    codigo TEXT,
+    descricao TEXT,
+    saldo NUMERIC(14, 2),
+    custo_total NUMERIC(14, 2),
+    custo_medio NUMERIC(14, 2),
+    data_ultimo_saldo TEXT
+);
+
+INSERT INTO apontamento_v2.cadastro_almox_cc (codigo, nome) VALUES
+    ('4111', 'Usinagem'),
+    ('4112', 'Montagem'),
+    ('4210', 'Pintura');
+
+INSERT INTO apontamento_v2.cadastro_almox_classerequisicao (nome) VALUES
+    ('Requisição de material'),
+    ('Requisição de consumo');
+
+INSERT INTO apontamento_v2.cadastro_almox_funcionario (matricula, nome) VALUES
+    ('4357', 'Operador 1'),
+    ('4412', 'Operador 2'),
+    ('4520', 'Operador 3');
+
+INSERT INTO apontamento_v2.cadastro_almox_itenssolicitacao (codigo, nome) VALUES
+    ('110565', 'CHAPA ACO 1020 3/16'),
+    ('021027', 'PARAFUSO SEXTAVADO 1/2'),
+    ('024511', 'TUBO QUADRADO 50X50');
+
+INSERT INTO apontamento_v2.cadastro_almox_itenstransferencia (codigo, nome) VALUES
+    ('110565', 'CHAPA ACO 1020 3/16'),
+    ('033316', 'EIXO CARRETA 2 EIXOS');
+
+INSERT INTO apontamento_v2.cadastro_almox_depositodestino (nome) VALUES
+    ('Almox Serra'),
+    ('Almox Mont Carretas');
@@ -1,173 +1,48 @@
-from selenium.webdriver.common.by import By
-
 from core.erp_core import BaseERP
+from core.fluxo_declarativo import MotorFluxo
+from core.profiler import medir_linha
+from bots.desmancharItem.flow import ABRIR, CABECALHO, ENTRADA, GRAVAR, INSERIR, SAIDA, TELA
+
+# Documento de movimentação com um item, nos passos do desmancharItem (ver core/fluxo_declarativo.py)
+PASSOS = ABRIR + INSERIR + CABECALHO + SAIDA + ENTRADA + GRAVAR
 
 class DesmancharItem(BaseERP):
 
+    def _reportar(self, dados, status, chave=None):
+        dados["status"] = status
+
     def executar(self):
         
         """
         Função principal do fluxo.
         """
 
-        dep1_input='Almox Mont Carretas'
-        dep2_input='Almox Serra'
-        recurso='033316'
-        qtd='-10,00'
-        mp='110565'
-        qt_mp='219,39'
-
-        self.abrir_menu_1()
-
-        self.clicar_menu('Estoque')
-        self.esperar(1)
-
-        self.clicar_menu('Transferência')
-        self.esperar(1)
-        self.abrir_menu_1()
+        motor = MotorFluxo(self, PASSOS, self._reportar)
+        item = {
+            "deposito_origem": 'Almox Mont Carretas',
+            "deposito_destino": 'Almox Serra',
+            "recurso": '033316',
+            "quantidade": '-10,00',
+            "mp": '110565',
+            "quantidade_mp": '219,39',
+            "data": '29/11/2025',
+        }
 
         for i in range(10):
-
-            self.abrir_menu_1()
-
-            self.clicar_menu('Transferência simples de recursos')
-            self.esperar(1.5)
-
-            #Mudando visualização
-            self.iframes()
-            print("Mudando visualização")
-            self.esperar(.5)
-            self.clicar_v2(By.XPATH, '//*[@id="grdMovDepos"]//div[@id="changeViewButton"]', 5)
-            self.esperar(.5)
-
-            #Clicando em add
-            print("Clicando em add")
-            self.esperar(.5)
-            self.clicar_v2(By.XPATH, '//*[@id="grdMovDepos"]//div[@id="insertButton"]', 5)
-            self.esperar(.5)
-        
-            #Escrever classe
-            self.escrever(By.XPATH,'//*[@id="grdMovDepos"]//input[@name="CLASSE"]','Movimentação de Depósito')
-            self.esperar(.5)
-            self.clicar_v2(By.XPATH,'//*[@id="1"]', 5)
-            self.esperar(.5)
-            self.clicar_v2(By.XPATH,'//*[@id="buttonsBar_grLookup"]/td[1]', 5)
-            self.esperar(.5)
-
-            #Escrever data de apontamento
-            self.escrever(By.XPATH,'//*[@id="grdMovDepos"]//input[@name="MOVIMENTAC"]','29/11/2025')
-            self.esperar(.5)
-
-            # Escrever depósito
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="DEPOSITO"]', dep1_input)
-            self.esperar(.5)
-
-            #Escrever recurso
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="RECURSO"]', recurso)
-            self.esperar(.5)
-
-            # #Escrever pessoa
-            # self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="PESSOA"]', '4357')
-            # self.esperar(.5)
-
-            #Escrevendo quantidade        
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="QUANTIDADE"]', qtd)
-            self.esperar(1.5)
-
-            #Buscando custo mat
-            custo_mat = self.buscar_valor(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="CUSTOMAT"]')
-            self.esperar(.5)
-            #Tratando custo mat
-            custo_mat = custo_mat.replace("-","")
-
-            #Clicando em confirmar
-            self.clicar_v2(By.XPATH, '//*[@id="grdMovDepos"]//div[@id="postButton"]')
-            self.esperar(.5)
-            #Verifica se mostra algum erro
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
-                continue
-            self.esperar(.5)
-
-            #Clicando em add na segunda linha
-            self.clicar_v2(By.XPATH, '//*[@id="grdMovDepos"]//div[@id="insertButton"]')
-            self.esperar(.5)
-
-            # #Escrever classe
-            # self.escrever(By.XPATH,'//*[@id="grdMovDepos"]//input[@name="CLASSE"]','Movimentação de Depósito')
-            # self.esperar(.5)
-            # self.clicar_v2(By.XPATH,'//*[@id="1"]', 5)
-            # self.esperar(.5)
-            # self.clicar_v2(By.XPATH,'//*[@id="buttonsBar_grLookup"]/td[1]', 5)
-            # self.esperar(.5)
-
-            #Escrever data de apontamento
-            # self.escrever(By.XPATH,'//*[@id="grdMovDepos"]//input[@name="MOVIMENTAC"]','29/11/2025')
-            # self.esperar(.5)
-
-            # Escrever depósito
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="DEPOSITO"]', dep2_input)
-            self.esperar(.5)
-
-            #Escrever mp
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="RECURSO"]', mp)
-            self.esperar(.5)
-
-            # #Escrever pessoa
-            # self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="PESSOA"]', '4357')
-            # self.esperar(.5)
-
-            # #Escrevendo quantidade        
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="QUANTIDADE"]', qt_mp)
-            self.esperar(.5)
-
-            #Escrevendo custo mat        
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="CUSTOMAT"]', custo_mat)
-            self.esperar(.5)
-
-            #Clicando em confirmar
-            self.clicar_v2(By.XPATH, '//*[@id="grdMovDepos"]//div[@id="postButton"]')
-            self.esperar(.5)
-            #Verifica se mostra algum erro
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
-                continue
-            self.esperar(.5)
-
-            #Clicando em gravar
-            self.clicar_v2(By.XPATH, "//p[contains(text(),'ravar')]/parent::span[contains(@class,'wf-button')]")
-            self.esperar(.5)
-            #Verifica se mostra algum erro
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
-                continue
-            self.esperar(.5)
-
-            self.sair_iframe()
-            #Clicar em sim
-            self.clicar_v2(By.ID, 'answers_0')
-            #Verifica se mostra algum erro
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
+            dados = dict(item, id=i)
+            try:
+                with medir_linha(i):
+
+                    self.garantir_tela(TELA)
+                    for espera in motor.linha(dados):
+                        self.esperar(espera.teto, espera.condicao)
+
+                    # Erro levantado dentro do medir_linha: a linha conta como falha
+                    if dados["status"] != 'OK':
+                        raise RuntimeError(dados["status"])
+            except RuntimeError:
+                # O motor já fechou a aba do item com erro
                 continue
-            self.esperar(.5)
-            print("Aguardando alerta")
-            alerta = self.obter_mensagem_alert()
-            if alerta:
-                print(f"[ALERTA] Apenas um alerta: {alerta}")
-            self.esperar(.5)                
 
             print("Sucesso!!")
 
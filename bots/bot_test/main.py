@@ -6,7 +6,7 @@ from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 
 from .flow import DesmancharItem
-from core.db import get_erp_credentials_for_bot
+from core.db import get_erp_credentials_for_bot, get_wait_mode_for_bot
 
 def main():
 
@@ -34,7 +34,7 @@ def main():
         # Se não conseguir registrar, apenas segue a execução normal
         pass
     
-    fluxo = DesmancharItem(driver)
+    fluxo = DesmancharItem(driver, modo_espera=get_wait_mode_for_bot(name_bot))
 
     try:
         # fluxo.abrir_url_140()
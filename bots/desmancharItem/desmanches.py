@@ -0,0 +1,207 @@
+import threading
+
+from psycopg2.extras import DictCursor  # Para retornar resultados como dicionários
+
+from core.db import get_active_schema, get_db_connection, get_desmanches_table_name
+from core.reservas import ReservaLote, reservar
+from core.tentativas import filtro_pendentes, registrar_resultado
+
+# Tipo da linha nas tabelas de reservas e de tentativas do RPA
+TIPO_LINHA = "desmanche"
+
+_TABELA_CRIADA = False
+_lock_tabela = threading.Lock()
+
+
+def tabela_desmanches() -> str:
+    schema = get_active_schema()
+    table = get_desmanches_table_name()
+    return f"{schema}.{table}" if schema else table
+
+
+def garantir_tabela(cur) -> None:
+    """
+    Cria a tabela de trabalho do desmanche se preciso. Cada linha é um item:
+    a saída do `recurso` no depósito de origem e a entrada da matéria-prima
+    `mp` no depósito de destino. `status` fica nulo até o bot processar
+    ('OK' ou a mensagem do ERP) e `linha` diz qual linha do documento falhou.
+    """
+    global _TABELA_CRIADA
+    if _TABELA_CRIADA:
+        return
+    with _lock_tabela:
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {tabela_desmanches()} (
+                id BIGSERIAL PRIMARY KEY,
+                deposito_origem TEXT NOT NULL,
+                deposito_destino TEXT NOT NULL,
+                recurso TEXT NOT NULL,
+                quantidade NUMERIC(14, 2) NOT NULL,
+                mp TEXT NOT NULL,
+                quantidade_mp NUMERIC(14, 2) NOT NULL,
+                data_movimentacao DATE,
+                criado_em TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                status TEXT,
+                linha TEXT,
+                processado_em TIMESTAMP WITHOUT TIME ZONE
+            )
+            """
+        )
+        _TABELA_CRIADA = True
+
+
+def consulta_pendentes():
+    """
+    (id, ordem) dos desmanches pendentes para as reservas (ver core/reservas.py),
+    sem as linhas em quarentena/espera. A ordem põe itens sem falhas primeiro e,
+    dentro do mesmo número de tentativas, os mais antigos; verificar_desmanches
+    agrupa os reservados por par de depósitos.
+    """
+    tentativas = filtro_pendentes(TIPO_LINHA, "d")
+    return f"""
+        SELECT d.id, row_number() OVER (ORDER BY {tentativas["ordem"]} d.criado_em, d.id)
+        FROM {tabela_desmanches()} d
+        {tentativas["join"]}
+        WHERE (d.status IS NULL OR d.status != 'OK')
+          {tentativas["where"]}
+    """
+
+
+def enfileirar_desmanche(deposito_origem, deposito_destino, recurso, quantidade, mp, quantidade_mp,
+                         data_movimentacao=None):
+    """Inclui um item na fila do bot. Retorna o id criado."""
+    conn = get_db_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                garantir_tabela(cur)
+                cur.execute(
+                    f"""
+                    INSERT INTO {tabela_desmanches()}
+                        (deposito_origem, deposito_destino, recurso, quantidade, mp, quantidade_mp, data_movimentacao)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    RETURNING id
+                    """,
+                    (deposito_origem, deposito_destino, recurso, quantidade, mp, quantidade_mp, data_movimentacao),
+                )
+                return cur.fetchone()[0]
+    finally:
+        conn.close()
+
+
+def verificar_desmanches(ids=None):
+    """
+    Retorna os desmanches pendentes (status diferente de OK), agrupados por par
+    de depósitos e data. Com `ids`, restringe aos informados (ex.: os reservados
+    por este bot).
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+
+        cursor = conn.cursor(cursor_factory=DictCursor)
+        garantir_tabela(cursor)
+        conn.commit()
+
+        filtro_ids = "AND d.id = ANY(%s)" if ids is not None else ""
+        # Fora as linhas em quarentena ou aguardando nova tentativa; novas primeiro
+        tentativas = filtro_pendentes(TIPO_LINHA, "d")
+
+        query = f"""
+            SELECT
+                d.id,
+                d.deposito_origem,
+                d.deposito_destino,
+                d.recurso,
+                d.quantidade,
+                d.mp,
+                d.quantidade_mp,
+                d.data_movimentacao
+            FROM
+                {tabela_desmanches()} d
+            {tentativas["join"]}
+            WHERE
+                (d.status IS NULL OR d.status != 'OK')
+                {tentativas["where"]}
+                {filtro_ids}
+            ORDER BY
+                d.deposito_origem, d.deposito_destino, d.data_movimentacao,
+                {tentativas["ordem"]} d.criado_em;
+        """
+
+        cursor.execute(query, (list(ids),) if ids is not None else None)
+        return cursor.fetchall()
+
+    except Exception as e:
+        print(f"Erro ao conectar ao banco de dados ou executar a consulta: {e}")
+        return []
+
+    finally:
+        try:
+            if cursor:
+                cursor.close()
+        except Exception:
+            pass
+        try:
+            if conn:
+                conn.close()
+        except Exception:
+            pass
+
+
+def reservar_desmanches(worker, limite, duracao_s=300):
+    """
+    Reserva até `limite` desmanches pendentes para `worker` (SKIP LOCKED) e
+    retorna as linhas completas, como verificar_desmanches.
+    """
+    try:
+        conn = get_db_connection()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    garantir_tabela(cur)
+        finally:
+            conn.close()
+        ids = reservar(TIPO_LINHA, consulta_pendentes(), worker, limite, duracao_s)
+    except Exception as e:
+        print(f"Erro ao reservar desmanches pendentes: {e}")
+        return []
+
+    if not ids:
+        return []
+    return verificar_desmanches(ids)
+
+
+def manter_reserva(rows, worker, duracao_s=300):
+    """Renova a reserva das linhas enquanto o bloco roda e libera ao final (ver ReservaLote)."""
+    return ReservaLote(TIPO_LINHA, [row[0] for row in rows], worker, duracao_s)
+
+
+def registrar_status(desmanche_id, status, linha=None):
+    """
+    Grava o status do item na tabela de trabalho ('OK' ou a mensagem do ERP,
+    com a linha do documento que falhou) e conta a tentativa.
+    """
+    registrar_resultado(TIPO_LINHA, desmanche_id, status)
+
+    try:
+        conn = get_db_connection()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"""
+                        UPDATE {tabela_desmanches()}
+                        SET status = %s, linha = %s, processado_em = CURRENT_TIMESTAMP
+                        WHERE id = %s
+                        """,
+                        (status, linha, desmanche_id),
+                    )
+        finally:
+            conn.close()
+        return True
+    except Exception as e:
+        print(f"✗ Falha ao gravar status do desmanche {desmanche_id}: {e}")
+        return False
@@ -1,178 +1,292 @@
 from selenium.webdriver.common.by import By
 
+from core import checkpoints
 from core.erp_core import BaseERP
+from core.fluxo_declarativo import (
+    ABA,
+    ALERTA_AVISO,
+    PRINCIPAL,
+    QUALQUER,
+    Clicar,
+    Digitar,
+    Etapa,
+    Ler,
+    MotorFluxo,
+    Pausa,
+)
+from core.seletores import MOV_DEPOSITOS
+from core.profiler import definir_linha, medir_linha
+
+from .desmanches import TIPO_LINHA, registrar_status
+
+import datetime
+
+TELA = 'Transferência simples de recursos'
+CLASSE = 'Movimentação de Depósito'
+
+# Máximo de itens (pares de linhas) em um mesmo documento de movimentação
+ITENS_POR_DOCUMENTO = 20
+
+# Passos do documento de movimentação na grade grdMovDepos (ver core/fluxo_declarativo.py).
+# Um documento é ABRIR, os itens (SAIDA_CABECALHO ou SAIDA, e ENTRADA) e GRAVAR.
+ABRIR = [
+    Pausa(.5),
+    Clicar(MOV_DEPOSITOS["mudar_visualizacao"], "Mudando visualização"),
+    Pausa(.5),
+]
+
+INSERIR = [
+    Clicar(MOV_DEPOSITOS["inserir"], "Clicando em add"),
+    Pausa(.5),
+]
+
+# Classe e data só são informadas na primeira linha do documento: o ERP as repete nas seguintes
+CABECALHO = [
+    Digitar(MOV_DEPOSITOS["classe"], CLASSE, "Escrevendo classe"),
+    Pausa(.5),
+    Clicar('//*[@id="1"]', contexto=QUALQUER),
+    Pausa(.5),
+    Clicar('//*[@id="buttonsBar_grLookup"]/td[1]', contexto=QUALQUER),
+    Pausa(.5),
+    Digitar(MOV_DEPOSITOS["movimentacao"], "{data}", "Escrevendo data de movimentação"),
+    Pausa(.5),
+]
+
+# Saída do recurso no depósito de origem; o custo do material é lido para a entrada
+SAIDA = [
+    Digitar(MOV_DEPOSITOS["deposito"], "{deposito_origem}", "Escrevendo depósito"),
+    Pausa(.5),
+    Digitar(MOV_DEPOSITOS["recurso"], "{recurso}", "Escrevendo recurso"),
+    Pausa(.5),
+    Digitar(MOV_DEPOSITOS["quantidade"], "{quantidade}", "Escrevendo quantidade"),
+    Pausa(1.5),
+    Ler(MOV_DEPOSITOS["custo_mat"], "custo_mat", "Buscando custo mat"),
+    Pausa(.5),
+    Clicar(MOV_DEPOSITOS["confirmar"], "Clicando em confirmar", verificar=True),
+    Pausa(.5),
+]
+
+# Entrada da matéria-prima no depósito de destino, com o mesmo custo (sem o sinal da saída)
+ENTRADA = INSERIR + [
+    Digitar(MOV_DEPOSITOS["deposito"], "{deposito_destino}", "Escrevendo depósito"),
+    Pausa(.5),
+    Digitar(MOV_DEPOSITOS["recurso"], "{mp}", "Escrevendo mp"),
+    Pausa(.5),
+    Digitar(MOV_DEPOSITOS["quantidade"], "{quantidade_mp}", "Escrevendo quantidade"),
+    Pausa(.5),
+    Digitar(MOV_DEPOSITOS["custo_mat"], lambda dados: dados["custo_mat"].replace("-", ""), "Escrevendo custo mat"),
+    Pausa(.5),
+    Clicar(MOV_DEPOSITOS["confirmar"], "Clicando em confirmar", verificar=True),
+    Pausa(.5),
+]
+
+GRAVAR = [
+    Clicar("//p[contains(text(),'ravar')]/parent::span[contains(@class,'wf-button')]", "Clicando em gravar", contexto=QUALQUER, verificar=True),
+    Pausa(.5),
+    Clicar('answers_0', "Clicando em sim", contexto=PRINCIPAL, by=By.ID, verificar=True, alerta=ALERTA_AVISO),
+    Etapa(checkpoints.GRAVADO),
+]
+
+# Passos de cada parte do documento
+PARTES = {
+    "abrir": ABRIR,
+    "saida_cabecalho": INSERIR + CABECALHO + SAIDA,
+    "saida": INSERIR + SAIDA,
+    "entrada": ENTRADA,
+    "gravar": GRAVAR,
+}
+
+
+def formatar_numero(valor):
+    """Número no formato dos campos do Innovaro (ex.: 219,39)."""
+    return f"{valor:.2f}".replace(".", ",")
+
 
 class DesmancharItem(BaseERP):
 
-    def executar(self):
-        
+    itens_por_documento = ITENS_POR_DOCUMENTO
+
+    def _reportar(self, row, resultado):
+        """
+        Devolve o status do item para a tabela de trabalho e guarda o resultado
+        da linha. Item gravado fica com checkpoint GRAVADO até o status chegar
+        ao banco: se o bot cair antes, a próxima execução só reporta o item.
+        """
+        if resultado["status"] == "OK":
+            checkpoints.marcar(TIPO_LINHA, row["id"], checkpoints.GRAVADO)
+        if registrar_status(row["id"], resultado["status"], resultado["linha"]):
+            checkpoints.marcar(TIPO_LINHA, row["id"], checkpoints.REPORTADO)
+        self.resultados.append({"id": row["id"], "status": resultado["status"], "chave": None})
+
+    def executar(self, rows):
+
         """
         Função principal do fluxo.
+        Processa os desmanches da fila (ver desmanches.py). Itens do mesmo par
+        de depósitos e da mesma data vão para os mesmos documentos (executar_lote),
+        que reaproveitam a tela aberta e a classe/data do cabeçalho. Cada item é
+        reportado assim que o seu documento grava (ou o item falha), e itens
+        gravados numa execução interrompida são só reportados (checkpoints).
+        Retorna a lista de resultados ({id, status, chave}) das linhas reportadas.
         """
 
-        dep1_input='Almox Mont Carretas'
-        dep2_input='Almox Serra'
-        recurso='033316'
-        qtd='-10,00'
-        mp='110565'
-        qt_mp='219,39'
-
-        self.abrir_menu_1()
-
-        self.clicar_menu('Estoque')
-        self.esperar(1)
-
-        self.clicar_menu('Transferência')
-        self.esperar(1)
-        self.abrir_menu_1()
-
-        for i in range(10):
-
-            self.abrir_menu_1()
-
-            self.clicar_menu('Transferência simples de recursos')
-            self.esperar(1.5)
-
-            #Mudando visualização
-            self.iframes()
-            print("Mudando visualização")
-            self.esperar(.5)
-            self.clicar_v2(By.XPATH, '//*[@id="grdMovDepos"]//div[@id="changeViewButton"]', 5)
-            self.esperar(.5)
-
-            #Clicando em add
-            print("Clicando em add")
-            self.esperar(.5)
-            self.clicar_v2(By.XPATH, '//*[@id="grdMovDepos"]//div[@id="insertButton"]', 5)
-            self.esperar(.5)
-        
-            #Escrever classe
-            self.escrever(By.XPATH,'//*[@id="grdMovDepos"]//input[@name="CLASSE"]','Movimentação de Depósito')
-            self.esperar(.5)
-            self.clicar_v2(By.XPATH,'//*[@id="1"]', 5)
-            self.esperar(.5)
-            self.clicar_v2(By.XPATH,'//*[@id="buttonsBar_grLookup"]/td[1]', 5)
-            self.esperar(.5)
-
-            #Escrever data de apontamento
-            self.escrever(By.XPATH,'//*[@id="grdMovDepos"]//input[@name="MOVIMENTAC"]','29/11/2025')
-            self.esperar(.5)
-
-            # Escrever depósito
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="DEPOSITO"]', dep1_input)
-            self.esperar(.5)
-
-            #Escrever recurso
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="RECURSO"]', recurso)
-            self.esperar(.5)
-
-            # #Escrever pessoa
-            # self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="PESSOA"]', '4357')
-            # self.esperar(.5)
-
-            #Escrevendo quantidade        
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="QUANTIDADE"]', qtd)
-            self.esperar(1.5)
-
-            #Buscando custo mat
-            custo_mat = self.buscar_valor(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="CUSTOMAT"]')
-            self.esperar(.5)
-            #Tratando custo mat
-            custo_mat = custo_mat.replace("-","")
-
-            #Clicando em confirmar
-            self.clicar_v2(By.XPATH, '//*[@id="grdMovDepos"]//div[@id="postButton"]')
-            self.esperar(.5)
-            #Verifica se mostra algum erro
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
-                continue
-            self.esperar(.5)
-
-            #Clicando em add na segunda linha
-            self.clicar_v2(By.XPATH, '//*[@id="grdMovDepos"]//div[@id="insertButton"]')
-            self.esperar(.5)
-
-            # #Escrever classe
-            # self.escrever(By.XPATH,'//*[@id="grdMovDepos"]//input[@name="CLASSE"]','Movimentação de Depósito')
-            # self.esperar(.5)
-            # self.clicar_v2(By.XPATH,'//*[@id="1"]', 5)
-            # self.esperar(.5)
-            # self.clicar_v2(By.XPATH,'//*[@id="buttonsBar_grLookup"]/td[1]', 5)
-            # self.esperar(.5)
-
-            #Escrever data de apontamento
-            # self.escrever(By.XPATH,'//*[@id="grdMovDepos"]//input[@name="MOVIMENTAC"]','29/11/2025')
-            # self.esperar(.5)
-
-            # Escrever depósito
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="DEPOSITO"]', dep2_input)
-            self.esperar(.5)
-
-            #Escrever mp
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="RECURSO"]', mp)
-            self.esperar(.5)
-
-            # #Escrever pessoa
-            # self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="PESSOA"]', '4357')
-            # self.esperar(.5)
-
-            # #Escrevendo quantidade        
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="QUANTIDADE"]', qt_mp)
-            self.esperar(.5)
-
-            #Escrevendo custo mat        
-            self.escrever(By.XPATH, '//*[@id="grdMovDepos"]//input[@name="CUSTOMAT"]', custo_mat)
-            self.esperar(.5)
-
-            #Clicando em confirmar
-            self.clicar_v2(By.XPATH, '//*[@id="grdMovDepos"]//div[@id="postButton"]')
-            self.esperar(.5)
-            #Verifica se mostra algum erro
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
-                continue
-            self.esperar(.5)
-
-            #Clicando em gravar
-            self.clicar_v2(By.XPATH, "//p[contains(text(),'ravar')]/parent::span[contains(@class,'wf-button')]")
-            self.esperar(.5)
-            #Verifica se mostra algum erro
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
-                continue
-            self.esperar(.5)
+        self.resultados = []
+        hoje = datetime.datetime.now().date()
 
-            self.sair_iframe()
-            #Clicar em sim
-            self.clicar_v2(By.ID, 'answers_0')
-            #Verifica se mostra algum erro
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
+        grupos = {}
+        for row in rows:
+            if checkpoints.retomar(TIPO_LINHA, row["id"]) is not None:
+                self._reportar(row, {"status": "OK", "linha": None})
                 continue
-            self.esperar(.5)
-            print("Aguardando alerta")
-            alerta = self.obter_mensagem_alert()
-            if alerta:
-                print(f"[ALERTA] Apenas um alerta: {alerta}")
-            self.esperar(.5)                
+            data = (row["data_movimentacao"] or hoje).strftime('%d/%m/%Y')
+            grupos.setdefault((row["deposito_origem"], row["deposito_destino"], data), []).append(row)
+
+        try:
+            for (origem, destino, data), grupo in grupos.items():
+                print(f"Desmanchando {len(grupo)} item(ns) de {origem} para {destino} em {data}")
+                itens = [
+                    {
+                        "id": row["id"],
+                        "deposito_origem": origem,
+                        "deposito_destino": destino,
+                        "recurso": row["recurso"],
+                        # Saída do recurso: quantidade negativa
+                        "quantidade": formatar_numero(-abs(row["quantidade"])),
+                        "mp": row["mp"],
+                        "quantidade_mp": formatar_numero(row["quantidade_mp"]),
+                    }
+                    for row in grupo
+                ]
+                self.executar_lote(
+                    itens, data,
+                    ao_concluir=lambda indice, resultado, grupo=grupo: self._reportar(grupo[indice], resultado),
+                )
+        finally:
+            self.sair_iframe()
+            self.fechar_aba_ate_fechar()
 
-            print("Sucesso!!")
+        return self.resultados
 
-            self.fechar_aba_ate_fechar()
+    def executar_lote(self, itens, data=None, ao_concluir=None):
 
-            self.esperar(10)
+        """
+        Lança vários itens em um único documento de movimentação, gravado uma
+        vez só. Cada item é um par de linhas: a saída de `recurso` em
+        `deposito_origem` e a entrada de `mp` em `deposito_destino`, com as
+        quantidades já no formato do ERP (ver formatar_numero).
+
+        Um erro em uma linha é atribuído ao item daquela linha: o documento é
+        descartado e os demais itens são lançados de novo, sem ele. Um erro ao
+        gravar não diz qual linha o causou, então o documento é dividido ao meio
+        até isolar o item com problema.
+
+        Depois de gravar, a aba continua aberta para o próximo documento (só
+        recarrega); quem chama fecha a aba ao terminar.
+
+        Retorna um resultado por item, na ordem recebida:
+        {"item", "status" ("OK" ou a mensagem do ERP), "linha" ("saida",
+        "entrada", "gravar" ou None)}. `ao_concluir(indice, resultado)`, se
+        informado, é chamado assim que o resultado do item é definitivo (logo
+        após gravar o documento dele), sem esperar os demais documentos.
+        """
 
+        data = data or datetime.datetime.now().date().strftime('%d/%m/%Y')
+        self._motores = {nome: MotorFluxo(self, passos, self._resposta_parte) for nome, passos in PARTES.items()}
+        resultados = [{"item": item, "status": None, "linha": None} for item in itens]
+
+        indices = list(range(len(itens)))
+        fila = [indices[i:i + self.itens_por_documento] for i in range(0, len(indices), self.itens_por_documento)]
+
+        while fila:
+            grupo = fila.pop(0)
+            print(f"Lançando documento com {len(grupo)} item(ns)")
+
+            with medir_linha(f"documento {grupo[0]}-{grupo[-1]}"):
+                self._abrir_documento()
+
+                erro = None
+                for posicao, indice in enumerate(grupo):
+                    # Comandos e tempos de cada item ficam com o seu id (profiler/rastreio)
+                    definir_linha(itens[indice].get("id", indice))
+                    erro = self._lancar_item(itens[indice], data, cabecalho=posicao == 0)
+                    if erro:
+                        break
+                else:
+                    erro = self._gravar_documento()
+
+            if erro is None:
+                print(f"Sucesso!! {len(grupo)} item(ns) gravado(s)")
+                for indice in grupo:
+                    resultados[indice]["status"] = "OK"
+                    if ao_concluir:
+                        ao_concluir(indice, resultados[indice])
+                continue
 
+            linha, mensagem = erro
+            if linha != "gravar":
+                print(f"[ERRO] Item {itens[indice].get('id', indice)} (linha de {linha}): {mensagem}")
+                resultados[indice].update(status=mensagem, linha=linha)
+                if ao_concluir:
+                    ao_concluir(indice, resultados[indice])
+                restantes = [i for i in grupo if i != indice]
+                if restantes:
+                    fila.insert(0, restantes)
+            elif len(grupo) == 1:
+                print(f"[ERRO] Item {itens[grupo[0]].get('id', grupo[0])} não gravou: {mensagem}")
+                resultados[grupo[0]].update(status=mensagem, linha=linha)
+                if ao_concluir:
+                    ao_concluir(grupo[0], resultados[grupo[0]])
+            else:
+                meio = len(grupo) // 2
+                print(f"[ERRO] Documento não gravou ({mensagem}), dividindo para achar o item")
+                fila[:0] = [grupo[:meio], grupo[meio:]]
+
+        return resultados
+
+    # =============================
+    # DOCUMENTO DE MOVIMENTAÇÃO
+    # =============================
+
+    def _parte(self, parte, dados, contexto=QUALQUER):
+        """
+        Executa uma parte do documento (ver PARTES) pelo MotorFluxo.
+        Valores lidos ficam em `dados`. Retorna o erro do ERP ou None; com
+        erro o motor fecha a aba, descartando as linhas já lançadas.
+        """
+        dados["status"] = None
+        for espera in self._motores[parte].linha(dados, contexto):
+            self.esperar(espera.teto, espera.condicao)
+        return None if dados["status"] == 'OK' else dados["status"]
+
+    @staticmethod
+    def _resposta_parte(dados, status, chave=None):
+        # O status do item é reportado por executar_lote, não a cada parte
+        dados["status"] = status
+
+    def _abrir_documento(self):
+        """Abre (ou reinicia) a tela e deixa a grade pronta para inserir linhas."""
+        self.garantir_tela(TELA)
+        self._parte("abrir", {"id": None}, contexto=ABA)
+
+    def _lancar_item(self, item, data, cabecalho=True):
+        """
+        Lança o par de linhas de um item: a saída do recurso no depósito de
+        origem e a entrada da matéria-prima no destino, com o mesmo custo.
+        Retorna None ou (linha, erro), com linha "saida" ou "entrada".
+        """
+        dados = dict(item, data=data)
+        erro = self._parte("saida_cabecalho" if cabecalho else "saida", dados)
+        if erro:
+            return "saida", erro
+
+        erro = self._parte("entrada", dados)
+        if erro:
+            return "entrada", erro
+        return None
+
+    def _gravar_documento(self):
+        """Grava o documento e confirma a pergunta. Retorna None ou ("gravar", erro)."""
+        erro = self._parte("gravar", {"id": None})
+        if erro:
+            return "gravar", erro
+        return None
@@ -1,60 +1,70 @@
-import os
+import time
+from contextlib import nullcontext
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-
-from .flow import DesmancharItem
-from core.db import get_erp_credentials_for_bot
+from bots.desmancharItem.desmanches import (
+    manter_reserva,
+    reservar_desmanches,
+    verificar_desmanches,
+)
+from bots.desmancharItem.flow import DesmancharItem
+from core.db import get_bot_flag, get_bot_setting
+from core.reservas import id_worker
+from core.sessao import SessaoERP
 
 
 def main():
 
-    name_bot = 'bot_test_desmanche'
-
-    driver = webdriver.Chrome()
-
-    # Registra o PID do chromedriver em arquivo para o gerenciador poder encerrar apenas este navegador
-    pid_file = os.getenv("BOT_PID_FILE")
-    try:
-        service = getattr(driver, "service", None)
-        process = getattr(service, "process", None) if service else None
-        driver_pid = getattr(process, "pid", None) if process else None
-
-        if pid_file and driver_pid is not None:
-            with open(pid_file, "w", encoding="utf-8") as f:
-                f.write(str(driver_pid))
-    except Exception:
-        # Se não conseguir registrar, apenas segue a execução normal
-        pass
-    
-    fluxo = DesmancharItem(driver)
-
-    try:
-        # fluxo.abrir_url_140()
-        fluxo.abrir_url_testes()
+    name_bot = 'desmanchar_item'
 
-        # creds = get_erp_credentials_for_bot(name_bot)
-        # login = creds.get("erp_username")
-        # senha = creds.get("erp_password")
+    # Modo sessão persistente: o navegador continua logado entre os ciclos
+    persistente = get_bot_flag(name_bot, "ERP_SESSAO_PERSISTENTE")
+    intervalo_poll = float(get_bot_setting(name_bot, "ERP_INTERVALO_POLL_S", "30"))
 
-        login = 'luan araujo'
-        senha = 'luanaraujo7'
+    # Credenciais do ERP vêm do banco (rpa_bot_erp_credentials), como nos outros bots
+    sessao = SessaoERP(name_bot, DesmancharItem)
 
-        fluxo.login(login, senha)
-        fluxo.esperar(5)
-
-        fluxo.executar()
-
-        driver.quit()
+    # Reserva de linhas: permite várias instâncias do bot na mesma fila
+    usar_reserva = get_bot_flag(name_bot, "ERP_RESERVA_LINHAS")
+    limite_reserva = int(get_bot_setting(name_bot, "ERP_RESERVA_LIMITE", "40"))
+    duracao_reserva = float(get_bot_setting(name_bot, "ERP_RESERVA_DURACAO_S", "300"))
+    worker_id = id_worker(name_bot)
 
+    try:
+        while True:
+
+            if usar_reserva:
+                rows = reservar_desmanches(worker_id, limite_reserva, duracao_reserva)
+            else:
+                rows = verificar_desmanches()
+
+            if rows:
+                print(f"Encontrados {len(rows)} desmanches a serem processados.")
+
+                try:
+                    reserva = manter_reserva(rows, worker_id, duracao_reserva) if usar_reserva else nullcontext()
+                    with reserva:
+                        fluxo = sessao.obter()
+                        resultados = fluxo.executar(rows)
+                    falhas = sum(1 for item in resultados if item["status"] != 'OK')
+                    print(f"[INFO] {len(resultados)} desmanche(s) processado(s), {falhas} com erro.")
+                except Exception as e:
+                    # Descarta o navegador com problema; no modo persistente
+                    # segue para o próximo ciclo com um navegador novo
+                    sessao.encerrar()
+                    if not persistente:
+                        raise
+                    print(f"[ERRO] Falha no lote de desmanches: {e}")
+                finally:
+                    if not persistente:
+                        sessao.encerrar()
+
+            elif persistente:
+                time.sleep(intervalo_poll)
+            else:
+                return "[INFO] Nenhum desmanche pendente encontrado."
     finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+        sessao.encerrar()
+
 
 if __name__ == "__main__":
     main()
-
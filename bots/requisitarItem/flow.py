@@ -1,282 +1,149 @@
-from selenium.webdriver.common.by import By
-
-from core.erp_core import BaseERP
-from bots.requisitarItem.requisicoes import enviar_status_via_api
+from core import checkpoints
+from core.cadastros import validador
+from core.erp_core import BaseERP, COMMIT_EVENTO
+from core.fluxo_declarativo import (
+    ALERTA_AVISO,
+    PRINCIPAL,
+    QUALQUER,
+    Campo,
+    Clicar,
+    Digitar,
+    Etapa,
+    Ler,
+    MotorFluxo,
+    Pausa,
+)
+from core.multiaba import ExecutorMultiAba, executar_sequencial
+from bots.requisitarItem.requisicoes import TIPO_LINHA, enviar_status_via_api
 
 import datetime
 
 
-class RequisitarItem(BaseERP):
-
-    def executar(self, rows):
-        
-        """
-        Função principal do fluxo.
-        """
-
-        # Loop infinito para realizar as requsições
-        for row in rows:
-            id = row[0]
-            rec = row[7]
-            qtd = row[1]
-            tipo_requisicao = row[4]
-            requisitante_matricula = row[6]
-            ccusto_text = row[5]
-            observacao_text = row[2] if row[2] else ' '
-
-            print('-------------------------------------------------------')
-            print(f"[INFO] Indo para item {rec}\nRequisitado por: {requisitante_matricula}\nRequisitado no dia: {row[3]}")
-
-            self.fechar_aba_ate_fechar()
-
-            self.esperar(.5)
-            self.abrir_menu_2()
-
-            self.esperar(.5)
-            self.clicar_menu('Requisições')
-
-            self.esperar(.5)
-            
-            self.iframes()
-
-            #Mudando visualização
-            print("Mudando visualização")
-            self.esperar(.5)
-            self.clicar_v2(By.XPATH, '//*[@id="grdRequisicoes"]/thead/tr[1]/td[1]/table/tbody/tr/td[2]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-
-            #Clicando em insert
-            print("Clicando em insert")
-            self.clicar_v2(By.XPATH,'//*[@id="grdRequisicoes"]/thead/tr[1]/td[1]/table/tbody/tr/td[2]/table/tbody/tr/td[2]', 5)
-            self.esperar(.5)
-
-            # Buscando chave
-            print("Buscando chave da requisicao")
-            chave = self.buscar_valor(By.XPATH, '//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[1]/td[2]/table/tbody/tr/td[1]/input')
-            self.esperar(.5)
-            # apenas para debugar
-            print(chave)
-
-            #Inputando classe
-            print("Escrevendo classe")
-            self.clicar_v2(By.XPATH,'//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[1]/td[4]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-            self.escrever(By.XPATH,'//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[1]/td[4]/table/tbody/tr/td[1]/input', tipo_requisicao)
-            self.esperar(.5)
-            self.verificar_se_escreveu(By.XPATH, '//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[1]/td[4]/table/tbody/tr/td[1]/input', tipo_requisicao)
-            self.esperar(.5)
-
-            #Inputando requisitante
-            print("Escrevendo requisitante")
-            self.clicar_v2(By.XPATH,'//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[3]/td[2]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-            self.escrever(By.XPATH,'//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[3]/td[2]/table/tbody/tr/td[1]/input', requisitante_matricula)
-            self.esperar(.5)
-            self.verificar_se_escreveu(By.XPATH, '//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[3]/td[2]/table/tbody/tr/td[1]/input', requisitante_matricula)
-            self.esperar(.5)
-
-            #Aguardar erro
-            print("Aguardando erro")
-            self.sair_iframe()
-            self.esperar(.5)
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
-                enviar_status_via_api(id,erro,tipo_requisicao)
-                continue
-            self.esperar(.5)
-
-            #Inputando ccusto
-            print("Escrevendo ccusto")
-            self.iframes()
-            self.clicar_v2(By.XPATH, '//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[3]/td[4]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-            self.escrever(By.XPATH,'//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[3]/td[4]/table/tbody/tr/td[1]/input', ccusto_text)
-            self.esperar(.5)
-            self.verificar_se_escreveu(By.XPATH, '//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[3]/td[4]/table/tbody/tr/td[1]/input', ccusto_text)
-            self.esperar(.5)
+BARRA = '//*[@id="grdRequisicoes"]/thead/tr[1]/td[1]/table/tbody/tr/td[2]/table/tbody/tr'
+FORM = '//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody'
+BAIXA = '//*[@id="grdInfoBaixa"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody'
+BOTOES_PRINCIPAL = '/html/body/div[4]/div/div[1]/table/tbody/tr/td[2]/table/tbody/tr'
+
+# Passos de uma requisição na tela Requisições (ver core/fluxo_declarativo.py)
+PASSOS = [
+    Pausa(.5, intercalar=True),
+    Clicar(f'{BARRA}/td[1]', "Mudando visualização"),
+    Pausa(.5, intercalar=True),
+    Clicar(f'{BARRA}/td[2]', "Clicando em insert"),
+    Pausa(.5, intercalar=True),
+
+    Ler(f'{FORM}/tr[1]/td[2]/table/tbody/tr/td[1]/input', "chave", "Buscando chave da requisicao"),
+    Etapa(checkpoints.CHAVE_OBTIDA),
+    Pausa(.5, intercalar=True),
+
+    Campo(f'{FORM}/tr[1]/td[4]/table/tbody/tr/td[1]/input', "{classe}", rotulo="classe"),
+    Campo(f'{FORM}/tr[3]/td[2]/table/tbody/tr/td[1]/input', "{matricula}", rotulo="requisitante"),
+    Campo(f'{FORM}/tr[3]/td[4]/table/tbody/tr/td[1]/input', "{cc}", rotulo="ccusto"),
+    Campo(f'{FORM}/tr[5]/td[2]/table/tbody/tr/td[1]/input', "{item}", rotulo="recurso"),
+    Campo(f'{FORM}/tr[7]/td[3]/table/tbody/tr/td[1]/input', "{quantidade}", rotulo="quantidade"),
+    Campo(f'{FORM}/tr[9]/td[2]/table/tbody/tr/td[1]/textarea', "{obs}", COMMIT_EVENTO, rotulo="observação"),
+    Etapa(checkpoints.ITEM_ESCRITO),
+
+    Clicar(f'{BARRA}/td[4]', "Clicando em insert"),
+    Pausa(.5),
+    Clicar(f'{BARRA}/td[1]', "Mudando visualização"),
+    Pausa(1.5, intercalar=True),
+    Clicar('/html/body/table/tbody/tr[1]/td/div/form/table/tbody/tr[1]/td[1]/table/tbody/tr[4]/td[1]', "Selecionando checkbox"),
+    Pausa(.5, intercalar=True),
+    Clicar('//*[@id="buttonsBar_grdRequisicoes"]/td[1]', "Clicando em aprovar", verificar=True, alerta=ALERTA_AVISO),
+    Etapa(checkpoints.APROVADO),
+    Pausa(.5),
+
+    Clicar('//*[@id="buttonsBar_grdRequisicoes"]/td[3]', "Clicando em baixar"),
+    Pausa(.5),
+    Clicar(f'{BAIXA}/tr[1]/td[2]/table/tbody/tr/td[1]', "Escrevendo classe movimentação de depósito"),
+    Pausa(.5),
+    Digitar(f'{BAIXA}/tr[1]/td[2]/table/tbody/tr/td[1]/input', 'Movimentação de depósitos'),
+    Pausa(1),
+    Clicar('//*[@id="1"]', contexto=QUALQUER),
+    Pausa(.5),
+    Clicar('//*[@id="buttonsBar_grLookup"]/td[1]', contexto=QUALQUER, verificar=True),
+    Pausa(.5),
+    Clicar(f'{BAIXA}/tr[3]/td[2]/table/tbody/tr/td[1]', "Escrevendo depósito"),
+    Pausa(.5),
+    Digitar(f'{BAIXA}/tr[3]/td[2]/table/tbody/tr/td[1]/input', 'central'),
+    Pausa(.5),
+    Clicar(f'{BAIXA}/tr[5]/td[2]/table/tbody/tr/td[1]', "Escrevendo data de movimentação"),
+    Pausa(.5),
+    Digitar(f'{BAIXA}/tr[5]/td[2]/table/tbody/tr/td[1]/input', "{hoje}", conferir=True),
+    Pausa(.5),
+    Clicar(f'{BOTOES_PRINCIPAL}/td[1]', "Clicando em confirmar baixa", contexto=PRINCIPAL),
+    Pausa(.5),
+    Etapa(checkpoints.BAIXA_FEITA),
+
+    Clicar('//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[10]/td[7]/div', "Confirmando em confirmar"),
+    Pausa(.5),
+    Clicar(f'{BOTOES_PRINCIPAL}/td[2]', "Clicando em gravar", contexto=PRINCIPAL),
+    Pausa(.5),
+    Clicar('//*[@id="answers_0"]', "Clicando em confirmar gravação", contexto=PRINCIPAL, verificar=True, alerta=ALERTA_AVISO),
+    Etapa(checkpoints.GRAVADO),
+]
+
+# Dados da linha conferidos no cache de cadastros antes do ERP (ver core/cadastros.py)
+CADASTROS = {
+    "cc": ("centros_custo", "Centro de custo"),
+    "matricula": ("funcionarios", "Matrícula"),
+    "item": ("itens_solicitacao", "Recurso"),
+}
 
-            #Aguardar erro
-            print("Aguardando erro")
-            self.sair_iframe()
-            self.esperar(.5)
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
-                enviar_status_via_api(id,erro,tipo_requisicao)
-                continue
-            self.esperar(.5)
 
-            #Inputando recurso
-            print("Escrevendo recurso")
-            self.iframes()
-            self.clicar_v2(By.XPATH,'//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[5]/td[2]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-            self.escrever(By.XPATH,'//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[5]/td[2]/table/tbody/tr/td[1]/input', rec)
-            self.esperar(.5)
-            self.verificar_se_escreveu(By.XPATH, '//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[5]/td[2]/table/tbody/tr/td[1]/input', rec)
-            self.esperar(.5)
-
-            #Aguardar erro
-            print("Aguardando erro")
-            self.sair_iframe()
-            self.esperar(.5)
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.fechar_aba_ate_fechar()
-                enviar_status_via_api(id,erro,tipo_requisicao)
-                continue
-            self.esperar(.5)
-
-            #Inputando quantidade
-            print("Escrevendo quantidade")
-            self.iframes()
-            self.clicar_v2(By.XPATH,'//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[7]/td[3]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-            self.escrever(By.XPATH,'//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[7]/td[3]/table/tbody/tr/td[1]/input', qtd)
-            self.esperar(.5)
-            self.verificar_se_escreveu(By.XPATH, '//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[7]/td[3]/table/tbody/tr/td[1]/input', qtd)
-            self.esperar(.5)
-
-            #inputando Observação
-            print("Escrevendo observação")
-            self.clicar_v2(By.XPATH,'//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[9]/td[2]/table/tbody/tr/td[1]/textarea', 5)
-            self.esperar(.5)
-            self.escrever(By.XPATH,'//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[9]/td[2]/table/tbody/tr/td[1]/textarea', observacao_text)
-            self.esperar(.5)
-            self.verificar_se_escreveu(By.XPATH, '//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[1]/td/table/tbody/tr[9]/td[2]/table/tbody/tr/td[1]/textarea', observacao_text)
-            self.esperar(.5)
-
-            #Clicando em confirmar (insert)
-            print("Clicando em insert")
-            self.clicar_v2(By.XPATH,'//*[@id="grdRequisicoes"]/thead/tr[1]/td[1]/table/tbody/tr/td[2]/table/tbody/tr/td[4]', 5)
-            self.esperar(.5)
-
-            # mudar visualização
-            print("Mudando visualização")
-            self.clicar_v2(By.XPATH, '//*[@id="grdRequisicoes"]/thead/tr[1]/td[1]/table/tbody/tr/td[2]/table/tbody/tr/td[1]', 5)
-            self.esperar(1.5)
-            
-            # selecionando checkbox
-            print("Selecionando checkbox")
-            self.clicar_v2(By.XPATH, '/html/body/table/tbody/tr[1]/td/div/form/table/tbody/tr[1]/td[1]/table/tbody/tr[4]/td[1]', 5)
-            self.esperar(.5)
-
-            # clicando em aprovar
-            print("Clicando em aprovar")
-            self.clicar_v2(By.XPATH, '//*[@id="buttonsBar_grdRequisicoes"]/td[1]', 5)
-            self.esperar(.5)
-
-            #Aguardar erro
-            print("Aguardando erro")
-            self.sair_iframe()
-            self.esperar(.5)
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
-                enviar_status_via_api(id,erro,tipo_requisicao)
-                continue
-            self.esperar(.5)
-
-            print("Aguardando alerta")
-            alerta = self.obter_mensagem_alert()
-            if alerta:
-                print(f"[ALERTA] Apenas um alerta: {alerta}")
-            self.esperar(.5)                
-
-            # clicando em baixar
-            print("Clicando em baixar")
-            self.iframes()
-            self.clicar_v2(By.XPATH,'//*[@id="buttonsBar_grdRequisicoes"]/td[3]', 5)
-            self.esperar(.5)
-
-            # preenchendo classe movimentação de depósito
-            print("Escrevendo classe movimentação de depósito")
-            self.clicar_v2(By.XPATH,'//*[@id="grdInfoBaixa"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[1]/td[2]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-            self.escrever(By.XPATH,'//*[@id="grdInfoBaixa"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[1]/td[2]/table/tbody/tr/td[1]/input', 'Movimentação de depósitos')
-            self.esperar(.5)
-            # self.verificar_se_escreveu(By.XPATH, '//*[@id="grdInfoBaixa"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[1]/td[2]/table/tbody/tr/td[1]/input', 'Movimentação de depósitos')
-            self.esperar(.5)
-            self.clicar_v2(By.XPATH,'//*[@id="1"]', 5)
-            self.esperar(.5)
-            self.clicar_v2(By.XPATH,'//*[@id="buttonsBar_grLookup"]/td[1]', 5)
-            self.esperar(.5)
-            print("Aguardando erro")
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
-                # devolve erro pro banco
-                enviar_status_via_api(id,erro,tipo_requisicao)
-                continue
-            self.esperar(.5)
-
-            # Preenchendo depósito
-            print("Escrevendo depósito")
-            self.clicar_v2(By.XPATH,'//*[@id="grdInfoBaixa"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[3]/td[2]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-            self.escrever(By.XPATH,'//*[@id="grdInfoBaixa"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[3]/td[2]/table/tbody/tr/td[1]/input', 'central')
-            self.esperar(.5)
-
-            # Preenchendo data de movimentação
-            print("Escrevendo data de movimentação")
-            self.clicar_v2(By.XPATH,'//*[@id="grdInfoBaixa"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[5]/td[2]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-            self.escrever(By.XPATH,'//*[@id="grdInfoBaixa"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[5]/td[2]/table/tbody/tr/td[1]/input', datetime.datetime.now().date().strftime('%d/%m/%Y'))
-            self.esperar(.5)
-            self.verificar_se_escreveu(By.XPATH, '//*[@id="grdInfoBaixa"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[5]/td[2]/table/tbody/tr/td[1]/input', datetime.datetime.now().date().strftime('%d/%m/%Y'))
-            self.esperar(.5)
+class RequisitarItem(BaseERP):
 
-            # clicando em confirmar baixa
-            print("Clicando em confirmar baixa")
-            self.sair_iframe()
-            self.esperar(.5)
-            self.clicar_v2(By.XPATH,'/html/body/div[4]/div/div[1]/table/tbody/tr/td[2]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
+    tipo_menu = 2
 
-            self.iframes()
-            self.esperar(.5)
+    def _reportar(self, dados, status, chave=None):
+        """Devolve o status da requisição para o banco e guarda o resultado da linha."""
+        enviar_status_via_api(dados["id"], status, dados["classe"], chave)
+        self.resultados.append({"id": dados["id"], "status": status, "chave": chave})
 
-            # clicar em confirmar    
-            print("Confirmando em confirmar")
-            self.clicar_v2(By.XPATH,'//*[@id="grdRequisicoes"]/tbody/tr[1]/td[1]/table/tbody/tr[10]/td[7]/div', 5)
-            self.esperar(.5)
+    def executar(self, rows):
 
-            # clicando em gravar
-            print("Clicando em gravar")
-            self.sair_iframe()
-            self.clicar_v2(By.XPATH, '/html/body/div[4]/div/div[1]/table/tbody/tr/td[2]/table/tbody/tr/td[2]', 5)
-            self.esperar(.5)
+        """
+        Função principal do fluxo.
+        Com abas_simultaneas > 1 várias requisições ficam em andamento, cada
+        uma em uma aba de Requisições (ver core/multiaba.py).
+        Retorna a lista de resultados ({id, status, chave}) das linhas reportadas.
+        """
 
-            # confirmar_gravacao
-            print("Clicando em confirmar gravação")
-            self.clicar_v2(By.XPATH, '//*[@id="answers_0"]', 5)
-            self.esperar(.5)
+        self.resultados = []
+        self.motor = MotorFluxo(self, PASSOS, self._reportar, TIPO_LINHA, validador(CADASTROS))
+
+        # Linhas com cadastro inválido são recusadas antes de abrir a tela
+        rows = [row for row in rows if not self.motor.recusar(self._dados(row))]
+
+        if self.abas_simultaneas > 1:
+            ExecutorMultiAba(self, 'Requisições', self.passos_linha, self.abas_simultaneas).executar(rows)
+        else:
+            executar_sequencial(self, 'Requisições', self.passos_linha, rows)
+
+        return self.resultados
+
+    def _dados(self, row):
+        """Dados da requisição usados nos passos (ver PASSOS)."""
+        return {
+            "id": row[0],
+            "quantidade": row[1],
+            "obs": row[2] if row[2] else ' ',
+            "classe": row[4],
+            "cc": row[5],
+            "matricula": row[6],
+            "item": row[7],
+            "hoje": datetime.datetime.now().date().strftime('%d/%m/%Y'),
+        }
+
+    def passos_linha(self, row):
+        """
+        Passos de uma requisição, como gerador de Espera (ver PASSOS).
+        Uma linha que já foi gravada antes de o bot cair só tem o status reportado.
+        """
+        dados = self._dados(row)
 
-            print("Aguardando erro")
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
-                # devolve erro pro banco
-                enviar_status_via_api(id,erro,tipo_requisicao)
-                continue
-            self.esperar(.5)
+        print('-------------------------------------------------------')
+        print(f"[INFO] Indo para item {dados['item']}\nRequisitado por: {dados['matricula']}\nRequisitado no dia: {row[3]}")
 
-            print("Aguardando alerta")
-            alerta = self.obter_mensagem_alert()
-            if alerta:
-                print(f"[ALERTA] Apenas um alerta: {alerta}")
-                enviar_status_via_api(id,'OK',tipo_requisicao,chave)
-                # devolve sucesso pro banco
-            self.esperar(.5)                
+        return self.motor.linha(dados)
@@ -1,82 +1,97 @@
-import os
-
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-
-from bots.requisitarItem.requisicoes import verificar_requisicoes
+import sys
+import time
+from contextlib import nullcontext
+
+from bots.requisitarItem.requisicoes import (
+    CANAL_NOTIFICACAO,
+    TIPO_LINHA,
+    instalar_notificacao,
+    notificacao_instalada,
+    manter_reserva,
+    reservar_requisicoes,
+    verificar_requisicoes,
+)
 from bots.requisitarItem.flow import RequisitarItem
-from core.db import get_erp_credentials_for_bot, get_headless_mode_for_bot
+from core.db import OuvinteNotificacao, get_bot_flag, get_bot_setting, get_workers_for_bot
+from core.pool_sessoes import PoolSessoes
+from core.reservas import id_worker
+from core.tentativas import registrar_resultado
 
 
 def main():
 
     name_bot = 'requisitar_item'
 
-    while True:
-        
-        rows = verificar_requisicoes()  
-    
-        try:
-
-            if rows:
-                print(f"Encontradas {len(rows)} requisições a serem processadas.")
-
-                headless = get_headless_mode_for_bot(name_bot)
-                options = Options()
-                if headless:
-                    options.add_argument("--headless=new")
-
-                driver = webdriver.Chrome(options=options)
-
-                # Registra o PID do chromedriver em arquivo para o gerenciador poder encerrar apenas este navegador
-                pid_file = os.getenv("BOT_PID_FILE")
-                try:
-                    service = getattr(driver, "service", None)
-                    process = getattr(service, "process", None) if service else None
-                    driver_pid = getattr(process, "pid", None) if process else None
-
-                    if pid_file and driver_pid is not None:
-                        with open(pid_file, "w", encoding="utf-8") as f:
-                            f.write(str(driver_pid))
-                except Exception:
-                    # Se não conseguir registrar, apenas segue a execução normal
-                    pass
-
-                fluxo = RequisitarItem(driver)
-
-                try:
-                    fluxo.abrir_url_140()
-
-                    creds = get_erp_credentials_for_bot(name_bot)
-                    login = creds.get("erp_username")
-                    senha = creds.get("erp_password")
-
-                    fluxo.login(login, senha)
-                    fluxo.esperar(5)
-
-                    # abre menu
-                    fluxo.abrir_menu_2()
+    # Modo sessão persistente: os navegadores continuam logados entre os ciclos
+    persistente = get_bot_flag(name_bot, "ERP_SESSAO_PERSISTENTE")
+    intervalo_poll = float(get_bot_setting(name_bot, "ERP_INTERVALO_POLL_S", "30"))
+
+    # Modo eventos: espera o NOTIFY do banco em vez de consultar a cada ciclo;
+    # a consulta completa só roda ao ser avisado ou no intervalo de segurança
+    eventos = get_bot_flag(name_bot, "ERP_MODO_EVENTOS")
+    ouvinte = None
+    if eventos:
+        if notificacao_instalada() is False:
+            print("[AVISO] Gatilho de notificação não instalado: só a consulta de segurança vai achar novas linhas. "
+                  "Instale com: python -m bots.requisitarItem.main --instalar-gatilho")
+        intervalo_poll = float(get_bot_setting(name_bot, "ERP_INTERVALO_FALLBACK_S", "300"))
+        ouvinte = OuvinteNotificacao(CANAL_NOTIFICACAO)
+        # LISTEN antes da primeira consulta para não perder avisos
+        ouvinte.aguardar(0)
+
+    # Quantidade de sessões Innovaro em paralelo (configurada no gerenciador)
+    workers = get_workers_for_bot(name_bot)
+    pool = PoolSessoes(name_bot, RequisitarItem, workers)
+
+    # Reserva de linhas: permite várias instâncias do bot na mesma fila
+    usar_reserva = get_bot_flag(name_bot, "ERP_RESERVA_LINHAS")
+    limite_reserva = int(get_bot_setting(name_bot, "ERP_RESERVA_LIMITE", "10"))
+    duracao_reserva = float(get_bot_setting(name_bot, "ERP_RESERVA_DURACAO_S", "300"))
+    worker_id = id_worker(name_bot)
+
+    try:
+        while True:
+
+            if usar_reserva:
+                rows = reservar_requisicoes(worker_id, limite_reserva, duracao_reserva)
+            else:
+                rows = verificar_requisicoes()
 
-                    fluxo.clicar_menu("Estoque")
-                    fluxo.clicar_menu("Requisição")
+            try:
 
-                    # fecha menu
-                    fluxo.abrir_menu_2()
+                if rows:
+                    print(f"Encontradas {len(rows)} requisições a serem processadas ({workers} worker(s)).")
 
-                    fluxo.executar(rows)
-                finally:
                     try:
-                        driver.quit()
-                    except Exception:
-                        pass
-            else:
-                return "[INFO] Nenhuma requisição pendente encontrada."
-        except:
-            pass
+                        reserva = manter_reserva(rows, worker_id, duracao_reserva) if usar_reserva else nullcontext()
+                        with reserva:
+                            resultados = pool.processar(rows)
+                        for worker, itens in resultados.items():
+                            # Linhas que derrubaram o navegador também contam como tentativa
+                            for item in itens:
+                                if item["status"] is None and item.get("tentativa", True):
+                                    registrar_resultado(TIPO_LINHA, item["id"], item.get("erro"))
+                            falhas = sum(1 for item in itens if item["status"] != 'OK')
+                            print(f"[INFO] {worker}: {len(itens)} requisição(ões) processada(s), {falhas} com erro.")
+                    finally:
+                        if not persistente:
+                            pool.encerrar()
+
+                elif ouvinte is not None:
+                    ouvinte.aguardar(intervalo_poll)
+                elif persistente:
+                    time.sleep(intervalo_poll)
+                else:
+                    return "[INFO] Nenhuma requisição pendente encontrada."
+            except:
+                pass
+    finally:
+        pool.encerrar()
+        if ouvinte is not None:
+            ouvinte.fechar()
 
 if __name__ == "__main__":
+    if "--instalar-gatilho" in sys.argv[1:]:
+        # Instalação única do gatilho do modo eventos (DDL na tabela do Django)
+        sys.exit(0 if instalar_notificacao() else 1)
     main()
-
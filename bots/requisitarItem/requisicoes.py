@@ -1,22 +1,76 @@
 import os
-import json
-import requests
 from psycopg2.extras import DictCursor  # Para retornar resultados como dicionários
 from dotenv import load_dotenv
 
-from core.db import get_db_connection
+from core.db import gatilho_notificacao_instalado, get_db_connection, instalar_gatilho_notificacao
+from core.reservas import ReservaLote, concluir, liberar, reservar
+from core.outbox import chaves_pendentes, enfileirar
+from core.tentativas import filtro_pendentes, registrar_resultado
+
+# Canal do NOTIFY disparado quando data_entrega é preenchida (ver instalar_notificacao)
+CANAL_NOTIFICACAO = "rpa_requisicoes"
+TABELA_SOLICITACOES = "apontamento_v2.solicitacao_almox_solicitacaorequisicao"
+
+# Endpoint que recebe o status das requisições
+DJANGO_API_URL = "https://apontamentousinagem.onrender.com/core/api/rpa/update-status/"
+
+# Tipo da linha nas tabelas de reservas e de tentativas do RPA
+TIPO_LINHA = "requisicao"
+
+
+def consulta_pendentes():
+    """
+    (id, ordem) das pendentes para as reservas (ver core/reservas.py), sem as
+    linhas em quarentena/espera. A ordem põe linhas sem falhas primeiro e,
+    dentro do mesmo número de tentativas, as solicitações mais antigas.
+    """
+    tentativas = filtro_pendentes(TIPO_LINHA, "sr")
+    return f"""
+        SELECT sr.id, row_number() OVER (ORDER BY {tentativas["ordem"]} sr.data_solicitacao, sr.id)
+        FROM {TABELA_SOLICITACOES} sr
+        {tentativas["join"]}
+        WHERE sr.data_entrega IS NOT NULL
+          AND (sr.rpa IS NULL OR sr.rpa != 'OK')
+          {tentativas["where"]}
+    """
 
 load_dotenv()
 
-def verificar_requisicoes():
+def instalar_notificacao():
+    """
+    Instala o gatilho que avisa o bot de novas requisições liberadas (data_entrega).
+    Instalação única, fora da partida do bot: python -m bots.requisitarItem.main --instalar-gatilho
+    """
+    return instalar_gatilho_notificacao(TABELA_SOLICITACOES, CANAL_NOTIFICACAO)
+
+
+def notificacao_instalada():
+    """Se o gatilho de instalar_notificacao existe (None se o banco estiver fora)."""
+    return gatilho_notificacao_instalado(TABELA_SOLICITACOES, CANAL_NOTIFICACAO)
+
+
+def verificar_requisicoes(ids=None):
+    """
+    Retorna as requisições pendentes (data_entrega preenchida e rpa diferente de OK).
+    Com `ids`, restringe às requisições informadas (ex.: as reservadas por este bot).
+    """
     try:
         # Conectar ao banco de dados PostgreSQL usando configuração do .env
         conn = get_db_connection()
 
         cursor = conn.cursor(cursor_factory=DictCursor)  # Usa DictCursor para obter resultados como dicionários
 
+        # Status já decidido, aguardando entrega ao Django: não refaz a linha.
+        # Lido antes da consulta: uma mensagem entregue entre as duas leituras
+        # já terá rpa atualizado no banco e não volta como pendente.
+        aguardando_envio = chaves_pendentes(DJANGO_API_URL)
+
+        filtro_ids = "AND sr.id = ANY(%s)" if ids is not None else ""
+        # Fora as linhas em quarentena ou aguardando nova tentativa; novas primeiro
+        tentativas = filtro_pendentes(TIPO_LINHA, "sr")
+
         # Executar a consulta com junção
-        query = """
+        query = f"""
             SELECT
                 sr.id,
                 sr.quantidade,
@@ -38,17 +92,20 @@ def verificar_requisicoes():
                 apontamento_v2.cadastro_almox_funcionario f ON sr.funcionario_id = f.id
             LEFT JOIN
                 apontamento_v2.cadastro_almox_itenssolicitacao i ON sr.item_id = i.id
+            {tentativas["join"]}
             WHERE
                 sr.data_entrega IS NOT NULL
                 AND (sr.rpa IS NULL OR sr.rpa != 'OK')
+                {tentativas["where"]}
+                {filtro_ids}
                 -- AND data_solicitacao >= date_trunc('month', CURRENT_DATE)
             ORDER BY
-                sr.data_solicitacao;
+                {tentativas["ordem"]} sr.data_solicitacao;
         """
 
-        cursor.execute(query)
+        cursor.execute(query, (list(ids),) if ids is not None else None)
         rows = cursor.fetchall()
-        return rows
+        return [row for row in rows if str(row[0]) not in aguardando_envio]
 
     except Exception as e:
         print(f"Erro ao conectar ao banco de dados ou executar a consulta: {e}")
@@ -67,14 +124,45 @@ def verificar_requisicoes():
             pass
 
 
+def reservar_requisicoes(worker, limite, duracao_s=300):
+    """
+    Reserva até `limite` requisições pendentes para `worker` (SKIP LOCKED) e
+    retorna as linhas completas, como verificar_requisicoes. Outras instâncias
+    não recebem essas linhas até a reserva ser liberada ou vencer.
+    """
+    try:
+        # Linhas com status na caixa de saída ficam fora do lote: reservá-las só
+        # devolveria um lote vazio e o bot pararia com outras linhas pendentes
+        aguardando_envio = chaves_pendentes(DJANGO_API_URL)
+        ids = reservar(TIPO_LINHA, consulta_pendentes(), worker, limite, duracao_s, excluir=aguardando_envio)
+    except Exception as e:
+        print(f"Erro ao reservar requisições pendentes: {e}")
+        return []
+
+    if not ids:
+        return []
+    rows = verificar_requisicoes(ids)
+    # Linhas que deixaram de estar pendentes entre a reserva e a leitura voltam para a fila
+    try:
+        liberar(TIPO_LINHA, set(ids) - {row[0] for row in rows}, worker)
+    except Exception as e:
+        # Sem liberar, a reserva apenas vence no tempo normal
+        print(f"[AVISO] Falha ao liberar reservas: {e}")
+    return rows
+
+
+def manter_reserva(rows, worker, duracao_s=300):
+    """Renova a reserva das linhas enquanto o bloco roda e libera ao final (ver ReservaLote)."""
+    return ReservaLote(TIPO_LINHA, [row[0] for row in rows], worker, duracao_s)
+
+
 def enviar_status_via_api(requisicao_id, status, tipo_requisicao, chave=None):
     """
     Envia o status de uma requisição para a API do Django.
+    O status vai para a caixa de saída local (core/outbox.py) e é entregue em
+    segundo plano; a função não espera a rede.
     """
-    # --- Configuração da API ---
-    DJANGO_API_URL = "https://apontamentousinagem.onrender.com/core/api/rpa/update-status/"
     # RPA_API_KEY = os.getenv("RPA_API_KEY", "dfjf6348964jgjdofj58690yfndjwe395igjd032054kghbdpgçblej389503k2quf78rj5iy90gkmnj4u8rjfksk")
-    # ---------------------------
 
     payload = {
         "id": requisicao_id,
@@ -87,17 +175,15 @@ def enviar_status_via_api(requisicao_id, status, tipo_requisicao, chave=None):
     #     "X-API-KEY": RPA_API_KEY,
     # }
 
+    # Conta a falha (espera exponencial / quarentena) ou zera o histórico no sucesso
+    registrar_resultado(TIPO_LINHA, requisicao_id, status)
+
     try:
-        response = requests.post(DJANGO_API_URL, data=json.dumps(payload), timeout=20)
-        if response.status_code == 200:
-            print(f"➜ API: Status da requisição {requisicao_id} enviado com sucesso.")
-            return True
-        else:
-            print(
-                f"✗ API ERRO ({response.status_code}): Falha ao enviar status para a requisição "
-                f"{requisicao_id}. Resposta: {response.text}"
-            )
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"✗ API ERRO: Impossível conectar ao servidor Django. Erro: {e}")
+        enfileirar(DJANGO_API_URL, payload, descricao=f"da requisição {requisicao_id}",
+                   checkpoint=TIPO_LINHA)
+        # A reserva fica retida até a entrega: outras instâncias ainda veem a linha pendente
+        concluir(TIPO_LINHA, requisicao_id)
+        return True
+    except Exception as e:
+        print(f"✗ Falha ao gravar status da requisição {requisicao_id} na caixa de saída: {e}")
         return False
@@ -1,10 +1,12 @@
 from selenium.webdriver.common.by import By
 
 from core.erp_core import BaseERP
-from .saldo_ao_vivo import inserir_gspread_saldo_central_mp, apagar_ultimo_download
+from core.seletores import SALDOS
+from .saldo_ao_vivo import inserir_gspread_saldo_central_mp, apagar_ultimo_download, download_concluido
 from .saldo_ao_vivo import inserir_gspread_saldo_levantamento, inserir_gspread_saldo_levantamento_incluindo_em_processo,inserir_postgres_saldo_central_mp
 
 import datetime
+import time
 
 class SaldoAoVivo(BaseERP):
 
@@ -14,33 +16,27 @@ class SaldoAoVivo(BaseERP):
         Função principal do fluxo.
         """
         
-        # abre menu
-        self.abrir_menu_1()
-
-        self.clicar_menu("Estoque")
-        self.clicar_menu("Consultas")
-        self.clicar_menu("Saldos de Recursos - CEMAG")
+        self.garantir_tela("Saldos de Recursos - CEMAG")
         self.esperar(2)
 
         # inputando data
-        self.iframes()
-        self.escrever(By.XPATH, '/html/body/div[2]/form/table/tbody/tr[1]/td[1]/table/tbody/tr[2]/td/table/tbody/tr[3]/td[2]/table/tbody/tr/td[1]/input', 'h')
+        self.escrever(*self.localizar(SALDOS["data"]), 'h')
         self.esperar(.5)
 
         # Inputando o depósito
-        self.escrever(By.XPATH, '//*[@id="vars"]/tbody/tr[1]/td[1]/table/tbody/tr[8]/td/table/tbody/tr[3]/td[2]/table/tbody/tr/td[1]/input', 'Almox Central')
+        self.escrever(*self.localizar(SALDOS["deposito"]), 'Almox Central')
         self.esperar(.5)
 
         # Limpar campo de recursos
-        self.escrever(By.XPATH, '/html/body/div[2]/form/table/tbody/tr[1]/td[1]/table/tbody/tr[10]/td/table/tbody/tr[3]/td[2]/table/tbody/tr/td[1]/input', '')
+        self.escrever(*self.localizar(SALDOS["recursos"]), '')
         self.esperar(.5)
 
         # Inserir agrupamentos central mp
-        self.escrever(By.XPATH, '/html/body/div[2]/form/table/tbody/tr[1]/td[1]/table/tbody/tr[20]/td/table/tbody/tr[5]/td[2]/table/tbody/tr/td[1]/input', 'Etapa')
+        self.escrever(*self.localizar(SALDOS["agrupamento"]), 'Etapa')
         self.esperar(.5)
 
         # Inserir agrupamentos almox
-        self.escrever(By.XPATH, '/html/body/div[2]/form/table/tbody/tr[1]/td[1]/table/tbody/tr[20]/td/table/tbody/tr[5]/td[2]/table/tbody/tr/td[1]/input', 'Classe de Recursos')
+        self.escrever(*self.localizar(SALDOS["agrupamento"]), 'Classe de Recursos')
         self.esperar(.5)
 
         # exportar primeira tela
@@ -62,8 +58,9 @@ class SaldoAoVivo(BaseERP):
 
         # clique aqui para fazer download do arquivo
         self.iframes()
+        inicio_download = time.time()
         self.clicar_v2(By.XPATH, "/html/body/span", 5)
-        self.esperar(10)
+        self.esperar(10, condicao=lambda: download_concluido(inicio_download))
 
         # Inserir no google sheets
         inserir_gspread_saldo_central_mp()
@@ -82,26 +79,24 @@ class SaldoAoVivo(BaseERP):
         apagar_ultimo_download()
 
         # Ir para saldo de recurso MP
-        self.abrir_menu_1()
-        self.clicar_menu("Saldos de Recursos - CEMAG")
+        self.garantir_tela("Saldos de Recursos - CEMAG")
 
         print("Indo para saldo levantamento")
 
         # Inputando o depósito
-        self.iframes()
-        self.escrever(By.XPATH, '//*[@id="vars"]/tbody/tr[1]/td[1]/table/tbody/tr[8]/td/table/tbody/tr[3]/td[2]/table/tbody/tr/td[1]/input', '')
+        self.escrever(*self.localizar(SALDOS["deposito"]), '')
         self.esperar(.5)
 
         # Limpar campo de recursos
-        self.escrever(By.XPATH, '/html/body/div[2]/form/table/tbody/tr[1]/td[1]/table/tbody/tr[10]/td/table/tbody/tr[3]/td[2]/table/tbody/tr/td[1]/input', '')
+        self.escrever(*self.localizar(SALDOS["recursos"]), '')
         self.esperar(.5)
 
         # Apagar mat prima
-        self.escrever(By.XPATH, '/html/body/div[2]/form/table/tbody/tr[1]/td[1]/table/tbody/tr[10]/td/table/tbody/tr[15]/td[2]/table/tbody/tr/td[1]/input', '')
+        self.escrever(*self.localizar(SALDOS["materia_prima"]), '')
         self.esperar(.5)
 
         # Campo de agrupamento
-        self.escrever(By.XPATH, '/html/body/div[2]/form/table/tbody/tr[1]/td[1]/table/tbody/tr[20]/td/table/tbody/tr[5]/td[2]/table/tbody/tr/td[1]/input', 'Etapa')
+        self.escrever(*self.localizar(SALDOS["agrupamento"]), 'Etapa')
         self.esperar(.5)
 
         # exportar primeira tela
@@ -123,8 +118,9 @@ class SaldoAoVivo(BaseERP):
 
         # clique aqui para fazer download do arquivo
         self.iframes()
+        inicio_download = time.time()
         self.clicar_v2(By.XPATH, "/html/body/span", 5)
-        self.esperar(10)
+        self.esperar(10, condicao=lambda: download_concluido(inicio_download))
 
         # Inserir no google sheets
         inserir_gspread_saldo_levantamento()
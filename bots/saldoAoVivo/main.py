@@ -8,7 +8,8 @@ from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 
 from bots.saldoAoVivo.flow import SaldoAoVivo
-from core.db import get_erp_credentials_for_bot, get_headless_mode_for_bot
+from core import rastreio
+from core.db import get_bot_flag, get_erp_credentials_for_bot, get_headless_mode_for_bot, get_wait_mode_for_bot
 
 def main():
 
@@ -28,6 +29,8 @@ def main():
         options.add_argument("--headless=new")
 
     driver = webdriver.Chrome(options=options)
+    if get_bot_flag(name_bot, "ERP_RASTREIO"):
+        rastreio.rastrear(driver)
 
     # Registra o PID do chromedriver em arquivo para o gerenciador poder encerrar apenas este navegador
     pid_file = os.getenv("BOT_PID_FILE")
@@ -43,7 +46,7 @@ def main():
         # Se não conseguir registrar, apenas segue a execução normal
         pass
 
-    fluxo = SaldoAoVivo(driver)
+    fluxo = SaldoAoVivo(driver, modo_espera=get_wait_mode_for_bot(name_bot))
 
     try:
         fluxo.abrir_url_140()
@@ -43,6 +43,23 @@ def ultimo_arquivo():
     
     return df
 
+def download_concluido(desde):
+    """
+    Indica se terminou algum download na pasta "Downloads" depois de `desde`
+    (timestamp). Arquivos parciais do Chrome (.crdownload/.tmp) não contam.
+    """
+    caminho_downloads = os.path.join(os.path.expanduser("~"), "Downloads")
+    arquivos = [f for f in glob.glob(os.path.join(caminho_downloads, "*")) if os.path.isfile(f)]
+
+    if not arquivos:
+        return False
+
+    if any(f.endswith((".crdownload", ".tmp")) for f in arquivos):
+        return False
+
+    mais_recente = max(arquivos, key=os.path.getmtime)
+    return os.path.getmtime(mais_recente) >= desde
+
 def inserir_postgres_saldo_central_mp(df=None, tabela='ConsultaSaldoInnovaro'):
     """
     Insere ou atualiza os dados do dataframe na tabela PostgreSQL especificada
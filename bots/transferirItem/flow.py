@@ -1,240 +1,130 @@
-from selenium.webdriver.common.by import By
-
+from core import checkpoints
+from core.cadastros import validador
 from core.erp_core import BaseERP
-from bots.transferirItem.transferencias import enviar_status_via_api
+from core.fluxo_declarativo import (
+    ALERTA_AVISO,
+    ALERTA_ERRO,
+    PRINCIPAL,
+    AguardarElemento,
+    Campo,
+    Clicar,
+    Digitar,
+    Etapa,
+    Ler,
+    MotorFluxo,
+    Pausa,
+)
+from core.multiaba import ExecutorMultiAba, executar_sequencial
+from bots.transferirItem.transferencias import TIPO_LINHA, enviar_status_via_api
+
+
+TELA = 'Solicitação de transferência entre depósitos'
+
+BARRA = '//*[@id="solicitacoes"]/thead/tr[1]/td[1]/table/tbody/tr/td[2]/table/tbody/tr'
+FORM = '//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody'
+BOTOES_PRINCIPAL = '/html/body/div[4]/div/div[1]/table/tbody/tr/td[2]/table/tbody/tr'
+
+# Passos de uma transferência (ver core/fluxo_declarativo.py)
+PASSOS = [
+    Pausa(.5, intercalar=True),
+    Clicar(f'{BARRA}/td[1]', "Mudando visualização"),
+    Pausa(.5, intercalar=True),
+    Clicar(f'{BARRA}/td[2]', "Clicando em insert"),
+    Pausa(.5, intercalar=True),
+
+    Ler(f'{FORM}/tr[3]/td[2]/table/tbody/tr/td[1]/input', "chave", "Buscando chave da transferência"),
+    Etapa(checkpoints.CHAVE_OBTIDA),
+    Pausa(.5, intercalar=True),
+
+    Campo(f'{FORM}/tr[11]/td[2]/table/tbody/tr/td[1]/input', "{dep_origem}", rotulo="depósito origem"),
+    Campo(f'{FORM}/tr[13]/td[2]/table/tbody/tr/td[1]/input', "{dep_destino}", rotulo="depósito destino"),
+    Campo(f'{FORM}/tr[15]/td[2]/table/tbody/tr/td[1]/input', "{rec}", rotulo="recurso"),
+    Campo(f'{FORM}/tr[25]/td[2]/table/tbody/tr/td[1]/input', "{qtd}", rotulo="quantidade"),
+    Etapa(checkpoints.ITEM_ESCRITO),
+
+    Clicar(f'{BARRA}/td[4]', "Clicando em insert"),
+    Pausa(.5),
+    Clicar('//*[@id="buttonsBar_solicitacoes"]/td[1]', 'clicando em aprovar'),
+    AguardarElemento('//*[@id="confirm"]', "Aguardando modal para confirmar"),
+    Pausa(1),
+    Clicar('//*[@id="confirm"]', contexto=PRINCIPAL),
+    Pausa(.5),
+    Etapa(checkpoints.APROVADO),
+
+    Clicar('//*[@id="buttonsBar_solicitacoes"]/td[3]', 'clicando em baixar'),
+    Pausa(1.5),
+    Digitar('//*[@id="informaçõesDaBaixa"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr/td[2]/table/tbody/tr/td[1]/input', 'h'),
+    Pausa(1.5),
+    Clicar(f'{BOTOES_PRINCIPAL}/td', "Confirmando baixa", contexto=PRINCIPAL, verificar=True, alerta=ALERTA_ERRO),
+    Etapa(checkpoints.BAIXA_FEITA),
+
+    Clicar(f'{BOTOES_PRINCIPAL}/td[2]', "Clicar em gravar", contexto=PRINCIPAL, verificar=True, alerta=ALERTA_AVISO),
+    Etapa(checkpoints.GRAVADO),
+]
+
+# Dados da linha conferidos no cache de cadastros antes do ERP (ver core/cadastros.py)
+CADASTROS = {
+    "rec": ("itens_transferencia", "Recurso"),
+    "dep_destino": ("depositos_destino", "Depósito destino"),
+}
 
-import datetime
 
 class TransferirItem(BaseERP):
 
+    def _reportar(self, dados, status, chave=None):
+        """Devolve o status da transferência para o banco e guarda o resultado da linha."""
+        enviar_status_via_api(
+            transferencia_id=dados["id"],
+            status=status,
+            dep_destino=dados["dep_destino"],
+            rec=dados["rec"],
+            qtd=dados["qtd"],
+            observacao=dados["observacao"],
+            chave=chave
+        )
+        self.resultados.append({"id": dados["id"], "status": status, "chave": chave})
+
     def executar(self, rows):
-        
+
         """
         Função principal do fluxo.
+        Com abas_simultaneas > 1 várias transferências ficam em andamento,
+        cada uma em uma aba da tela (ver core/multiaba.py).
+        Retorna a lista de resultados ({id, status, chave}) das linhas reportadas.
+        """
+
+        self.resultados = []
+        self.motor = MotorFluxo(self, PASSOS, self._reportar, TIPO_LINHA, validador(CADASTROS))
+
+        # Linhas com cadastro inválido são recusadas antes de abrir a tela
+        rows = [row for row in rows if not self.motor.recusar(self._dados(row))]
+
+        if self.abas_simultaneas > 1:
+            ExecutorMultiAba(self, TELA, self.passos_linha, self.abas_simultaneas).executar(rows)
+        else:
+            executar_sequencial(self, TELA, self.passos_linha, rows)
+
+        return self.resultados
+
+    def _dados(self, row):
+        """Dados da transferência usados nos passos (ver PASSOS)."""
+        return {
+            "id": row[0],
+            "qtd": row[1],
+            "rec": row[5],
+            "dep_destino": row[6],
+            "observacao": row[8] if row[8] else ' ',
+            "dep_origem": 'almox central',
+        }
+
+    def passos_linha(self, row):
+        """
+        Passos de uma transferência, como gerador de Espera (ver PASSOS).
+        Uma linha que já foi gravada antes de o bot cair só tem o status reportado.
         """
+        dados = self._dados(row)
+
+        print('-------------------------------------------------------')
+        print(f"[INFO] Indo para item {dados['rec']}\nDepósito destino: {dados['dep_destino']}\nRequisitado no dia: {row[3]}")
 
-        # Loop infinito para realizar as requsições
-        for row in rows:
-            id = row[0]
-            qtd = row[1]
-            rec = row[5]
-            dep_destino = row[6]
-            observacao_text = row[8] if row[8] else ' '
-            dep_origem = 'almox central'
-
-            print('-------------------------------------------------------')
-            print(f"[INFO] Indo para item {rec}\nDepósito destino: {dep_destino}\nRequisitado no dia: {row[3]}")
-
-            self.fechar_aba_ate_fechar()
-
-            self.esperar(.5)
-            self.abrir_menu_1()
-
-            self.esperar(.5)
-            self.clicar_menu('Solicitação de transferência entre depósitos')
-
-            self.esperar(.5)
-            
-            self.iframes()
-
-            #Mudando visualização
-            print("Mudando visualização")
-            self.esperar(.5)
-            self.clicar_v2(By.XPATH, '//*[@id="solicitacoes"]/thead/tr[1]/td[1]/table/tbody/tr/td[2]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-
-            #Clicando em insert
-            print("Clicando em insert")
-            self.clicar_v2(By.XPATH,'//*[@id="solicitacoes"]/thead/tr[1]/td[1]/table/tbody/tr/td[2]/table/tbody/tr/td[2]', 5)
-            self.esperar(.5)
-            
-            # Buscando chave
-            print("Buscando chave da transferência")
-            chave = self.buscar_valor(By.XPATH, '//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[3]/td[2]/table/tbody/tr/td[1]/input')
-            self.esperar(.5)
-            # apenas para debugar
-            print(chave)
-
-            #Inputando deposito origem
-            print("Escrevendo deposito origem")
-            self.clicar_v2(By.XPATH,'//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[11]/td[2]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-            self.escrever(By.XPATH,'//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[11]/td[2]/table/tbody/tr/td[1]/input', dep_origem)
-            self.esperar(.5)
-            self.verificar_se_escreveu(By.XPATH, '//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[11]/td[2]/table/tbody/tr/td[1]/input', dep_origem)
-            self.esperar(.5)
-
-            #Inputando deposito destino
-            print("Escrevendo deposito destino")
-            self.clicar_v2(By.XPATH,'//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[13]/td[2]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-            self.escrever(By.XPATH,'//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[13]/td[2]/table/tbody/tr/td[1]/input', dep_destino)
-            self.esperar(.5)
-            self.verificar_se_escreveu(By.XPATH, '//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[13]/td[2]/table/tbody/tr/td[1]/input', dep_destino)
-            self.esperar(.5)
-
-            #Aguardar erro
-            print("Aguardando erro")
-            self.sair_iframe()
-            self.esperar(.5)
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
-                enviar_status_via_api(
-                    transferencia_id=id,
-                    status=erro,
-                    dep_destino=dep_destino,
-                    rec=rec,
-                    qtd=qtd,
-                    observacao=observacao_text
-                )
-                continue
-            self.esperar(.5)
-
-            #Inputando recurso
-            print("Escrevendo recurso")
-            self.iframes()
-            self.clicar_v2(By.XPATH, '//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[15]/td[2]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-            self.escrever(By.XPATH,'//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[15]/td[2]/table/tbody/tr/td[1]/input', rec)
-            self.esperar(.5)
-            self.verificar_se_escreveu(By.XPATH, '//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[15]/td[2]/table/tbody/tr/td[1]/input', rec)
-            self.esperar(.5)
-
-            #Aguardar erro
-            print("Aguardando erro")
-            self.sair_iframe()
-            self.esperar(.5)
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.esperar(.5)
-                self.fechar_aba_ate_fechar()
-                enviar_status_via_api(
-                    transferencia_id=id,
-                    status=erro,
-                    dep_destino=dep_destino,
-                    rec=rec,
-                    qtd=qtd,
-                    observacao=observacao_text
-                )
-                continue
-            self.esperar(.5)
-
-            #Inputando quantidade
-            print("Escrevendo quantidade")
-            self.iframes()
-            self.clicar_v2(By.XPATH,'//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[25]/td[2]/table/tbody/tr/td[1]', 5)
-            self.esperar(.5)
-            self.escrever(By.XPATH,'//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[25]/td[2]/table/tbody/tr/td[1]/input', qtd)
-            self.esperar(.5)
-            self.verificar_se_escreveu(By.XPATH, '//*[@id="solicitacoes"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr[25]/td[2]/table/tbody/tr/td[1]/input', qtd)
-            self.esperar(.5)
-
-            #Aguardar erro
-            print("Aguardando erro")
-            self.sair_iframe()
-            self.esperar(.5)
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.fechar_aba_ate_fechar()
-                enviar_status_via_api(
-                    transferencia_id=id,
-                    status=erro,
-                    dep_destino=dep_destino,
-                    rec=rec,
-                    qtd=qtd,
-                    observacao=observacao_text
-                )
-                continue
-            self.esperar(.5)
-
-            #Clicando em confirmar (insert)
-            print("Clicando em insert")
-            self.clicar_v2(By.XPATH,'//*[@id="solicitacoes"]/thead/tr[1]/td[1]/table/tbody/tr/td[2]/table/tbody/tr/td[4]', 5)
-            self.esperar(.5)
-
-            # clicando em aprovar
-            print('clicando em aprovar')
-            self.clicar_v2(By.XPATH, '//*[@id="buttonsBar_solicitacoes"]/td[1]', 5)
-            
-            print("Aguardando modal para confirmar")
-            self.aguardando_aparecer_item(By.XPATH, '//*[@id="confirm"]')
-            self.esperar(1)
-            self.clicar_v2(By.XPATH, '//*[@id="confirm"]')
-            self.esperar(.5)
-
-            self.iframes()
-            #Clicando em baixar
-            print('clicando em baixar')
-            self.clicar_v2(By.XPATH, '//*[@id="buttonsBar_solicitacoes"]/td[3]')
-            self.esperar(1.5)
-
-            self.escrever(By.XPATH, '//*[@id="informaçõesDaBaixa"]/tbody/tr[1]/td[1]/table/tbody/tr/td/table/tbody/tr/td[2]/table/tbody/tr/td[1]/input', 'h')
-            self.esperar(1.5)
-
-            print("Confirmando baixa")
-            self.clicar_v2(By.XPATH, '/html/body/div[4]/div/div[1]/table/tbody/tr/td[2]/table/tbody/tr/td')
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.fechar_aba_ate_fechar()
-                enviar_status_via_api(
-                    transferencia_id=id,
-                    status=erro,
-                    dep_destino=dep_destino,
-                    rec=rec,
-                    qtd=qtd,
-                    observacao=observacao_text
-                )
-                continue
-            print("Aguardando alerta")
-            alerta = self.obter_mensagem_alert()
-            if alerta:
-                print(f"[ERRO] Pulando item devido ao erro: {alerta}")
-                self.fechar_aba_ate_fechar()
-                enviar_status_via_api(
-                    transferencia_id=id,
-                    status=alerta,
-                    dep_destino=dep_destino,
-                    rec=rec,
-                    qtd=qtd,
-                    observacao=observacao_text
-                )
-                continue
-
-            print("Clicar em gravar")
-            self.clicar_v2(By.XPATH, '/html/body/div[4]/div/div[1]/table/tbody/tr/td[2]/table/tbody/tr/td[2]')
-            erro = self.obter_mensagem_erro()
-            if erro:
-                print(f"[ERRO] Pulando item devido ao erro: {erro}")
-                self.fechar_aba_ate_fechar()
-                enviar_status_via_api(
-                    transferencia_id=id,
-                    status=erro,
-                    dep_destino=dep_destino,
-                    rec=rec,
-                    qtd=qtd,
-                    observacao=observacao_text
-                )
-                continue
-            print("Aguardando alerta")
-            alerta = self.obter_mensagem_alert()
-            if alerta:
-                print(f"[ALERTA] Apenas um alerta: {alerta}")
-
-            # Se chegou até aqui então funcionou!!!
-            enviar_status_via_api(
-                transferencia_id=id,
-                status='OK',
-                dep_destino=dep_destino,
-                rec=rec,
-                qtd=qtd,
-                observacao=observacao_text,
-                chave=chave
-            )
-
-            
\ No newline at end of file
+        return self.motor.linha(dados)
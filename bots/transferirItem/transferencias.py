@@ -1,21 +1,75 @@
 import os
-import json
-import requests
 from psycopg2.extras import DictCursor  # Para retornar resultados como dicionários
 from dotenv import load_dotenv
 
-from core.db import get_db_connection
+from core.db import gatilho_notificacao_instalado, get_db_connection, instalar_gatilho_notificacao
+from core.reservas import ReservaLote, concluir, liberar, reservar
+from core.outbox import chaves_pendentes, enfileirar
+from core.tentativas import filtro_pendentes, registrar_resultado
 
+# Canal do NOTIFY disparado quando data_entrega é preenchida (ver instalar_notificacao)
+CANAL_NOTIFICACAO = "rpa_transferencias"
+TABELA_SOLICITACOES = "apontamento_v2.solicitacao_almox_solicitacaotransferencia"
 
-def verificar_transferencias():
+# Endpoint que recebe o status das transferências
+DJANGO_API_URL = "https://apontamentousinagem.onrender.com/core/api/rpa/update-transfer/"
+
+# Tipo da linha nas tabelas de reservas e de tentativas do RPA
+TIPO_LINHA = "transferencia"
+
+
+def consulta_pendentes():
+    """
+    (id, ordem) das pendentes para as reservas (ver core/reservas.py), sem as
+    linhas em quarentena/espera. A ordem põe linhas sem falhas primeiro e,
+    dentro do mesmo número de tentativas, as solicitações mais antigas.
+    """
+    tentativas = filtro_pendentes(TIPO_LINHA, "st")
+    return f"""
+        SELECT st.id, row_number() OVER (ORDER BY {tentativas["ordem"]} st.data_solicitacao, st.id)
+        FROM {TABELA_SOLICITACOES} st
+        {tentativas["join"]}
+        WHERE st.data_entrega IS NOT NULL
+          AND (st.rpa IS NULL OR st.rpa != 'OK')
+          {tentativas["where"]}
+    """
+
+
+def instalar_notificacao():
+    """
+    Instala o gatilho que avisa o bot de novas transferências liberadas (data_entrega).
+    Instalação única, fora da partida do bot: python -m bots.transferirItem.main --instalar-gatilho
+    """
+    return instalar_gatilho_notificacao(TABELA_SOLICITACOES, CANAL_NOTIFICACAO)
+
+
+def notificacao_instalada():
+    """Se o gatilho de instalar_notificacao existe (None se o banco estiver fora)."""
+    return gatilho_notificacao_instalado(TABELA_SOLICITACOES, CANAL_NOTIFICACAO)
+
+
+def verificar_transferencias(ids=None):
+    """
+    Retorna as transferências pendentes (data_entrega preenchida e rpa diferente de OK).
+    Com `ids`, restringe às transferências informadas (ex.: as reservadas por este bot).
+    """
     try:
         # Conectar ao banco de dados PostgreSQL usando configuração do .env
         conn = get_db_connection()
 
         cursor = conn.cursor(cursor_factory=DictCursor)  # Usa DictCursor para obter resultados como dicionários
 
+        # Status já decidido, aguardando entrega ao Django: não refaz a linha.
+        # Lido antes da consulta: uma mensagem entregue entre as duas leituras
+        # já terá rpa atualizado no banco e não volta como pendente.
+        aguardando_envio = chaves_pendentes(DJANGO_API_URL)
+
+        filtro_ids = "AND st.id = ANY(%s)" if ids is not None else ""
+        # Fora as linhas em quarentena ou aguardando nova tentativa; novas primeiro
+        tentativas = filtro_pendentes(TIPO_LINHA, "st")
+
         # Executar a consulta com junção
-        query = """
+        query = f"""
             SELECT
                 st.id,
                 st.quantidade,
@@ -34,14 +88,19 @@ def verificar_transferencias():
                 apontamento_v2.cadastro_almox_itenstransferencia i ON st.item_id = i.id
             LEFT JOIN
                 apontamento_v2.cadastro_almox_depositodestino d ON st.deposito_destino_id = d.id
+            {tentativas["join"]}
             WHERE
                 st.data_entrega IS NOT NULL
                 AND (st.rpa IS NULL OR st.rpa != 'OK')
+                {tentativas["where"]}
+                {filtro_ids}
+            ORDER BY
+                {tentativas["ordem"]} st.data_solicitacao
         """
 
-        cursor.execute(query)
+        cursor.execute(query, (list(ids),) if ids is not None else None)
         rows = cursor.fetchall()
-        return rows
+        return [row for row in rows if str(row[0]) not in aguardando_envio]
 
     except Exception as e:
         print(f"Erro ao conectar ao banco de dados ou executar a consulta: {e}")
@@ -60,14 +119,45 @@ def verificar_transferencias():
             pass
 
 
+def reservar_transferencias(worker, limite, duracao_s=300):
+    """
+    Reserva até `limite` transferências pendentes para `worker` (SKIP LOCKED) e
+    retorna as linhas completas, na ordem da reserva.
+    """
+    try:
+        # Linhas com status na caixa de saída ficam fora do lote: reservá-las só
+        # devolveria um lote vazio e o bot pararia com outras linhas pendentes
+        aguardando_envio = chaves_pendentes(DJANGO_API_URL)
+        ids = reservar(TIPO_LINHA, consulta_pendentes(), worker, limite, duracao_s, excluir=aguardando_envio)
+    except Exception as e:
+        print(f"Erro ao reservar transferências pendentes: {e}")
+        return []
+
+    if not ids:
+        return []
+    rows = verificar_transferencias(ids)
+    # Linhas que deixaram de estar pendentes entre a reserva e a leitura voltam para a fila
+    try:
+        liberar(TIPO_LINHA, set(ids) - {row[0] for row in rows}, worker)
+    except Exception as e:
+        # Sem liberar, a reserva apenas vence no tempo normal
+        print(f"[AVISO] Falha ao liberar reservas: {e}")
+    posicao = {id: i for i, id in enumerate(ids)}
+    return sorted(rows, key=lambda row: posicao[row[0]])
+
+
+def manter_reserva(rows, worker, duracao_s=300):
+    """Renova a reserva das linhas enquanto o bloco roda e libera ao final (ver ReservaLote)."""
+    return ReservaLote(TIPO_LINHA, [row[0] for row in rows], worker, duracao_s)
+
+
 def enviar_status_via_api(transferencia_id, status, dep_destino, rec, qtd, observacao, chave=None):
     """
     Envia o status de uma requisição de transferência para a API do Django.
+    O status vai para a caixa de saída local (core/outbox.py) e é entregue em
+    segundo plano; a função não espera a rede.
     """
-    # --- Configuração da API ---
-    DJANGO_API_URL = "https://apontamentousinagem.onrender.com/core/api/rpa/update-transfer/"
     # RPA_API_KEY = os.getenv("RPA_API_KEY")
-    # ---------------------------
 
     payload = {
         "id": transferencia_id,
@@ -82,17 +172,15 @@ def enviar_status_via_api(transferencia_id, status, dep_destino, rec, qtd, obser
         "Content-Type": "application/json",
     }
 
+    # Conta a falha (espera exponencial / quarentena) ou zera o histórico no sucesso
+    registrar_resultado(TIPO_LINHA, transferencia_id, status)
+
     try:
-        response = requests.post(DJANGO_API_URL, data=json.dumps(payload), headers=headers, timeout=20)
-        if response.status_code == 200:
-            print(f"➜ API: Status da transferência {transferencia_id} enviado com sucesso.")
-            return True
-        else:
-            print(
-                f"✗ API ERRO ({response.status_code}): Falha ao enviar status para a transferência "
-                f"{transferencia_id}. Resposta: {response.text}"
-            )
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"✗ API ERRO: Impossível conectar ao servidor Django. Erro: {e}")
+        enfileirar(DJANGO_API_URL, payload, headers=headers, descricao=f"da transferência {transferencia_id}",
+                   checkpoint=TIPO_LINHA)
+        # A reserva fica retida até a entrega: outras instâncias ainda veem a linha pendente
+        concluir(TIPO_LINHA, transferencia_id)
+        return True
+    except Exception as e:
+        print(f"✗ Falha ao gravar status da transferência {transferencia_id} na caixa de saída: {e}")
         return False
@@ -16,6 +16,9 @@ from core.db import (
     get_erp_credentials_table_name,
     get_active_schema,
 )
+from core.cadastros import pedir_limpeza
+from core.outbox import listar_descartadas, resolver_descartada
+from core.tentativas import liberar_quarentena, listar_quarentena
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,6 +28,9 @@ LOG_FILE = BASE_DIR / "execucao_erp.log"
 PIDS_DIR = BASE_DIR / "bot_pids"
 PIDS_DIR.mkdir(exist_ok=True)
 
+# Limite de sessões simultâneas do Innovaro por bot (cada worker é um Chrome logado)
+MAX_WORKERS = 8
+
 
 class BotInfo(BaseModel):
     name: str
@@ -32,6 +38,8 @@ class BotInfo(BaseModel):
     running: bool
     schedule_interval_minutes: Optional[int] = None
     headless_mode: Optional[bool] = None
+    wait_mode: Optional[str] = None
+    workers: Optional[int] = None
     last_start: Optional[datetime] = None
     last_stop: Optional[datetime] = None
     erp_username: Optional[str] = None
@@ -50,6 +58,8 @@ class BotProcess:
         self.process: Optional[subprocess.Popen] = None
         self.schedule_interval_minutes: Optional[int] = None
         self.headless_mode: Optional[bool] = None
+        self.wait_mode: Optional[str] = None
+        self.workers: Optional[int] = None
         self.last_start: Optional[datetime] = None
         self.last_stop: Optional[datetime] = None
         self._was_running: bool = False
@@ -95,6 +105,11 @@ class BotProcess:
         env = os.environ.copy()
         env.setdefault("BOT_NAME", self.name)
         env["BOT_PID_FILE"] = str(self.pid_file)
+        # Os bots acrescentam PIDs ao arquivo; começa limpo a cada execução
+        try:
+            self.pid_file.unlink(missing_ok=True)
+        except Exception:
+            pass
 
         self.process = subprocess.Popen(self.command, cwd=str(cwd), env=env)
         self.last_start = datetime.now()
@@ -128,12 +143,13 @@ class BotProcess:
             except Exception:
                 pass
 
-            # Se o bot registrou o PID do chromedriver, mata somente essa árvore
+            # Se o bot registrou o(s) PID(s) do chromedriver, mata somente essas árvores
+            # (um por linha quando o bot roda com vários workers)
             if self.pid_file.exists():
                 try:
                     with self.pid_file.open("r", encoding="utf-8") as f:
-                        driver_pid_str = f.read().strip()
-                    if driver_pid_str:
+                        driver_pids = [linha.strip() for linha in f if linha.strip()]
+                    for driver_pid_str in driver_pids:
                         subprocess.run(
                             ["taskkill", "/PID", driver_pid_str, "/T", "/F"],
                             stdout=subprocess.DEVNULL,
@@ -156,6 +172,8 @@ class BotProcess:
             command=self.command,
             running=self.running,
             schedule_interval_minutes=self.schedule_interval_minutes,
+            wait_mode=self.wait_mode,
+            workers=self.workers,
             last_start=self.last_start,
             last_stop=self.last_stop,
         )
@@ -165,9 +183,30 @@ class LogsResponse(BaseModel):
     lines: List[str]
 
 
+class QuarentenaItem(BaseModel):
+    tipo: str
+    registro_id: int
+    tentativas: int
+    ultimo_erro: Optional[str] = None
+    ultima_tentativa: Optional[datetime] = None
+
+
+class MensagemDescartada(BaseModel):
+    id: int
+    destino: str
+    chave: Optional[str] = None
+    payload: str
+    descricao: Optional[str] = None
+    criado_em: float
+    tentativas: int
+    ultimo_erro: Optional[str] = None
+
+
 class ScheduleUpdate(BaseModel):
     interval_minutes: Optional[int] = None
     headless_mode: Optional[bool] = None
+    wait_mode: Optional[str] = None
+    workers: Optional[int] = None
 
 
 class ErpCredentials(BaseModel):
@@ -211,6 +250,8 @@ def _init_schedule_table() -> None:
                         bot_name TEXT PRIMARY KEY,
                         interval_minutes INTEGER,
                         headless_mode BOOLEAN DEFAULT FALSE,
+                        wait_mode TEXT DEFAULT 'condicional',
+                        workers INTEGER DEFAULT 1,
                         updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP
                     )
                     """
@@ -234,12 +275,16 @@ def _load_schedules_from_db() -> None:
                 table_name = _qualified(get_schedule_table_name())
                 # Garante que a coluna headless_mode exista (migração leve)
                 cur.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS headless_mode BOOLEAN DEFAULT FALSE")
-                cur.execute(f"SELECT bot_name, interval_minutes, headless_mode FROM {table_name}")
-                for bot_name, interval_minutes, headless_mode in cur.fetchall():
+                cur.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS wait_mode TEXT DEFAULT 'condicional'")
+                cur.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS workers INTEGER DEFAULT 1")
+                cur.execute(f"SELECT bot_name, interval_minutes, headless_mode, wait_mode, workers FROM {table_name}")
+                for bot_name, interval_minutes, headless_mode, wait_mode, workers in cur.fetchall():
                     bot = _BOTS.get(bot_name)
                     if bot is not None:
                         bot.schedule_interval_minutes = interval_minutes
                         bot.headless_mode = headless_mode
+                        bot.wait_mode = wait_mode
+                        bot.workers = workers
     finally:
         conn.close()
 
@@ -259,14 +304,16 @@ def _persist_schedule_to_db(bot: BotProcess) -> None:
                 table_name = _qualified(get_schedule_table_name())
                 cur.execute(
                     f"""
-                    INSERT INTO {table_name} (bot_name, interval_minutes, headless_mode, updated_at)
-                    VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+                    INSERT INTO {table_name} (bot_name, interval_minutes, headless_mode, wait_mode, workers, updated_at)
+                    VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
                     ON CONFLICT (bot_name)
                     DO UPDATE SET interval_minutes = EXCLUDED.interval_minutes,
                                   headless_mode = EXCLUDED.headless_mode,
+                                  wait_mode = EXCLUDED.wait_mode,
+                                  workers = EXCLUDED.workers,
                                   updated_at = EXCLUDED.updated_at
                     """,
-                    (bot.name, bot.schedule_interval_minutes, bot.headless_mode),
+                    (bot.name, bot.schedule_interval_minutes, bot.headless_mode, bot.wait_mode, bot.workers),
                 )
     finally:
         conn.close()
@@ -484,8 +531,18 @@ def update_schedule(name: str, body: ScheduleUpdate):
     if body.interval_minutes is not None and body.interval_minutes <= 0:
         raise HTTPException(status_code=400, detail="interval_minutes deve ser maior que zero ou nulo.")
 
+    if body.wait_mode is not None and body.wait_mode not in ("condicional", "fixo"):
+        raise HTTPException(status_code=400, detail="wait_mode deve ser 'condicional' ou 'fixo'.")
+
+    if body.workers is not None and not (1 <= body.workers <= MAX_WORKERS):
+        raise HTTPException(status_code=400, detail=f"workers deve estar entre 1 e {MAX_WORKERS}.")
+
     bot.schedule_interval_minutes = body.interval_minutes
     bot.headless_mode = body.headless_mode
+    if body.wait_mode is not None:
+        bot.wait_mode = body.wait_mode
+    if body.workers is not None:
+        bot.workers = body.workers
     _persist_schedule_to_db(bot)
     info = bot.to_info()
     info.headless_mode = bot.headless_mode
@@ -549,9 +606,67 @@ def get_bot_logs(name: str, limit: int = 100):
     return LogsResponse(lines=lines)
 
 
+@app.get("/api/quarentena", response_model=List[QuarentenaItem])
+def get_quarentena(tipo: Optional[str] = None):
+    """
+    Lista as linhas (requisições, transferências...) que atingiram o máximo
+    de tentativas no ERP e deixaram de ser processadas pelos bots.
+    """
+    try:
+        return [QuarentenaItem(**item) for item in listar_quarentena(tipo)]
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Banco indisponível: {e}")
+
+
+@app.post("/api/quarentena/{tipo}/{registro_id}/liberar")
+def release_quarentena(tipo: str, registro_id: int):
+    """Devolve uma linha da quarentena para a fila, zerando as tentativas."""
+    if not liberar_quarentena(tipo, registro_id):
+        raise HTTPException(status_code=404, detail="Linha não encontrada na quarentena.")
+    return {"tipo": tipo, "registro_id": registro_id, "liberada": True}
+
+
+@app.get("/api/outbox/descartadas", response_model=List[MensagemDescartada])
+def get_outbox_descartadas():
+    """
+    Lista os status que a caixa de saída desistiu de entregar ao Django.
+    As linhas deles continuam fora da fila dos bots até serem resolvidas.
+    """
+    return [MensagemDescartada(**mensagem) for mensagem in listar_descartadas()]
+
+
+@app.post("/api/outbox/{id_mensagem}/reenviar")
+def resend_outbox_descartada(id_mensagem: int):
+    """Devolve uma mensagem descartada para a caixa de saída, zerando as tentativas."""
+    if not resolver_descartada(id_mensagem, reenviar=True):
+        raise HTTPException(status_code=404, detail="Mensagem descartada não encontrada.")
+    return {"id": id_mensagem, "reenviada": True}
+
+
+@app.delete("/api/outbox/{id_mensagem}")
+def delete_outbox_descartada(id_mensagem: int):
+    """
+    Apaga uma mensagem descartada (status acertado à mão no Django). A linha
+    volta a ser considerada pelos bots se continuar pendente no banco.
+    """
+    if not resolver_descartada(id_mensagem):
+        raise HTTPException(status_code=404, detail="Mensagem descartada não encontrada.")
+    return {"id": id_mensagem, "apagada": True}
+
+
+@app.post("/api/cadastros/recusados/limpar")
+def clear_cadastros_recusados():
+    """
+    Limpa, em todos os bots, os valores recusados pelo Innovaro guardados no
+    cache de cadastros (ex.: após cadastrar o item no ERP).
+    """
+    pedir_limpeza()
+    return {"limpeza_pedida": True}
+
+
 @app.get("/")
 def index(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return templates.TemplateResponse(request, "index.html")
 
 
 def _scheduler_loop() -> None:
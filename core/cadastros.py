@@ -0,0 +1,271 @@
+"""
+Cache local dos cadastros do apontamento para validar as linhas antes do ERP.
+
+Muitas linhas só falham depois de várias telas, quando o Innovaro responde
+"Não encontrou ocorrência" para um item, centro de custo ou matrícula. O
+cache guarda em memória os códigos dos cadastros usados pelos bots
+(CATALOGOS), indexados por catálogo, e recarrega do banco a cada
+CADASTROS_ATUALIZAR_S segundos (padrão 600).
+
+Um valor que não está no cache só recusa a linha depois de recarregar os
+cadastros: as consultas de pendentes usam as mesmas tabelas, então a falta
+costuma ser só cache velho (ex.: item cadastrado há pouco).
+
+Além dos cadastros, o cache aprende com o ERP: um valor que o Innovaro
+recusou com "Não encontrou ocorrência" fica na lista negativa por
+CADASTROS_VALIDADE_NEGATIVO_S segundos (padrão 900), mesmo estando nos
+cadastros do apontamento (eles podem ter códigos que o Innovaro não tem).
+As próximas linhas com o mesmo valor são recusadas na hora, sem abrir
+tela. A lista é limpa em todos os bots pelo gerenciador
+(POST /api/cadastros/recusados/limpar, ver pedir_limpeza).
+
+Uso (ver MotorFluxo):
+    validador = ValidadorLinha({"item": ("itens_solicitacao", "Recurso")})
+    motivo = validador.validar(dados)   # None = pode seguir para o ERP
+"""
+
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from core.db import get_bot_flag, get_bot_setting, get_db_connection
+from core.erp_core import log
+from core.profiler import nome_bot
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+# Arquivo tocado pelo gerenciador para os bots limparem a lista negativa
+PEDIDO_LIMPEZA = BASE_DIR / "cadastros" / "limpar_recusados"
+
+# Intervalo mínimo entre recargas forçadas por valores que não estão no cache
+INTERVALO_MIN_RECARGA_S = 30
+
+# Catálogo -> (tabela, coluna com o valor digitado no ERP)
+CATALOGOS = {
+    "centros_custo": ("apontamento_v2.cadastro_almox_cc", "codigo"),
+    "funcionarios": ("apontamento_v2.cadastro_almox_funcionario", "matricula"),
+    "itens_solicitacao": ("apontamento_v2.cadastro_almox_itenssolicitacao", "codigo"),
+    "itens_transferencia": ("apontamento_v2.cadastro_almox_itenstransferencia", "codigo"),
+    "depositos_destino": ("apontamento_v2.cadastro_almox_depositodestino", "nome"),
+}
+
+# Erro do Innovaro para um valor que não existe no cadastro dele
+SEM_OCORRENCIA = "não encontrou ocorrência"
+
+# Data/hora que o BaseERP acrescenta às mensagens de erro (ver _formatar_erro)
+_DATA_HORA = re.compile(r"\s*-\s*\d{2}/\d{2}/\d{4} \d{2}:\d{2}$")
+
+
+def normalizar(valor) -> str:
+    """Valor como o ERP compara: sem espaços nas pontas e sem diferença de maiúsculas."""
+    return str(valor).strip().casefold()
+
+
+class CacheCadastros:
+    """
+    Cadastros em memória, compartilhados entre as threads do processo.
+
+    intervalo_s: idade máxima dos cadastros antes de recarregar
+    validade_negativo_s: tempo que um valor recusado pelo ERP continua recusado
+    """
+
+    def __init__(self, intervalo_s: Optional[float] = None, validade_negativo_s: Optional[float] = None):
+        bot = nome_bot()
+        if intervalo_s is None:
+            intervalo_s = float(get_bot_setting(bot, "CADASTROS_ATUALIZAR_S", "600"))
+        if validade_negativo_s is None:
+            validade_negativo_s = float(get_bot_setting(bot, "CADASTROS_VALIDADE_NEGATIVO_S", "900"))
+        self.intervalo = intervalo_s
+        self.validade_negativo = validade_negativo_s
+
+        self._lock = threading.Lock()
+        self._valores: Dict[str, Set[str]] = {}
+        self._carregado_em: Optional[float] = None
+        self._forcado_em: Optional[float] = None
+        self._pedido_limpeza = _marca_limpeza()
+        # (catálogo, valor normalizado) -> (mensagem do ERP, expira em)
+        self._negativos: Dict[Tuple[str, str], Tuple[str, float]] = {}
+
+    # =============================
+    # CADASTROS
+    # =============================
+
+    def atualizar(self, forcar: bool = False) -> bool:
+        """
+        Recarrega os cadastros se estiverem velhos (ou com forcar=True).
+        Se o banco falhar, mantém os cadastros anteriores. Retorna True se recarregou.
+        """
+        with self._lock:
+            if not forcar and self._carregado_em is not None and time.monotonic() - self._carregado_em < self.intervalo:
+                return False
+
+        valores: Dict[str, Set[str]] = {}
+        try:
+            conn = get_db_connection()
+            try:
+                with conn.cursor() as cur:
+                    for catalogo, (tabela, coluna) in CATALOGOS.items():
+                        cur.execute(f"SELECT {coluna} FROM {tabela} WHERE {coluna} IS NOT NULL")
+                        valores[catalogo] = {normalizar(valor) for (valor,) in cur.fetchall()}
+            finally:
+                conn.close()
+        except Exception as e:
+            log.warning(f"Não foi possível atualizar o cache de cadastros: {e}")
+            with self._lock:
+                # Tenta de novo só no próximo intervalo
+                self._carregado_em = time.monotonic()
+            return False
+
+        with self._lock:
+            self._valores = valores
+            self._carregado_em = time.monotonic()
+            # Cadastro recarregado: valores recusados vencidos saem da lista negativa
+            agora = time.monotonic()
+            self._negativos = {chave: neg for chave, neg in self._negativos.items() if neg[1] > agora}
+
+        log.info("Cache de cadastros atualizado: " + ", ".join(f"{c}={len(v)}" for c, v in valores.items()))
+        return True
+
+    def _no_cache(self, catalogo: str, valor) -> Optional[bool]:
+        with self._lock:
+            valores = self._valores.get(catalogo)
+        if valores is None:
+            return None
+        return normalizar(valor) in valores
+
+    def contem(self, catalogo: str, valor) -> Optional[bool]:
+        """
+        True/False se o valor está no cadastro; None se o cadastro não foi carregado.
+        Um valor que falta no cache recarrega os cadastros (no máximo a cada
+        INTERVALO_MIN_RECARGA_S) antes de responder False.
+        """
+        self.atualizar()
+        presente = self._no_cache(catalogo, valor)
+        if presente is not False:
+            return presente
+
+        with self._lock:
+            recente = self._forcado_em is not None and time.monotonic() - self._forcado_em < INTERVALO_MIN_RECARGA_S
+            if not recente:
+                self._forcado_em = time.monotonic()
+        if not recente and self.atualizar(forcar=True):
+            return self._no_cache(catalogo, valor)
+        return False
+
+    # =============================
+    # LISTA NEGATIVA
+    # =============================
+
+    def _atender_pedido_limpeza(self) -> None:
+        marca = _marca_limpeza()
+        if marca != self._pedido_limpeza:
+            self._pedido_limpeza = marca
+            self.esquecer()
+            log.info("Lista de valores recusados pelo Innovaro limpa a pedido do gerenciador.")
+
+    def recusado(self, catalogo: str, valor) -> Optional[str]:
+        """Mensagem do ERP se o valor foi recusado recentemente, senão None."""
+        self._atender_pedido_limpeza()
+        chave = (catalogo, normalizar(valor))
+        with self._lock:
+            negativo = self._negativos.get(chave)
+            if negativo is None:
+                return None
+            if negativo[1] <= time.monotonic():
+                del self._negativos[chave]
+                return None
+            return negativo[0]
+
+    def aprender(self, catalogo: str, valor, erro: Optional[str]) -> bool:
+        """
+        Guarda o valor na lista negativa se o ERP disse que não o encontrou.
+        Uma recusa atribuída ao campo errado bloqueia o valor só até a
+        validade vencer ou a lista ser limpa pelo gerenciador.
+        """
+        if not erro or SEM_OCORRENCIA not in erro.casefold():
+            return False
+        mensagem = _DATA_HORA.sub("", erro).strip()
+        with self._lock:
+            self._negativos[(catalogo, normalizar(valor))] = (mensagem, time.monotonic() + self.validade_negativo)
+        log.info(f"Valor recusado pelo Innovaro guardado no cache ({catalogo}): {valor}")
+        return True
+
+    def esquecer(self, catalogo: Optional[str] = None) -> None:
+        """Limpa a lista negativa (de um catálogo ou toda), ex.: após cadastrar no ERP."""
+        with self._lock:
+            if catalogo is None:
+                self._negativos.clear()
+            else:
+                self._negativos = {chave: neg for chave, neg in self._negativos.items() if chave[0] != catalogo}
+
+
+def _marca_limpeza() -> Optional[float]:
+    try:
+        return PEDIDO_LIMPEZA.stat().st_mtime
+    except OSError:
+        return None
+
+
+def pedir_limpeza() -> None:
+    """Pede a todos os bots (processos) que limpem a lista de valores recusados."""
+    PEDIDO_LIMPEZA.parent.mkdir(exist_ok=True)
+    PEDIDO_LIMPEZA.write_text(str(time.time()), encoding="utf-8")
+
+
+_cache: Optional[CacheCadastros] = None
+_lock_cache = threading.Lock()
+
+
+def cache_cadastros() -> CacheCadastros:
+    """Cache único do processo (os workers do PoolSessoes compartilham)."""
+    global _cache
+    with _lock_cache:
+        if _cache is None:
+            _cache = CacheCadastros()
+        return _cache
+
+
+class ValidadorLinha:
+    """
+    Valida os dados de uma linha contra o cache antes de abrir a tela.
+
+    campos: chave em `dados` -> (catálogo, rótulo usado no status)
+    """
+
+    def __init__(self, campos: Dict[str, Tuple[str, str]], cache: Optional[CacheCadastros] = None):
+        self.campos = campos
+        self._cache = cache
+
+    @property
+    def cache(self) -> CacheCadastros:
+        return self._cache or cache_cadastros()
+
+    def validar(self, dados) -> Optional[str]:
+        """Status de recusa da linha (texto para o banco) ou None se pode seguir."""
+        for chave, (catalogo, rotulo) in self.campos.items():
+            valor = dados.get(chave)
+            if valor is None or not str(valor).strip():
+                return f"Solicitação sem {rotulo.lower()}"
+
+            recusa = self.cache.recusado(catalogo, valor)
+            if recusa:
+                return f"{rotulo} {valor} não encontrado no Innovaro: {recusa}"
+
+            if self.cache.contem(catalogo, valor) is False:
+                return f"{rotulo} {valor} não está no cadastro {CATALOGOS[catalogo][0]}"
+        return None
+
+    def aprender(self, chave: str, dados, erro: Optional[str]) -> bool:
+        """Erro do ERP ao preencher o campo `chave`: guarda o valor recusado."""
+        if chave not in self.campos or dados.get(chave) is None:
+            return False
+        return self.cache.aprender(self.campos[chave][0], dados[chave], erro)
+
+
+def validador(campos: Dict[str, Tuple[str, str]]) -> Optional[ValidadorLinha]:
+    """ValidadorLinha para os `campos`, ou None se o bot desligou a validação (CADASTROS_VALIDAR=0)."""
+    if not get_bot_flag(nome_bot(), "CADASTROS_VALIDAR", True):
+        return None
+    return ValidadorLinha(campos)
@@ -0,0 +1,152 @@
+"""
+Etapas concluídas de cada linha em andamento no ERP.
+
+Os fluxos marcam, linha a linha, a última etapa concluída (chave obtida,
+cabeçalho escrito, item escrito, aprovado, baixa feita, gravado) em um
+arquivo SQLite local (checkpoints/checkpoints.sqlite3). Ao reportar o
+status a linha sai do arquivo. Se o bot cair no meio de uma linha, a
+próxima execução sabe até onde ela chegou:
+
+    - gravado: o documento já existe no ERP; basta reportar a chave salva
+      em vez de refazer a linha (o que duplicaria o documento)
+    - etapas anteriores: nada foi salvo no Innovaro (o formulário aberto se
+      perde com o navegador), então a linha é refeita do início
+
+O arquivo é local: uma linha interrompida só é retomada na mesma máquina.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CHECKPOINTS_DIR = BASE_DIR / "checkpoints"
+CHECKPOINTS_DB = CHECKPOINTS_DIR / "checkpoints.sqlite3"
+
+# Etapas de uma linha, na ordem do fluxo
+CHAVE_OBTIDA = "chave_obtida"
+CABECALHO_ESCRITO = "cabecalho_escrito"
+ITEM_ESCRITO = "item_escrito"
+APROVADO = "aprovado"
+BAIXA_FEITA = "baixa_feita"
+GRAVADO = "gravado"
+REPORTADO = "reportado"
+
+ETAPAS = (CHAVE_OBTIDA, CABECALHO_ESCRITO, ITEM_ESCRITO, APROVADO, BAIXA_FEITA, GRAVADO, REPORTADO)
+
+_lock = threading.Lock()
+
+
+def _conectar() -> sqlite3.Connection:
+    CHECKPOINTS_DIR.mkdir(exist_ok=True)
+    conn = sqlite3.connect(str(CHECKPOINTS_DB), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS etapas (
+            tipo TEXT NOT NULL,
+            registro_id TEXT NOT NULL,
+            etapa TEXT NOT NULL,
+            chave TEXT,
+            atualizado_em REAL NOT NULL,
+            PRIMARY KEY (tipo, registro_id)
+        )
+        """
+    )
+    return conn
+
+
+def marcar(tipo: str, registro_id, etapa: str, chave: Optional[str] = None) -> None:
+    """
+    Registra `etapa` como a última concluída da linha. A chave informada em
+    uma etapa é mantida nas seguintes. REPORTADO encerra a linha (remove o registro).
+    Nunca derruba o fluxo: em caso de erro apenas avisa.
+    """
+    if etapa not in ETAPAS:
+        raise ValueError(f"Etapa desconhecida: {etapa}")
+
+    if etapa == REPORTADO:
+        esquecer(tipo, registro_id)
+        return
+
+    try:
+        with _lock:
+            conn = _conectar()
+            try:
+                with conn:
+                    conn.execute(
+                        """
+                        INSERT INTO etapas (tipo, registro_id, etapa, chave, atualizado_em)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT (tipo, registro_id)
+                        DO UPDATE SET etapa = excluded.etapa,
+                                      chave = COALESCE(excluded.chave, etapas.chave),
+                                      atualizado_em = excluded.atualizado_em
+                        """,
+                        (tipo, str(registro_id), etapa, None if chave is None else str(chave), time.time()),
+                    )
+            finally:
+                conn.close()
+    except Exception as e:
+        print(f"[AVISO] Falha ao registrar etapa '{etapa}' de {tipo} {registro_id}: {e}")
+
+
+def consultar(tipo: str, registro_id) -> Optional[Dict]:
+    """Última etapa concluída da linha ({etapa, chave, atualizado_em}) ou None."""
+    try:
+        with _lock:
+            conn = _conectar()
+            try:
+                linha = conn.execute(
+                    "SELECT etapa, chave, atualizado_em FROM etapas WHERE tipo = ? AND registro_id = ?",
+                    (tipo, str(registro_id)),
+                ).fetchone()
+            finally:
+                conn.close()
+    except Exception as e:
+        print(f"[AVISO] Falha ao consultar etapas de {tipo} {registro_id}: {e}")
+        return None
+
+    if linha is None:
+        return None
+    etapa, chave, atualizado_em = linha
+    return {"etapa": etapa, "chave": chave, "atualizado_em": atualizado_em}
+
+
+def esquecer(tipo: str, registro_id) -> None:
+    """Remove o registro da linha (status reportado ou linha refeita do início)."""
+    try:
+        with _lock:
+            conn = _conectar()
+            try:
+                with conn:
+                    conn.execute(
+                        "DELETE FROM etapas WHERE tipo = ? AND registro_id = ?",
+                        (tipo, str(registro_id)),
+                    )
+            finally:
+                conn.close()
+    except Exception as e:
+        print(f"[AVISO] Falha ao limpar etapas de {tipo} {registro_id}: {e}")
+
+
+def retomar(tipo: str, registro_id) -> Optional[Dict]:
+    """
+    Ponto de retomada da linha ao começar a processá-la.
+    Retorna o registro se a linha já foi gravada no ERP (só falta reportar);
+    caso contrário descarta etapas anteriores, que serão refeitas, e retorna None.
+    """
+    ponto = consultar(tipo, registro_id)
+    if ponto is None:
+        return None
+
+    if ponto["etapa"] == GRAVADO:
+        print(f"[INFO] {tipo} {registro_id} já gravada no ERP (chave {ponto['chave']}): apenas reportando.")
+        return ponto
+
+    print(f"[INFO] {tipo} {registro_id} interrompida após '{ponto['etapa']}': refazendo a linha.")
+    esquecer(tipo, registro_id)
+    return None
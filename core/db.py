@@ -1,8 +1,11 @@
 import os
+import select
+import time
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 import psycopg2
+import psycopg2.extensions
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -92,6 +95,33 @@ def get_erp_credentials_table_name(default: str = "rpa_bot_erp_credentials") ->
     return os.getenv("DB_ERP_CREDENTIALS_TABLE", default)
 
 
+def get_reservas_table_name(default: str = "rpa_reservas") -> str:
+    """
+    Nome base da tabela de reservas (leases) de linhas pendentes entre instâncias.
+    Pode ser sobrescrito com DB_RPA_RESERVAS_TABLE.
+    """
+    _load_env()
+    return os.getenv("DB_RPA_RESERVAS_TABLE", default)
+
+
+def get_tentativas_table_name(default: str = "rpa_tentativas") -> str:
+    """
+    Nome base da tabela de tentativas/quarentena das linhas que falham no ERP.
+    Pode ser sobrescrito com DB_RPA_TENTATIVAS_TABLE.
+    """
+    _load_env()
+    return os.getenv("DB_RPA_TENTATIVAS_TABLE", default)
+
+
+def get_desmanches_table_name(default: str = "rpa_desmanches") -> str:
+    """
+    Nome base da tabela de trabalho do bot de desmanche (itens a desmanchar).
+    Pode ser sobrescrito com DB_RPA_DESMANCHES_TABLE.
+    """
+    _load_env()
+    return os.getenv("DB_RPA_DESMANCHES_TABLE", default)
+
+
 def get_erp_credentials_for_bot(bot_name: str) -> Dict[str, str]:
     """
     Retorna um dicionário com credenciais ERP para um bot específico:
@@ -165,3 +195,244 @@ def get_headless_mode_for_bot(bot_name: str) -> bool:
             conn.close()
         except Exception:
             pass
+
+
+def get_wait_mode_for_bot(bot_name: str) -> str:
+    """
+    Retorna o modo de espera do bot ("condicional" ou "fixo"), de acordo
+    com a tabela de agendamento (wait_mode).
+    Se não houver registro, assume "condicional".
+    """
+    schema = get_active_schema()
+    table = get_schedule_table_name()
+    full_table = f"{schema}.{table}" if schema else table
+
+    try:
+        conn = get_db_connection()
+    except Exception:
+        return "condicional"
+
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT wait_mode FROM {full_table} WHERE bot_name = %s",
+                    (bot_name,),
+                )
+                row = cur.fetchone()
+                if not row or not row[0]:
+                    return "condicional"
+                (wait_mode,) = row
+                return wait_mode
+    except Exception:
+        return "condicional"
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_workers_for_bot(bot_name: str) -> int:
+    """
+    Retorna quantos workers (sessões Innovaro simultâneas) o bot deve usar,
+    de acordo com a tabela de agendamento (workers).
+    Se não houver registro, assume 1 (processamento sequencial).
+    """
+    schema = get_active_schema()
+    table = get_schedule_table_name()
+    full_table = f"{schema}.{table}" if schema else table
+
+    try:
+        conn = get_db_connection()
+    except Exception:
+        return 1
+
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT workers FROM {full_table} WHERE bot_name = %s",
+                    (bot_name,),
+                )
+                row = cur.fetchone()
+                if not row or not row[0]:
+                    return 1
+                return max(1, int(row[0]))
+    except Exception:
+        return 1
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_bot_setting(bot_name: str, key: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    Lê uma configuração de ambiente (.env) com possibilidade de sobrescrita por bot.
+    Procura primeiro KEY_<BOT_NAME> (ex.: ERP_SESSAO_PERSISTENTE_REQUISITAR_ITEM)
+    e depois KEY. Se nenhuma existir, retorna `default`.
+    """
+    _load_env()
+    specific = os.getenv(f"{key}_{bot_name.upper()}")
+    if specific is not None and specific != "":
+        return specific
+    return os.getenv(key, default)
+
+
+def get_bot_flag(bot_name: str, key: str, default: bool = False) -> bool:
+    """Versão booleana de get_bot_setting (aceita 1/true/sim/yes/on)."""
+    value = get_bot_setting(bot_name, key)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "sim", "yes", "on")
+
+
+# =============================
+# LISTEN / NOTIFY
+# =============================
+
+def instalar_gatilho_notificacao(tabela: str, canal: str) -> bool:
+    """
+    Cria (ou recria) na `tabela` um gatilho que faz NOTIFY no `canal` com o id
+    da linha quando data_entrega é preenchida em uma linha ainda não concluída
+    pelo RPA (rpa nulo ou diferente de 'OK').
+
+    É DDL em tabela do Django: roda uma vez, pelo comando de instalação de
+    cada bot (ex.: python -m bots.requisitarItem.main --instalar-gatilho),
+    nunca na partida dos bots.
+
+    `tabela` deve vir qualificada com o schema (ex.: apontamento_v2.solicitacao_...).
+    Retorna False se não tiver permissão ou o banco estiver indisponível; nesse
+    caso os bots continuam funcionando apenas com o polling.
+    """
+    schema, _, nome = tabela.rpartition(".")
+    funcao = f"{schema + '.' if schema else ''}rpa_notificar_{canal}"
+    gatilho = f"rpa_notificar_{canal}"
+
+    try:
+        conn = get_db_connection()
+    except Exception:
+        return False
+
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    CREATE OR REPLACE FUNCTION {funcao}() RETURNS trigger AS $$
+                    BEGIN
+                        IF NEW.data_entrega IS NOT NULL
+                           AND (NEW.rpa IS NULL OR NEW.rpa != 'OK')
+                           AND (TG_OP = 'INSERT' OR OLD.data_entrega IS DISTINCT FROM NEW.data_entrega) THEN
+                            PERFORM pg_notify('{canal}', NEW.id::text);
+                        END IF;
+                        RETURN NEW;
+                    END;
+                    $$ LANGUAGE plpgsql
+                    """
+                )
+                cur.execute(f"DROP TRIGGER IF EXISTS {gatilho} ON {tabela}")
+                cur.execute(
+                    f"""
+                    CREATE TRIGGER {gatilho}
+                    AFTER INSERT OR UPDATE OF data_entrega ON {tabela}
+                    FOR EACH ROW EXECUTE FUNCTION {funcao}()
+                    """
+                )
+        return True
+    except Exception as e:
+        print(f"[AVISO] Não foi possível instalar o gatilho de notificação em {nome}: {e}")
+        return False
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def gatilho_notificacao_instalado(tabela: str, canal: str) -> Optional[bool]:
+    """
+    Indica se o gatilho de instalar_gatilho_notificacao existe na `tabela`
+    (só leitura). None se o banco estiver indisponível.
+    """
+    try:
+        conn = get_db_connection()
+    except Exception:
+        return None
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT 1 FROM pg_trigger
+                WHERE tgname = %s AND tgrelid = to_regclass(%s) AND NOT tgisinternal
+                """,
+                (f"rpa_notificar_{canal}", tabela),
+            )
+            return cur.fetchone() is not None
+    except Exception as e:
+        print(f"[AVISO] Não foi possível verificar o gatilho de notificação em {tabela}: {e}")
+        return None
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class OuvinteNotificacao:
+    """
+    Conexão dedicada que fica em LISTEN no `canal`.
+
+    Deve ser criada ANTES da primeira consulta de pendências: notificações
+    que chegam enquanto o bot processa um lote ficam guardadas na conexão e
+    a próxima chamada de aguardar() retorna na hora.
+    """
+
+    def __init__(self, canal: str):
+        self.canal = canal
+        self.conn = None
+
+    def _conectar(self) -> None:
+        self.fechar()
+        self.conn = get_db_connection()
+        self.conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with self.conn.cursor() as cur:
+            cur.execute(f"LISTEN {self.canal}")
+
+    def aguardar(self, timeout: float) -> List[str]:
+        """
+        Bloqueia até chegar pelo menos uma notificação ou passar `timeout`
+        segundos. Retorna os payloads recebidos (lista vazia = tempo esgotado,
+        o chamador faz a consulta de segurança).
+        """
+        try:
+            if self.conn is None or self.conn.closed:
+                self._conectar()
+
+            if not self.conn.notifies:
+                prontos, _, _ = select.select([self.conn], [], [], timeout)
+                if prontos:
+                    self.conn.poll()
+            else:
+                self.conn.poll()
+
+            payloads = [n.payload for n in self.conn.notifies]
+            self.conn.notifies.clear()
+            return payloads
+        except Exception as e:
+            # Conexão caiu: reconecta na próxima chamada e, por ora, espera como no polling
+            print(f"[AVISO] Falha ao aguardar notificação no canal {self.canal}: {e}")
+            self.fechar()
+            time.sleep(timeout)
+            return []
+
+    def fechar(self) -> None:
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
@@ -1,9 +1,12 @@
 import os
 import time
+import queue
+import atexit
 import logging
 import functools
+import itertools
 from datetime import datetime
-import pandas as pd
+from logging.handlers import QueueHandler, QueueListener
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -14,14 +17,68 @@ from selenium.common.exceptions import (
     TimeoutException,
     NoSuchElementException,
     ElementClickInterceptedException,
+    StaleElementReferenceException,
 )
 
+from core import erp_js, profiler, seletores
+
+# =============================
+# MODOS DE ESPERA
+# =============================
+# "condicional": espera pela prontidão real da página (padrão)
+# "fixo": mantém as pausas fixas antigas (modo de compatibilidade)
+MODO_ESPERA_CONDICIONAL = "condicional"
+MODO_ESPERA_FIXO = "fixo"
+MODOS_ESPERA = (MODO_ESPERA_CONDICIONAL, MODO_ESPERA_FIXO)
+
+# =============================
+# CONFIRMAÇÃO DE CAMPOS (preencher_formulario)
+# =============================
+# "evento": define o valor via JS e dispara input/change/blur (campos simples)
+# "teclado": digita com teclas reais + TAB (campos com lookup no Innovaro)
+COMMIT_EVENTO = "evento"
+COMMIT_TECLADO = "teclado"
+
 # =============================
 # CONFIGURAÇÃO DE LOGS
 # =============================
+# A escrita em arquivo/console é feita por uma thread em segundo plano
+# (QueueListener): o bot só coloca o registro numa fila limitada.
+TAMANHO_FILA_LOG = int(os.getenv("ERP_LOG_TAMANHO_FILA", "10000"))
+
+# Verbosidade das linhas "Iniciando passo"/"Passo concluído" do log_passo:
+#   "completo"   -> todas (padrão)
+#   "amostrado"  -> uma a cada ERP_LOG_AMOSTRAGEM passos
+#   "silencioso" -> nenhuma
+# Erros e avisos são sempre registrados.
+VERBOSIDADE_LOG = os.getenv("ERP_LOG_VERBOSIDADE", "completo")
+AMOSTRAGEM_LOG = max(1, int(os.getenv("ERP_LOG_AMOSTRAGEM", "20")))
+
+
+class FilaLogLimitada(QueueHandler):
+    """
+    QueueHandler com fila limitada. Quando a fila enche, descarta registros
+    abaixo de WARNING; avisos e erros esperam por espaço para nunca se perderem.
+    """
+
+    def __init__(self, fila):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=5)
+            else:
+                self.descartados += 1
+
+
 def configurar_logger():
     """
-    Configura o logger para salvar em arquivo e mostrar no console.
+    Configura o logger para salvar em arquivo e mostrar no console,
+    sem bloquear o bot com I/O: os registros passam por uma fila.
     """
     logger = logging.getLogger("ERP_Automacao")
     logger.setLevel(logging.INFO)
@@ -34,72 +91,337 @@ def configurar_logger():
         # Handler Arquivo (salva o histórico)
         file_handler = logging.FileHandler('execucao_erp.log', encoding='utf-8')
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
 
         # Handler Console (mostra na tela em tempo real)
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+
+        fila = queue.Queue(maxsize=TAMANHO_FILA_LOG)
+        logger.addHandler(FilaLogLimitada(fila))
+
+        listener = QueueListener(fila, file_handler, console_handler, respect_handler_level=True)
+        listener.start()
+        # Esvazia a fila antes de encerrar o processo
+        atexit.register(listener.stop)
 
     return logger
 
 # Instância global do logger para ser usada no arquivo
 log = configurar_logger()
 
+_contador_passos = itertools.count()
+
+
+def _logar_inicio_fim():
+    """Decide se as linhas de início/fim do passo atual devem ir para o log."""
+    if VERBOSIDADE_LOG == "silencioso":
+        return False
+    if VERBOSIDADE_LOG == "amostrado":
+        return next(_contador_passos) % AMOSTRAGEM_LOG == 0
+    return True
+
 # =============================
 # DECORATOR PARA RASTREAR PASSOS
 # =============================
+def _seletor_do_passo(args, kwargs):
+    """Extrai o seletor (value) de passos com assinatura (self, by, value, ...)."""
+    if "value" in kwargs:
+        return str(kwargs["value"])
+    if len(args) >= 3 and isinstance(args[2], str):
+        return args[2]
+    return None
+
+
 def log_passo(func):
     """
-    Decorator que loga automaticamente o início, fim e erros de cada função.
+    Decorator que loga automaticamente o início, fim e erros de cada função
+    e registra a duração do passo no profiler.
     """
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         nome_funcao = func.__name__
+        seletor = _seletor_do_passo(args, kwargs)
+        inicio = time.monotonic()
+        profiler.entrar_passo(nome_funcao)
+        logar = _logar_inicio_fim()
         try:
             # Log antes de executar
             # args[0] é o 'self', ignoramos para limpar o log
-            log.info(f"Iniciando passo: {nome_funcao}")
+            if logar:
+                log.info(f"Iniciando passo: {nome_funcao}")
             
             resultado = func(*args, **kwargs)
             
             # Log após sucesso
-            log.info(f"Passo concluído: {nome_funcao}")
+            if logar:
+                log.info(f"Passo concluído: {nome_funcao}")
+            profiler.registrar(nome_funcao, time.monotonic() - inicio, seletor)
             return resultado
 
         except Exception as e:
+            profiler.registrar(nome_funcao, time.monotonic() - inicio, seletor, falhou=True)
             # Log de erro com traceback se quebrar
             log.error(f"Falha no passo {nome_funcao}. Erro: {str(e)}", exc_info=True)
             raise e # Relança o erro para o script principal tratar se necessário
+        finally:
+            profiler.sair_passo()
     return wrapper
 
+# =============================
+# REGISTRO DE TELAS
+# =============================
+# Nome da tela -> caminho no menu do Innovaro e rótulo da aba aberta.
+# Use BaseERP.registrar_tela para incluir novas telas.
+TELAS = {
+    "Requisições": {
+        "caminho": ("Estoque", "Requisição", "Requisições"),
+        "aba": "Requisições",
+    },
+    "Solicitação de transferência entre depósitos": {
+        "caminho": ("Estoque", "Transferência", "Solicitação de transferência entre depósitos"),
+        "aba": "Solicitação de transferência entre depósitos",
+    },
+    "Transferência simples de recursos": {
+        "caminho": ("Estoque", "Transferência", "Transferência simples de recursos"),
+        "aba": "Transferência simples de recursos",
+    },
+    "Saldos de Recursos - CEMAG": {
+        "caminho": ("Estoque", "Consultas", "Saldos de Recursos - CEMAG"),
+        "aba": "Saldos de Recursos - CEMAG",
+    },
+}
+
 class BaseERP:
     """
     Classe base para automações do ERP.  
     Todas as outras automações devem herdar desta classe.
     """
 
-    def __init__(self, driver, timeout=20):
+    # Elementos que indicam que o Innovaro ainda está processando
+    SELETORES_CARREGANDO = ("#content_statusMessageBox",)
+
+    # Tipo do botão de menu usado pelo usuário do bot (ver abrir_menu_1/abrir_menu_2)
+    tipo_menu = 1
+
+    def __init__(self, driver, timeout=20, modo_espera=None):
         self.driver = driver
         self.wait = WebDriverWait(driver, timeout)
         self.timeout = timeout
-        log.info("Instância BaseERP iniciada.")
+
+        if modo_espera not in MODOS_ESPERA:
+            modo_espera = MODO_ESPERA_CONDICIONAL
+        self.modo_espera = modo_espera
+
+        # Limites do motor de espera condicional (em segundos)
+        self.espera_minima = 0.1
+        self.intervalo_verificacao = 0.05
+
+        # Detector de ociosidade AJAX: tempo sem requisições/timers para
+        # considerar que o Innovaro terminou de responder
+        self.silencio_ajax = 0.3
+        self.atraso_max_timer_ms = 1000
+        self.contar_timers_ajax = True
+
+        # Checkpoint do observador de mensagens a partir do qual obter_mensagem_*
+        # procuram, por tipo: tirado antes de cada ação e avançado a cada leitura
+        self._desde_mensagens = {"erro": None, "alerta": None}
+
+        # Execução em várias abas (ver core/multiaba.py): quantas abas usar e
+        # qual aba a linha em andamento ocupa (None = comportamento de aba única)
+        self.abas_simultaneas = 1
+        self.aba_atual = None
+        self.ultima_aba_fechada = None
+        # Chave da linha em que a execução levantou exceção (ver PoolSessoes)
+        self.linha_com_falha = None
+
+        log.info(f"Instância BaseERP iniciada (modo de espera: {self.modo_espera}).")
     
     # =============================
     # UTILITÁRIOS GERAIS
     # =============================
 
-    def esperar(self, segundos):
-        """Pausa curta, útil após ações pesadas."""
+    @property
+    def espera_fixa(self):
+        return self.modo_espera == MODO_ESPERA_FIXO
+
+    def esperar(self, segundos, condicao=None):
+        """
+        Pausa após ações pesadas.
+
+        - Modo fixo: dorme exatamente `segundos` (comportamento antigo).
+        - Modo condicional: retorna assim que `condicao` (por padrão, página
+          pronta) for verdadeira, respeitando a espera mínima e usando
+          `segundos` como teto: esta pausa nunca demora mais que no modo fixo.
+        """
+        if self.espera_fixa:
+            time.sleep(segundos)
+            return True
+
+        return self.aguardar(condicao or self.pagina_ociosa, teto=segundos)
+
+    def esperar_fixo(self, segundos):
+        """Pausa fixa, independente do modo de espera do bot."""
         time.sleep(segundos)
+
+    def aguardar(self, condicao, teto=None, minimo=None):
+        """
+        Motor de espera: aguarda `condicao()` retornar valor verdadeiro.
+
+        minimo: tempo mínimo antes da primeira verificação (dá tempo do ERP
+                reagir à ação anterior). Padrão: self.espera_minima.
+        teto: tempo máximo de espera. Padrão: self.timeout.
+
+        Retorna o valor da condição, ou False se estourar o teto.
+        Exceções lançadas pela condição contam como "ainda não pronto".
+        """
+        if teto is None:
+            teto = self.timeout
+        if minimo is None:
+            minimo = self.espera_minima
+
+        inicio = time.monotonic()
+        limite = inicio + teto
+        time.sleep(min(minimo, teto))
+
+        while True:
+            try:
+                resultado = condicao()
+                if resultado:
+                    return resultado
+            except Exception:
+                pass
+
+            if time.monotonic() >= limite:
+                log.debug(f"Espera condicional atingiu o teto de {teto}s")
+                return False
+
+            time.sleep(self.intervalo_verificacao)
+
+    def estado_pagina(self):
+        """
+        Lê, em uma única chamada, o estado da página e dos iframes das abas.
+        Na primeira chamada em cada documento instala o rastreador AJAX.
+
+        Retorna dict: {pronta, pendentes, ocioso_ms}
+        """
+        return self.driver.execute_script(
+            erp_js.ESTADO_PAGINA,
+            list(self.SELETORES_CARREGANDO),
+            self.atraso_max_timer_ms,
+            self.contar_timers_ajax,
+        ) or {}
+
+    def pagina_pronta(self):
+        """
+        True quando os documentos (principal e iframes das abas) terminaram
+        de carregar e nenhum overlay de carregamento está visível.
+        """
+        return bool(self.estado_pagina().get("pronta"))
+
+    def pagina_ociosa(self, silencio=None):
+        """
+        True quando a página está pronta e não houve XHR/fetch ou timer curto
+        em andamento nos últimos `silencio` segundos.
+        """
+        if silencio is None:
+            silencio = self.silencio_ajax
+        estado = self.estado_pagina()
+        return bool(estado.get("pronta")) and estado.get("ocioso_ms", -1) >= silencio * 1000
+
+    def aguardar_pagina_pronta(self, teto=None):
+        return self.aguardar(self.pagina_pronta, teto=teto)
+
+    def estado_aba(self, indice):
+        """Como estado_pagina, mas só do iframe da aba `indice`."""
+        return self.driver.execute_script(
+            erp_js.ESTADO_ABA,
+            list(self.SELETORES_CARREGANDO),
+            self.atraso_max_timer_ms,
+            self.contar_timers_ajax,
+            indice,
+        ) or {}
+
+    def aba_ociosa(self, indice, silencio=None):
+        """True quando o iframe da aba `indice` carregou e está sem AJAX há `silencio` segundos."""
+        if silencio is None:
+            silencio = self.silencio_ajax
+        estado = self.estado_aba(indice)
+        return bool(estado.get("pronta")) and estado.get("ocioso_ms", -1) >= silencio * 1000
+
+    @log_passo
+    def aguardar_ajax_ocioso(self, silencio=None, teto=None):
+        """
+        Retorna assim que o Innovaro ficar `silencio` segundos sem requisições
+        em andamento (documento principal e iframes tab-frame).
+
+        Retorna True se ficou ocioso, False se estourou o teto.
+        """
+        ocioso = self.aguardar(lambda: self.pagina_ociosa(silencio), teto=teto, minimo=0)
+        if not ocioso:
+            log.warning("Innovaro não ficou ocioso dentro do tempo definido")
+        return bool(ocioso)
+
+    def _wait(self, timeout):
+        """WebDriverWait que verifica com a frequência do modo de espera atual."""
+        if self.espera_fixa:
+            return WebDriverWait(self.driver, timeout)
+        return WebDriverWait(self.driver, timeout, poll_frequency=self.intervalo_verificacao)
+
+    def aguardar_clicavel(self, by, value, teto=None):
+        """
+        Retorna o elemento assim que estiver clicável, ou None após o teto.
+        Verifica a cada `intervalo_verificacao` em vez dos 0.5s padrão do Selenium.
+        """
+        if teto is None:
+            teto = self.timeout
+        try:
+            return self._wait(teto).until(
+                EC.element_to_be_clickable((by, value))
+            )
+        except TimeoutException:
+            return None
+
+    def valor_confirmado(self, elem):
+        """True quando o campo perdeu o foco (TAB processado) e o Innovaro ficou ocioso."""
+        try:
+            saiu_do_campo = self.driver.execute_script(erp_js.VALOR_CONFIRMADO, elem)
+        except StaleElementReferenceException:
+            # O Innovaro redesenhou o campo: o valor já foi processado
+            saiu_do_campo = True
+        return bool(saiu_do_campo) and self.pagina_ociosa()
+
+    def aguardar_valor_confirmado(self, elem, teto):
+        """
+        Após TAB, aguarda o Innovaro confirmar o valor do campo por no máximo
+        `teto` segundos (quem chama passa o que sobrou das pausas do modo fixo).
+        No modo fixo não faz nada: as pausas antigas continuam nos fluxos.
+        """
+        if self.espera_fixa or teto <= 0:
+            return True
+        return self.aguardar(lambda: self.valor_confirmado(elem), teto=teto, minimo=0)
     
+    def _antes_da_acao(self):
+        """
+        Checkpoint das mensagens logo antes de uma ação: erros e alertas que já
+        estavam na tela não são atribuídos a ela. No modo fixo não faz nada.
+        """
+        if self.espera_fixa:
+            return
+        try:
+            checkpoint = self.checkpoint_mensagens()
+        except Exception as e:
+            log.debug(f"Não foi possível ler o checkpoint das mensagens: {e}")
+            return
+        self._desde_mensagens = {tipo: checkpoint for tipo in self._desde_mensagens}
+
     @log_passo
     def clicar_v1(self, by, value, timeout=None):
         if timeout is None:
             timeout = self.timeout
+        self._antes_da_acao()
 
         try:
-            elem = WebDriverWait(self.driver, timeout).until(
+            elem = self._wait(timeout).until(
                 EC.element_to_be_clickable((by, value))
             )
             elem.click()
@@ -122,6 +444,7 @@ class BaseERP:
     @log_passo
     def clicar_v2(self, by, value, tentativas=20):
 
+        self._antes_da_acao()
         for tentativa in range(tentativas):
 
             try:
@@ -129,7 +452,7 @@ class BaseERP:
                 self.driver.switch_to.default_content()
 
                 # tenta clicar no contexto principal
-                elem = WebDriverWait(self.driver, 2).until(
+                elem = self._wait(2).until(
                     EC.element_to_be_clickable((by, value))
                 )
                 self.driver.execute_script("arguments[0].scrollIntoView(true);", elem)
@@ -148,7 +471,7 @@ class BaseERP:
                     self.driver.switch_to.default_content()
                     self.driver.switch_to.frame(frame)
 
-                    elem = WebDriverWait(self.driver, 2).until(
+                    elem = self._wait(2).until(
                         EC.element_to_be_clickable((by, value))
                     )
 
@@ -171,11 +494,38 @@ class BaseERP:
 
         log.error(f"Não foi possível clicar em {value} após {tentativas} tentativas.")
         return False
-    
+
+    @log_passo
+    def clicar_direto(self, by, value, teto=None):
+        """
+        Clica no elemento procurando só no documento atual, sem trocar de
+        iframe. Retorna False se não ficou clicável dentro do teto (quem chama
+        decide se recorre ao clicar_v2, que procura em todos os documentos).
+        """
+        elem = self.aguardar_clicavel(by, value, teto)
+        if elem is None:
+            return False
+
+        self._antes_da_acao()
+        try:
+            elem.click()
+        except (ElementClickInterceptedException, StaleElementReferenceException):
+            try:
+                self.driver.execute_script("arguments[0].click();", elem)
+            except StaleElementReferenceException:
+                return False
+
+        log.info(f"Clique realizado em {value} no documento atual")
+        return True
+
     @log_passo
     def escrever(self, by, value, texto, limpar=True):
         try:
             elem = self.wait.until(EC.presence_of_element_located((by, value)))
+            # Pausas do modo fixo; no condicional a confirmação usa o que sobrar delas
+            pausas = (1.5 if limpar else 0) + .5
+            self._antes_da_acao()
+            inicio = time.monotonic()
             if limpar:
                 elem.clear()
                 self.esperar(1.5)
@@ -183,6 +533,7 @@ class BaseERP:
             elem.send_keys(texto)
             self.esperar(.5)
             elem.send_keys(Keys.TAB)
+            self.aguardar_valor_confirmado(elem, pausas - (time.monotonic() - inicio))
             log.info(f'Escrito: {texto} em {value}')
             
             return True
@@ -225,6 +576,7 @@ class BaseERP:
 
             # 2) Se estiver vazio, tenta escrever
             log.info(f"Campo {value} vazio. Tentando escrever (tentativa {tentativa}/{tentativas})...")     
+            self._antes_da_acao()
 
             if limpar:
                 elem.clear()
@@ -234,7 +586,7 @@ class BaseERP:
             elem.send_keys(texto)
             self.esperar(0.5)
             elem.send_keys(Keys.TAB)
-            self.esperar(0.5)
+            self.esperar(0.5, condicao=lambda: self.valor_confirmado(elem))
 
             # 3) Verifica novamente após escrever
             valor_atual = (elem.get_attribute("value") or "").strip()
@@ -248,6 +600,163 @@ class BaseERP:
         log.error(f"Falha ao preencher campo {value} após {tentativas} tentativas.")
         return False
 
+    @staticmethod
+    def _normalizar_campos(campos):
+        """
+        Aceita um dict ordenado {(by, value): texto | (texto, commit)} ou uma
+        lista de tuplas (by, value, texto[, commit]) e devolve uma lista de
+        (by, value, texto, commit).
+        """
+        if isinstance(campos, dict):
+            itens = []
+            for (by, value), conteudo in campos.items():
+                if isinstance(conteudo, tuple):
+                    itens.append((by, value) + conteudo)
+                else:
+                    itens.append((by, value, conteudo))
+        else:
+            itens = list(campos)
+
+        normalizados = []
+        for item in itens:
+            by, value, texto = item[0], item[1], item[2]
+            commit = item[3] if len(item) > 3 else COMMIT_EVENTO
+            normalizados.append((by, value, "" if texto is None else str(texto), commit))
+        return normalizados
+
+    @staticmethod
+    def _celula_da_grade(by, value):
+        """XPath da célula (td) de um input/textarea da grade, ou None."""
+        if by != By.XPATH:
+            return None
+        celula, _, campo = value.rpartition("/")
+        if campo not in ("input", "textarea") or not celula.rpartition("/")[2].startswith("td"):
+            return None
+        return celula
+
+    def _digitar_campo(self, by, value, texto):
+        """
+        Clica na célula da grade (que põe o campo em edição), digita o texto com
+        teclas reais e confirma com TAB. No modo fixo repete as pausas antigas
+        do clicar_v2 + escrever (0,5 s, 1,5 s, 0,5 s e 0,5 s).
+        """
+        celula = self._celula_da_grade(by, value)
+        if celula is not None:
+            if self.espera_fixa or not self.clicar_direto(by, celula, 2):
+                self.clicar_v2(by, celula, 5)
+            self.esperar(.5)
+
+        elem = self.wait.until(EC.presence_of_element_located((by, value)))
+        elem.clear()
+        if self.espera_fixa:
+            time.sleep(1.5)
+            elem.send_keys(texto)
+            time.sleep(.5)
+            elem.send_keys(Keys.TAB)
+            time.sleep(.5)
+            return
+        elem.send_keys(texto + Keys.TAB)
+        self.esperar(.5, condicao=lambda: self.valor_confirmado(elem))
+
+    def _formatar_erro(self, mensagem):
+        return mensagem + " - " + datetime.now().strftime("%d/%m/%Y %H:%M")
+
+    @log_passo
+    def preencher_formulario(self, campos, parar_no_erro=True):
+        """
+        Preenche vários campos com o mínimo de chamadas ao WebDriver.
+
+        campos: mapeamento ordenado localizador -> valor, em um dos formatos:
+            {(By.XPATH, "..."): "texto", (By.XPATH, "..."): ("texto", COMMIT_TECLADO)}
+            [(By.XPATH, "...", "texto"), (By.XPATH, "...", "texto", COMMIT_TECLADO)]
+
+        Campos COMMIT_EVENTO consecutivos são escritos em uma única chamada JS.
+        Campos COMMIT_TECLADO (com lookup) são digitados e, após o Innovaro
+        responder, é verificado se apareceu erro (sem esperar timeout).
+        No final todos os valores são conferidos em uma única leitura; campos
+        que não ficaram preenchidos são digitados de novo uma vez.
+
+        Retorna dict:
+            ok     -> True se todos os campos ficaram preenchidos sem erro
+            erro   -> mensagem de erro do Innovaro (com data/hora) ou None
+            campo  -> localizador (by, value) do campo que falhou ou None
+            valores-> {value: valor lido na conferência}
+        """
+        itens = self._normalizar_campos(campos)
+        resultado = {"ok": False, "erro": None, "campo": None, "valores": {}}
+
+        checkpoint = self.checkpoint_mensagens()
+        self._desde_mensagens = {tipo: checkpoint for tipo in self._desde_mensagens}
+        lote = []
+
+        def escrever_lote():
+            if not lote:
+                return
+            faltando = self.driver.execute_script(
+                erp_js.PREENCHER_CAMPOS, [[by, value, texto] for by, value, texto, _ in lote]
+            ) or []
+            for indice in faltando:
+                log.warning(f"Campo não encontrado para preencher: {lote[indice][1]}")
+            del lote[:]
+
+        for by, value, texto, commit in itens:
+            if commit != COMMIT_TECLADO:
+                lote.append((by, value, texto, commit))
+                continue
+
+            escrever_lote()
+            self._digitar_campo(by, value, texto)
+
+            erro = self.erro_desde(checkpoint)
+            if erro is not None:
+                log.info(f"Erro ao preencher {value}: {erro}")
+                self.mensagens_desde(checkpoint, "erro", fechar=True)
+                resultado.update(erro=self._formatar_erro(erro), campo=(by, value))
+                checkpoint = self.checkpoint_mensagens()
+                self._desde_mensagens["erro"] = checkpoint
+                if parar_no_erro:
+                    return resultado
+
+        escrever_lote()
+        self.esperar(.5)
+
+        # Conferência em uma única leitura
+        localizadores = [[by, value] for by, value, _, _ in itens]
+        lidos = self.driver.execute_script(erp_js.LER_CAMPOS, localizadores) or []
+
+        for (by, value, texto, commit), lido in zip(itens, lidos):
+            if texto.strip() and not lido:
+                log.warning(f"Campo {value} vazio após preencher. Digitando novamente...")
+                self._digitar_campo(by, value, texto)
+
+        lidos = self.driver.execute_script(erp_js.LER_CAMPOS, localizadores) or []
+        resultado["valores"] = {value: lido for (_, value, _, _), lido in zip(itens, lidos)}
+
+        for (by, value, texto, commit), lido in zip(itens, lidos):
+            if texto.strip() and not lido and resultado["campo"] is None:
+                log.error(f"Falha ao preencher campo {value}.")
+                resultado["campo"] = (by, value)
+
+        erro = self.erro_desde(checkpoint)
+        if erro is not None and resultado["erro"] is None:
+            self.mensagens_desde(checkpoint, "erro", fechar=True)
+            self._desde_mensagens["erro"] = self.checkpoint_mensagens()
+            resultado["erro"] = self._formatar_erro(erro)
+
+        resultado["ok"] = resultado["erro"] is None and resultado["campo"] is None
+        log.info(f"Formulário preenchido: {resultado['valores']}")
+        return resultado
+
+    def localizar(self, seletor, teto=None):
+        """
+        Resolve um seletor registrado (core/seletores.py) no documento atual:
+        tenta as alternativas na ordem do ranking e retorna o (by, value) que
+        encontrou, medindo o custo e as falhas de cada uma.
+        """
+        if teto is None:
+            teto = self.timeout
+        return seletores.resolver(self.driver, seletor, teto, self.intervalo_verificacao)
+
     @log_passo
     def buscar_valor(self, by, value):
 
@@ -273,6 +782,13 @@ class BaseERP:
     def abrir_url_testes(self):
         self.driver.get('https://hcemag.innovaro.com.br/sistema/')
 
+    def abrir_url_simulador(self):
+        # Simulador local das telas do Innovaro (python -m core.simulador)
+        self.driver.get('http://127.0.0.1:8765/sistema')
+
+    def abrir_url(self, url):
+        self.driver.get(url)
+
     # =============================
     # LOGIN
     # =============================
@@ -282,6 +798,10 @@ class BaseERP:
         self.escrever(By.ID, "password", senha)
         self.driver.find_element(By.ID, "password").send_keys(Keys.ENTER)
 
+        if not self.espera_fixa:
+            # Considera o login concluído quando o formulário some da tela
+            self.aguardar(lambda: not self.driver.find_elements(By.ID, "password"))
+
     # =============================
     # MENU
     # =============================
@@ -304,6 +824,13 @@ class BaseERP:
 
         self.clicar_v1(By.XPATH, '//*[@id="bt_1898143037"]/table/tbody/tr/td[2]', 999)
 
+    def abrir_menu(self):
+        """Abre ou fecha o menu do Innovaro conforme o tipo_menu do bot."""
+        if self.tipo_menu == 2:
+            self.abrir_menu_2()
+        else:
+            self.abrir_menu_1()
+
     @log_passo
     def tentar_abrir_2_menu(self):
         """
@@ -331,47 +858,129 @@ class BaseERP:
         return None
 
     @log_passo
-    def listar_itens_menu(self, classe):
+    def listar_itens_menu(self, classe='webguiTreeNodeLabel'):
+        """
+        Lista os rótulos visíveis do menu em uma única chamada ao navegador.
+
+        Retorna dict {rotulo: indice} com o índice do elemento na árvore.
+        O índice é mantido na página e só é refeito quando a árvore muda.
+        """
 
         try:
+            resultado = self.driver.execute_script(erp_js.MENU, classe, None) or {}
+            rotulos = resultado.get("rotulos") or {}
+            log.info("Listou as opções do menu")
+            return rotulos
 
-            self.sair_iframe()
+        except Exception as e:
+            log.error(f"Ocorreu um erro durante a listagem de opções: {e}")
+            return {}
+    
+    @log_passo
+    def clicar_menu(self, item_menu, classe='webguiTreeNodeLabel'):
+        """
+        Clica no item do menu pelo rótulo com uma única chamada ao navegador.
+        Retorna True se clicou, False se o item não estava visível no menu.
+        """
 
-            lista_menu = self.driver.find_elements(By.CLASS_NAME, classe)
+        resultado = self.driver.execute_script(erp_js.MENU, classe, item_menu) or {}
 
-            elementos_menu = []
+        if not resultado.get("clicou"):
+            log.error(f"Não encontrado {item_menu}")
+            return False
 
-            for x in range(len(lista_menu)):
-                a = lista_menu[x].text
-                elementos_menu.append(a)
+        self.esperar(1.5)
 
-            test_lista = pd.DataFrame(elementos_menu)
-            test_lista = test_lista.loc[test_lista[0] != ""].reset_index()
+        log.info(f"Clicado em {item_menu}")
 
-            log.info("Listou as opções do menu")
-            self.esperar(.5)
+        return True
 
-        except Exception as e:
-            log.error(f"Ocorreu um erro durante a listagem de opções: {e}")
+    # =============================
+    # TELAS
+    # =============================
+
+    @staticmethod
+    def registrar_tela(nome, caminho, aba=None):
+        """Inclui (ou substitui) uma tela no registro de telas."""
+        TELAS[nome] = {"caminho": tuple(caminho), "aba": aba or nome}
+
+    def abas_abertas(self, rotulo=None, ativar=False):
+        """
+        Lista as abas abertas do Innovaro em uma única chamada.
+        Retorna dict: {rotulos: [...], indice} (indice da aba `rotulo` ou -1).
+        """
+        return self.driver.execute_script(erp_js.ABAS, rotulo, ativar) or {"rotulos": [], "indice": -1}
+
+    def entrar_iframe_da_aba(self, indice):
+        """Entra no iframe (tab-frame) correspondente à aba de índice `indice`."""
+        self.driver.switch_to.default_content()
+        frames = self.driver.find_elements(By.CLASS_NAME, 'tab-frame')
+
+        if 0 <= indice < len(frames):
+            self.driver.switch_to.frame(frames[indice])
+        elif frames:
+            # Ordem das abas não bate com os iframes: como iframes(), fica no último
+            self.driver.switch_to.frame(frames[-1])
 
-        return (lista_menu, test_lista)
-    
     @log_passo
-    def clicar_menu(self, item_menu):
+    def navegar_menu(self, caminho):
+        """
+        Percorre o caminho no menu clicando só o necessário: começa do nível
+        mais profundo que já está visível, sem recolher pastas já abertas.
+        """
+        rotulos = self.listar_itens_menu()
 
-        try:
-            #Clicando em estoque
-            lista_menu, test_list = self.listar_itens_menu('webguiTreeNodeLabel')
-            self.esperar(1.5)
-            click_producao = test_list.loc[test_list[0] == item_menu].reset_index(drop=True)['index'][0]
-            lista_menu[click_producao].click()
-            self.esperar(1.5)
+        if not any(item in rotulos for item in caminho):
+            self.abrir_menu()
+            rotulos = self.listar_itens_menu()
 
-            log.info(f"Clicado em {item_menu}")
+        inicio = 0
+        for posicao in range(len(caminho) - 1, -1, -1):
+            if caminho[posicao] in rotulos:
+                inicio = posicao
+                break
 
-            return True
-        except ValueError as e:
-            log.error(f"Não encontrado {item_menu}: {e}")
+        for item in caminho[inicio:]:
+            if not self.clicar_menu(item):
+                return False
+
+        return True
+
+    @log_passo
+    def garantir_tela(self, nome, reiniciar=True):
+        """
+        Garante que a tela `nome` (ver TELAS) está aberta e entra no seu iframe.
+
+        - Se a aba já estiver aberta, apenas a ativa e, com reiniciar=True,
+          recarrega o iframe para começar uma nova inserção do zero.
+        - Caso contrário, abre pelo menu percorrendo apenas os níveis que
+          ainda não estão expandidos.
+
+        Retorna True se a tela ficou pronta, False caso contrário.
+        """
+        tela = TELAS[nome]
+        self.sair_iframe()
+
+        indice = self.abas_abertas(tela["aba"], ativar=True).get("indice", -1)
+
+        if indice >= 0:
+            log.info(f"Tela '{nome}' já aberta (aba {indice}). Reutilizando.")
+            if reiniciar:
+                self.driver.execute_script(erp_js.RECARREGAR_ABA, indice)
+                self.esperar(1.5)
+        else:
+            if not self.navegar_menu(tela["caminho"]):
+                log.error(f"Não foi possível abrir a tela '{nome}' pelo menu.")
+                return False
+
+            if not self.aguardar(lambda: self.abas_abertas(tela["aba"]).get("indice", -1) >= 0):
+                log.error(f"A aba da tela '{nome}' não apareceu.")
+                return False
+            indice = self.abas_abertas(tela["aba"])["indice"]
+
+        self.aguardar_pagina_pronta()
+        self.entrar_iframe_da_aba(indice)
+        return True
 
     # =============================
     # CONTROLE DE ABAS
@@ -384,6 +993,10 @@ class BaseERP:
         Retorna True se fechou, False se desistiu.
         """
 
+        # Em execução com várias abas, fecha apenas a aba da linha atual
+        if self.aba_atual is not None:
+            return self.fechar_aba(self.aba_atual)
+
         for tentativa in range(1, max_tentativas + 1):
             log.info(f"Tentando fechar aba (tentativa {tentativa}/{max_tentativas})")
 
@@ -411,6 +1024,37 @@ class BaseERP:
         log.error("Não foi possível fechar a aba após várias tentativas.")
         return False
 
+    @log_passo
+    def fechar_aba(self, indice):
+        """
+        Fecha somente a aba de índice `indice`, mantendo as demais abertas.
+        Retorna True se a quantidade de abas diminuiu.
+        """
+        self.sair_iframe()
+        antes = len(self.abas_abertas(indice, ativar=True).get("rotulos", []))
+        self.esperar(0.5, condicao=self.pagina_pronta)
+
+        botoes = [
+            b for b in self.driver.find_elements(
+                By.XPATH, "//span[contains(@onclick, 'Environment.getInstance().closeTab')]/div"
+            )
+            if b.is_displayed()
+        ]
+        if not botoes:
+            log.error(f"Botão de fechar da aba {indice} não encontrado.")
+            return False
+
+        # Um botão por aba: usa o da posição; senão, o visível é o da aba ativa
+        botao = botoes[indice] if len(botoes) == antes else botoes[0]
+        botao.click()
+
+        fechou = self.aguardar(lambda: len(self.abas_abertas().get("rotulos", [])) < antes, teto=5)
+        if fechou:
+            self.ultima_aba_fechada = indice
+        else:
+            log.error(f"Não foi possível fechar a aba {indice}.")
+        return bool(fechou)
+
     @log_passo
     def existe_aba_aberta(self, timeout):
         """
@@ -444,6 +1088,11 @@ class BaseERP:
     @log_passo
     def iframes(self):
 
+        # Em execução com várias abas, entra no iframe da aba da linha atual
+        if self.aba_atual is not None:
+            self.entrar_iframe_da_aba(self.aba_atual)
+            return log.info(f'Entrando no iframe da aba {self.aba_atual}')
+
         iframe_list = self.driver.find_elements(By.CLASS_NAME, 'tab-frame')
 
         for iframe in range(len(iframe_list)):
@@ -463,16 +1112,91 @@ class BaseERP:
 
         return log.info('Saindo do iframe')
     
+    # =============================
+    # OBSERVADOR DE MENSAGENS
+    # =============================
+
+    def mensagens_desde(self, checkpoint=None, tipo=None, fechar=False):
+        """
+        Consulta o observador de mensagens (instalando-o se necessário).
+
+        checkpoint: (página, sequência) já visto (ver checkpoint_mensagens);
+                    retorna apenas eventos posteriores. Se a página principal
+                    foi recarregada depois dele, retorna todos os da página nova.
+        tipo: "erro", "alerta" ou None para ambos
+        fechar: clica em OK nas caixas abertas do tipo pedido
+
+        Retorna dict: {seq, pagina, eventos: [{seq, tipo, texto, ts}]}
+        """
+        pagina, seq = checkpoint or (None, 0)
+        resultado = self.driver.execute_script(erp_js.MENSAGENS, seq, tipo, fechar, pagina)
+        return resultado or {"seq": seq, "pagina": pagina, "eventos": []}
+
+    @staticmethod
+    def _checkpoint(resultado):
+        return (resultado.get("pagina"), resultado.get("seq", 0))
+
+    def checkpoint_mensagens(self):
+        """
+        Retorna o checkpoint atual das mensagens (página, sequência). Use antes
+        de uma ação e depois pergunte "apareceu erro desde o checkpoint?".
+        """
+        return self._checkpoint(self.mensagens_desde())
+
+    def erro_desde(self, checkpoint):
+        """Texto do primeiro erro que apareceu depois do checkpoint, sem esperar."""
+        eventos = self.mensagens_desde(checkpoint, "erro").get("eventos") or []
+        return eventos[0]["texto"] if eventos else None
+
+    def _mensagem_observada(self, tipo, timeout, fechar_apos_ler, desde):
+        """
+        Aguarda o Innovaro ficar ocioso (no máximo `timeout`) e retorna o texto
+        da primeira caixa de `tipo` que apareceu após `desde`, ou None.
+        """
+        if desde is None:
+            desde = self._desde_mensagens.get(tipo)
+
+        self.aguardar(self.pagina_ociosa, teto=timeout, minimo=0)
+
+        resultado = self.mensagens_desde(desde, tipo)
+        eventos = resultado.get("eventos") or []
+        if not eventos:
+            return None
+
+        lido = self._checkpoint(resultado)
+        self._desde_mensagens[tipo] = lido
+
+        if fechar_apos_ler:
+            try:
+                self.mensagens_desde(lido, tipo, fechar=True)
+            except Exception as e:
+                log.error(f"Não consegui clicar em OK da mensagem de {tipo}: {e}")
+
+        return (eventos[0].get("texto") or "").strip()
+
     @log_passo
-    def obter_mensagem_erro(self, timeout=5, fechar_apos_ler=True):
+    def obter_mensagem_erro(self, timeout=5, fechar_apos_ler=True, desde=None):
         """
         Captura a mensagem da janela de erro (errorMessageBox).
 
+        No modo de espera condicional usa o observador de mensagens: aguarda o
+        Innovaro ficar ocioso e responde na hora se apareceu algum erro desde
+        `desde` (checkpoint) ou, por padrão, desde a última ação (clique ou
+        escrita) ou o último erro lido, o que for mais recente.
+
         Retorna:
             - string com a mensagem de erro, ex: "Não encontrou ocorrência para a pesquisa."
             - None, se não aparecer mensagem de erro dentro do timeout.
         """
 
+        if not self.espera_fixa:
+            mensagem = self._mensagem_observada("erro", timeout, fechar_apos_ler, desde)
+            if mensagem is None:
+                log.info(f"Não mostrou nenhuma mensagem de erro")
+                return None
+            log.info(f"Mensagem de erro capturada: {mensagem}")
+            return self._formatar_erro(mensagem)
+
         try:
             # Espera o container de erro ficar visível
             box = WebDriverWait(self.driver, timeout).until(
@@ -501,15 +1225,24 @@ class BaseERP:
             return None
     
     @log_passo
-    def obter_mensagem_alert(self, timeout=5, fechar_apos_ler=True):
+    def obter_mensagem_alert(self, timeout=5, fechar_apos_ler=True, desde=None):
         """
         Captura a mensagem da janela de alerta (alertMessageBox).
+        No modo de espera condicional usa o observador de mensagens (ver obter_mensagem_erro).
 
         Retorna:
             - string com a mensagem de alerta, ex: "Requisição aprovada com sucesso!"
             - None, se não aparecer mensagem de alerta dentro do timeout.
         """
 
+        if not self.espera_fixa:
+            mensagem = self._mensagem_observada("alerta", timeout, fechar_apos_ler, desde)
+            if mensagem is None:
+                log.info("Não apareceu mensagem de alerta dentro do tempo definido")
+                return None
+            log.info(f"Mensagem de alerta capturada: {mensagem}")
+            return mensagem
+
         try:
             # Espera o container de alerta ficar visível
             box = WebDriverWait(self.driver, timeout).until(
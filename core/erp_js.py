@@ -0,0 +1,608 @@
+"""
+Scripts JavaScript executados no navegador pelo BaseERP.
+
+Mantidos em um módulo separado para não poluir o erp_core.py e para que
+cada verificação feita na página custe apenas uma chamada ao WebDriver.
+"""
+
+# =============================
+# PRONTIDÃO DA PÁGINA
+# =============================
+
+# Instala (uma única vez por janela) o rastreador de requisições AJAX do
+# Innovaro no documento principal e em cada iframe das abas (tab-frame) e
+# devolve o estado atual da página.
+#
+# arguments[0]: lista de seletores CSS de elementos de "carregando".
+# arguments[1]: maior atraso (ms) de setTimeout considerado trabalho pendente.
+#               Timers mais longos (keep-alive, relógios) são ignorados, assim
+#               como timers curtos recorrentes (polling): os rearmados pelo
+#               próprio callback e os agendados mais de TIMER_REPETICOES vezes
+#               em TIMER_JANELA_MS.
+# arguments[2]: se false, não rastreia timers, apenas XHR/fetch.
+#
+# Retorno: {pronta, pendentes, ocioso_ms}
+#   pronta    -> documentos carregados e nenhum overlay visível
+#   pendentes -> requisições XHR/fetch + timers curtos em andamento
+#   ocioso_ms -> há quanto tempo não há atividade (-1 se há pendências)
+_RASTREADOR_AJAX = """
+var seletores = arguments[0] || [];
+var atrasoMaximo = arguments[1] || 1000;
+var contarTimers = arguments[2] !== false;
+var TIMER_REPETICOES = 3;
+var TIMER_JANELA_MS = 5000;
+
+function instalar(win) {
+    if (!win || win.__rpaAjax) {
+        return;
+    }
+
+    var estado = {pendentes: 0, timers: {}, totalTimers: 0, ultimaAtividade: Date.now(), emExecucao: null};
+    win.__rpaAjax = estado;
+
+    function inicio() {
+        estado.pendentes++;
+        estado.ultimaAtividade = Date.now();
+    }
+
+    function fim() {
+        estado.pendentes = Math.max(0, estado.pendentes - 1);
+        estado.ultimaAtividade = Date.now();
+    }
+
+    var XHR = win.XMLHttpRequest;
+    if (XHR && XHR.prototype && XHR.prototype.send) {
+        var sendOriginal = XHR.prototype.send;
+        XHR.prototype.send = function () {
+            var finalizado = false;
+            function terminar() {
+                if (!finalizado) {
+                    finalizado = true;
+                    fim();
+                }
+            }
+            inicio();
+            this.addEventListener('loadend', terminar);
+            try {
+                return sendOriginal.apply(this, arguments);
+            } catch (e) {
+                terminar();
+                throw e;
+            }
+        };
+    }
+
+    if (win.fetch) {
+        var fetchOriginal = win.fetch;
+        win.fetch = function () {
+            inicio();
+            try {
+                return fetchOriginal.apply(this, arguments).then(
+                    function (resposta) { fim(); return resposta; },
+                    function (erro) { fim(); throw erro; }
+                );
+            } catch (e) {
+                fim();
+                throw e;
+            }
+        };
+    }
+
+    if (contarTimers) {
+        var setTimeoutOriginal = win.setTimeout;
+        var clearTimeoutOriginal = win.clearTimeout;
+
+        function recorrente(fn) {
+            // Rearmado pelo próprio callback: laço de polling, nunca termina
+            if (fn.__rpaRecorrente) {
+                return true;
+            }
+            if (fn === estado.emExecucao) {
+                try {
+                    fn.__rpaRecorrente = true;
+                } catch (e) {
+                    // função nativa/congelada: só este agendamento é ignorado
+                }
+                return true;
+            }
+            var agora = Date.now();
+            var janela = fn.__rpaAgendamentos;
+            if (!janela || agora - janela.inicio > TIMER_JANELA_MS) {
+                janela = {inicio: agora, vezes: 0};
+                try {
+                    fn.__rpaAgendamentos = janela;
+                } catch (e) {
+                    return false;
+                }
+            }
+            janela.vezes++;
+            return janela.vezes > TIMER_REPETICOES;
+        }
+
+        win.setTimeout = function (fn, atraso) {
+            if (typeof fn !== 'function' || (atraso || 0) > atrasoMaximo || recorrente(fn)) {
+                return setTimeoutOriginal.apply(win, arguments);
+            }
+            var extras = Array.prototype.slice.call(arguments, 2);
+            var id = setTimeoutOriginal.call(win, function () {
+                if (estado.timers[id]) {
+                    delete estado.timers[id];
+                    estado.totalTimers--;
+                    estado.ultimaAtividade = Date.now();
+                }
+                var anterior = estado.emExecucao;
+                estado.emExecucao = fn;
+                try {
+                    return fn.apply(this, extras);
+                } finally {
+                    estado.emExecucao = anterior;
+                }
+            }, atraso);
+            estado.timers[id] = true;
+            estado.totalTimers++;
+            return id;
+        };
+
+        win.clearTimeout = function (id) {
+            if (estado.timers[id]) {
+                delete estado.timers[id];
+                estado.totalTimers--;
+            }
+            return clearTimeoutOriginal.call(win, id);
+        };
+    }
+}
+
+function visivel(el) {
+    return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+}
+
+function documentoPronto(doc) {
+    if (!doc || doc.readyState !== 'complete') {
+        return false;
+    }
+    for (var i = 0; i < seletores.length; i++) {
+        var elementos = doc.querySelectorAll(seletores[i]);
+        for (var j = 0; j < elementos.length; j++) {
+            if (visivel(elementos[j])) {
+                return false;
+            }
+        }
+    }
+    return true;
+}
+
+"""
+
+ESTADO_PAGINA = _RASTREADOR_AJAX + """
+var janelas = [window];
+try {
+    if (window.top && window.top !== window) {
+        janelas.push(window.top);
+    }
+    var frames = window.top.document.querySelectorAll('iframe.tab-frame');
+    for (var k = 0; k < frames.length; k++) {
+        if (frames[k].contentWindow && frames[k].contentWindow !== window) {
+            janelas.push(frames[k].contentWindow);
+        }
+    }
+} catch (e) {
+    // Frames de outra origem: verifica apenas o que for acessível
+}
+
+var pronta = true;
+var pendentes = 0;
+var ultimaAtividade = 0;
+
+for (var w = 0; w < janelas.length; w++) {
+    var doc = null;
+    try {
+        doc = janelas[w].document;
+        instalar(janelas[w]);
+    } catch (e) {
+        continue;
+    }
+
+    if (!documentoPronto(doc)) {
+        pronta = false;
+    }
+
+    var estado = janelas[w].__rpaAjax;
+    if (estado) {
+        pendentes += estado.pendentes + estado.totalTimers;
+        ultimaAtividade = Math.max(ultimaAtividade, estado.ultimaAtividade);
+    }
+}
+
+return {
+    pronta: pronta,
+    pendentes: pendentes,
+    ocioso_ms: pendentes > 0 ? -1 : Date.now() - ultimaAtividade
+};
+"""
+
+# Mesmo estado de ESTADO_PAGINA, mas apenas do iframe de uma aba.
+# Usado pelo executor de várias abas para saber qual aba pode avançar.
+#
+# arguments[0..2]: iguais aos de ESTADO_PAGINA
+# arguments[3]: índice da aba (iframe.tab-frame)
+ESTADO_ABA = _RASTREADOR_AJAX + """
+var frames = window.top.document.querySelectorAll('iframe.tab-frame');
+var frame = frames[arguments[3]];
+var indisponivel = {pronta: false, pendentes: 0, ocioso_ms: -1};
+
+if (!frame) {
+    return indisponivel;
+}
+
+var win = null;
+var doc = null;
+try {
+    win = frame.contentWindow;
+    doc = win.document;
+    instalar(win);
+} catch (e) {
+    return indisponivel;
+}
+
+// Janela antiga de uma aba recarregada (ver RECARREGAR_ABA) ou iframe vazio
+if (win.__rpaRecarregando || doc.location.href === 'about:blank') {
+    return indisponivel;
+}
+
+var estado = win.__rpaAjax;
+var pendentes = estado.pendentes + estado.totalTimers;
+
+return {
+    pronta: documentoPronto(doc),
+    pendentes: pendentes,
+    ocioso_ms: pendentes > 0 ? -1 : Date.now() - estado.ultimaAtividade
+};
+"""
+
+# arguments[0]: elemento que acabou de receber texto + TAB.
+# O valor é considerado confirmado quando o foco saiu do campo.
+VALOR_CONFIRMADO = """
+var el = arguments[0];
+return !!el && el.ownerDocument.activeElement !== el;
+"""
+
+# =============================
+# OBSERVADOR DE MENSAGENS (erro / alerta)
+# =============================
+
+# Instala (uma única vez por documento) um MutationObserver que registra cada
+# aparição das caixas errorMessageBox/alertMessageBox no documento principal
+# e nos iframes das abas. Os eventos ficam em window.top.__rpaMensagens com
+# número de sequência crescente e um identificador da página: ao recarregar
+# a página principal o registro recomeça do zero com outro identificador.
+#
+# arguments[0]: sequência a partir da qual retornar eventos (exclusiva)
+# arguments[1]: tipo desejado ("erro", "alerta") ou null para ambos
+# arguments[2]: se true, clica em OK nas caixas visíveis do tipo desejado
+# arguments[3]: página da sequência informada; se for outra, todos os eventos
+#               da página atual são posteriores a ela
+#
+# Retorno: {seq, pagina, eventos: [{seq, tipo, texto, ts}]}
+MENSAGENS = """
+var desde = arguments[0] || 0;
+var tipoDesejado = arguments[1] || null;
+var fechar = !!arguments[2];
+var paginaDesde = arguments[3] || null;
+
+var CAIXAS = {errorMessageBox: 'erro', alertMessageBox: 'alerta'};
+var topo = window.top;
+
+if (!topo.__rpaMensagens) {
+    topo.__rpaMensagens = {
+        seq: 0,
+        eventos: [],
+        pagina: Date.now().toString(36) + Math.random().toString(36).slice(2)
+    };
+}
+var registro = topo.__rpaMensagens;
+if (paginaDesde && paginaDesde !== registro.pagina) {
+    desde = 0;
+}
+
+function visivel(el) {
+    return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+}
+
+function verificarCaixas(doc) {
+    for (var id in CAIXAS) {
+        var caixa = doc.getElementById(id);
+        var aberta = !!caixa && visivel(caixa);
+        if (aberta && !caixa.__rpaEvento) {
+            caixa.__rpaEvento = {seq: ++registro.seq, tipo: CAIXAS[id], texto: '', ts: Date.now()};
+            registro.eventos.push(caixa.__rpaEvento);
+            if (registro.eventos.length > 200) {
+                registro.eventos.shift();
+            }
+        }
+        if (aberta && !caixa.__rpaEvento.texto) {
+            // O texto pode ser preenchido depois da caixa ficar visível
+            var conteudo = caixa.querySelector('.dialog-content div');
+            caixa.__rpaEvento.texto = conteudo ? (conteudo.innerText || conteudo.textContent || '').trim() : '';
+        } else if (caixa && !aberta) {
+            caixa.__rpaEvento = null;
+        }
+    }
+}
+
+function instalar(doc) {
+    if (!doc || !doc.documentElement) {
+        return;
+    }
+    if (!doc.__rpaObservador && doc.defaultView && doc.defaultView.MutationObserver) {
+        doc.__rpaObservador = new doc.defaultView.MutationObserver(function () {
+            verificarCaixas(doc);
+        });
+        doc.__rpaObservador.observe(doc.documentElement, {
+            childList: true,
+            subtree: true,
+            characterData: true,
+            attributes: true,
+            attributeFilter: ['style', 'class']
+        });
+    }
+    // Varredura imediata: pega caixas que já estavam abertas antes do observador
+    verificarCaixas(doc);
+}
+
+var documentos = [];
+try {
+    documentos.push(topo.document);
+    var frames = topo.document.querySelectorAll('iframe.tab-frame');
+    for (var k = 0; k < frames.length; k++) {
+        if (frames[k].contentDocument) {
+            documentos.push(frames[k].contentDocument);
+        }
+    }
+} catch (e) {
+    documentos.push(document);
+}
+
+for (var d = 0; d < documentos.length; d++) {
+    try {
+        instalar(documentos[d]);
+    } catch (e) {
+        // documento inacessível ou recarregando
+    }
+}
+
+if (fechar) {
+    for (var f = 0; f < documentos.length; f++) {
+        for (var idCaixa in CAIXAS) {
+            if (tipoDesejado && CAIXAS[idCaixa] !== tipoDesejado) {
+                continue;
+            }
+            var aberta = documentos[f].getElementById(idCaixa);
+            if (aberta && visivel(aberta)) {
+                var ok = aberta.querySelector('#confirm');
+                if (ok) {
+                    ok.click();
+                }
+            }
+        }
+    }
+}
+
+var eventos = [];
+for (var i = 0; i < registro.eventos.length; i++) {
+    var ev = registro.eventos[i];
+    if (ev.seq > desde && (!tipoDesejado || ev.tipo === tipoDesejado)) {
+        eventos.push(ev);
+    }
+}
+
+return {seq: registro.seq, pagina: registro.pagina, eventos: eventos};
+"""
+
+# =============================
+# ÍNDICE DO MENU
+# =============================
+
+# Mantém em window.top um índice rótulo -> elementos da árvore de menu
+# (webguiTreeNodeLabel). O índice só é reconstruído quando um MutationObserver
+# detecta mudança na árvore (nós adicionados/removidos).
+#
+# arguments[0]: classe dos rótulos do menu
+# arguments[1]: rótulo a clicar, ou null para apenas listar
+#
+# Retorno: {versao, rotulos: {rotulo: indice}, clicou}
+#   rotulos -> apenas quando arguments[1] é null (rótulos visíveis)
+#   clicou  -> true se encontrou e clicou no rótulo pedido
+MENU = """
+var classe = arguments[0];
+var alvo = arguments[1];
+var topo = window.top;
+var doc = topo.document;
+
+function normalizar(texto) {
+    return (texto || '').replace(/\\s+/g, ' ').trim();
+}
+
+function visivel(el) {
+    return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+}
+
+var cache = topo.__rpaMenu;
+if (!cache) {
+    cache = topo.__rpaMenu = {versao: 0, versaoIndice: -1, classe: null, elementos: [], porRotulo: {}};
+    new topo.MutationObserver(function (mutacoes) {
+        for (var m = 0; m < mutacoes.length; m++) {
+            if (mutacoes[m].type === 'childList') {
+                cache.versao++;
+                return;
+            }
+        }
+    }).observe(doc.body, {childList: true, subtree: true});
+}
+
+if (cache.versaoIndice !== cache.versao || cache.classe !== classe) {
+    cache.elementos = Array.prototype.slice.call(doc.getElementsByClassName(classe));
+    cache.porRotulo = {};
+    for (var i = 0; i < cache.elementos.length; i++) {
+        var rotulo = normalizar(cache.elementos[i].innerText || cache.elementos[i].textContent);
+        if (!rotulo) {
+            continue;
+        }
+        (cache.porRotulo[rotulo] = cache.porRotulo[rotulo] || []).push(i);
+    }
+    cache.versaoIndice = cache.versao;
+    cache.classe = classe;
+}
+
+if (alvo === null || alvo === undefined) {
+    var rotulos = {};
+    for (var r in cache.porRotulo) {
+        var indices = cache.porRotulo[r];
+        for (var j = 0; j < indices.length; j++) {
+            if (visivel(cache.elementos[indices[j]])) {
+                rotulos[r] = indices[j];
+                break;
+            }
+        }
+    }
+    return {versao: cache.versao, rotulos: rotulos, clicou: false};
+}
+
+var candidatos = cache.porRotulo[normalizar(alvo)] || [];
+for (var c = 0; c < candidatos.length; c++) {
+    var el = cache.elementos[candidatos[c]];
+    if (!visivel(el)) {
+        continue;
+    }
+    el.scrollIntoView({block: 'nearest'});
+    var tipos = ['mousedown', 'mouseup', 'click'];
+    for (var t = 0; t < tipos.length; t++) {
+        el.dispatchEvent(new topo.MouseEvent(tipos[t], {bubbles: true, cancelable: true, view: topo}));
+    }
+    return {versao: cache.versao, clicou: true};
+}
+return {versao: cache.versao, clicou: false};
+"""
+
+# =============================
+# ABAS DO INNOVARO
+# =============================
+
+# arguments[0]: rótulo da aba procurada, posição da aba (número) ou null
+# arguments[1]: se true, ativa (clica) a aba encontrada
+#
+# Retorno: {rotulos: [...], indice}  (indice = -1 se não encontrou)
+ABAS = """
+var alvo = arguments[0];
+var ativar = !!arguments[1];
+var topo = window.top;
+
+function normalizar(texto) {
+    return (texto || '').replace(/\\s+/g, ' ').trim();
+}
+
+var abas = topo.document.querySelectorAll('#tabs .process-tab-label');
+var rotulos = [];
+var indice = -1;
+
+for (var i = 0; i < abas.length; i++) {
+    var rotulo = normalizar(abas[i].innerText || abas[i].textContent);
+    rotulos.push(rotulo);
+    if (indice < 0 && typeof alvo === 'string' && rotulo === normalizar(alvo)) {
+        indice = i;
+    }
+}
+
+// Alvo numérico: a própria posição da aba
+if (typeof alvo === 'number' && alvo >= 0 && alvo < abas.length) {
+    indice = alvo;
+}
+
+if (indice >= 0 && ativar) {
+    var tipos = ['mousedown', 'mouseup', 'click'];
+    for (var t = 0; t < tipos.length; t++) {
+        abas[indice].dispatchEvent(new topo.MouseEvent(tipos[t], {bubbles: true, cancelable: true, view: topo}));
+    }
+}
+
+return {rotulos: rotulos, indice: indice};
+"""
+
+# arguments[0]: índice do iframe da aba (tab-frame) a recarregar
+RECARREGAR_ABA = """
+var frames = window.top.document.querySelectorAll('iframe.tab-frame');
+var frame = frames[arguments[0]];
+if (!frame || !frame.contentWindow) {
+    return false;
+}
+// Marca a janela antiga: ESTADO_ABA só a considera pronta depois da nova carregar
+frame.contentWindow.__rpaRecarregando = true;
+frame.contentWindow.location.reload();
+return true;
+"""
+
+# =============================
+# FORMULÁRIOS
+# =============================
+
+# Funções de localização compartilhadas pelos scripts de formulário.
+# Suporta os mesmos tipos de seletor do Selenium (By.*).
+_LOCALIZAR = """
+function localizar(by, valor) {
+    if (by === 'xpath') {
+        return document.evaluate(valor, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    }
+    if (by === 'id') {
+        return document.getElementById(valor);
+    }
+    if (by === 'name') {
+        return document.getElementsByName(valor)[0] || null;
+    }
+    if (by === 'class name') {
+        return document.getElementsByClassName(valor)[0] || null;
+    }
+    if (by === 'tag name') {
+        return document.getElementsByTagName(valor)[0] || null;
+    }
+    return document.querySelector(valor);
+}
+"""
+
+# arguments[0]: lista de [by, valor, texto]
+# Define o valor de cada campo e dispara input/change/blur, na ordem.
+# Retorno: lista de índices dos campos não encontrados.
+PREENCHER_CAMPOS = _LOCALIZAR + """
+var campos = arguments[0];
+var faltando = [];
+
+function disparar(el, tipo) {
+    el.dispatchEvent(new Event(tipo, {bubbles: true}));
+}
+
+for (var i = 0; i < campos.length; i++) {
+    var el = localizar(campos[i][0], campos[i][1]);
+    if (!el) {
+        faltando.push(i);
+        continue;
+    }
+    el.focus();
+    el.value = campos[i][2];
+    disparar(el, 'input');
+    disparar(el, 'change');
+    el.blur();
+    disparar(el, 'blur');
+}
+return faltando;
+"""
+
+# arguments[0]: lista de [by, valor]
+# Retorno: lista com o value atual de cada campo (null se não encontrado).
+LER_CAMPOS = _LOCALIZAR + """
+var campos = arguments[0];
+var valores = [];
+for (var i = 0; i < campos.length; i++) {
+    var el = localizar(campos[i][0], campos[i][1]);
+    valores.push(el ? (el.value || '').trim() : null);
+}
+return valores;
+"""
@@ -0,0 +1,466 @@
+"""
+Fluxos declarativos para as telas do Innovaro.
+
+Em vez de encadear clicar_v2/escrever/esperar/obter_mensagem_erro à mão, o
+fluxo de uma tela é uma lista de passos (dados) e o MotorFluxo executa a
+lista para cada linha:
+
+    PASSOS = [
+        Clicar(INSERT, "Clicando em insert"),
+        Pausa(.5, intercalar=True),
+        Ler(CHAVE, "chave", "Buscando chave"),
+        Etapa(checkpoints.CHAVE_OBTIDA),
+        Campo(RECURSO, "{item}", rotulo="recurso"),
+        Campo(QUANTIDADE, "{quantidade}", rotulo="quantidade"),
+        Clicar(GRAVAR, "Clicando em gravar", contexto=PRINCIPAL, verificar=True),
+        Etapa(checkpoints.GRAVADO),
+    ]
+
+Como o motor enxerga a sequência inteira, ele otimiza a execução de
+todos os bots de uma vez:
+
+    - Campos seguidos viram um único preencher_formulario (as pausas entre
+      eles são descartadas: o preenchimento já aguarda cada confirmação)
+    - Pausas seguidas viram uma só
+    - Cada passo diz em que documento está (iframe da aba ou principal); o
+      motor só troca de documento quando muda e clica direto no documento
+      certo, sem a varredura de iframes do clicar_v2 (usada só como reserva)
+    - Mensagens de erro/alerta são lidas apenas nos passos marcados
+
+O seletor de um passo pode ser um XPath (com `by`) ou um Seletor registrado
+em core/seletores.py, resolvido pelo ranking de alternativas na hora.
+
+Valores dos campos: texto com {nome} (formatado com os dados da linha) ou
+callable(dados). `Etapa` grava o checkpoint da linha (core/checkpoints.py);
+uma linha já gravada no ERP só tem o status reportado. A última Etapa é a
+gravação: antes de marcá-la o motor espera o Innovaro responder ao último
+clique e confere as caixas de erro/alerta que apareceram desde ele (um erro
+ali encerra a linha com o erro, não com OK).
+
+MotorFluxo.linha(dados) é um gerador de Espera, então roda tanto em
+executar_sequencial quanto no ExecutorMultiAba (ver core/multiaba.py). O
+contrato das esperas vale aqui: só use Pausa(intercalar=True) depois de
+passos que não geram mensagens.
+"""
+
+import re
+
+from selenium.webdriver.common.by import By
+
+from core import checkpoints
+from core.erp_core import COMMIT_TECLADO, log
+from core.multiaba import Espera
+from core.seletores import Seletor
+
+# Documento em que o elemento do passo está
+ABA = "aba"                # iframe da aba da linha
+PRINCIPAL = "principal"    # documento principal (barra de botões, caixas de confirmação)
+QUALQUER = None            # desconhecido: procura em todos (clicar_v2)
+
+# Tratamento da caixa de alerta após um passo
+ALERTA_AVISO = "aviso"     # apenas registra
+ALERTA_ERRO = "erro"       # trata como erro da linha
+
+# Teto do clique direto antes de recorrer à varredura do clicar_v2
+TETO_CLIQUE_DIRETO = 10
+
+# Valor de campo que é só um dado da linha, ex.: "{item}"
+_CHAVE_CAMPO = re.compile(r"\{(\w+)\}")
+
+
+# =============================
+# PASSOS
+# =============================
+
+class Clicar:
+    """
+    Clique em um elemento.
+
+    verificar: lê a caixa de erro depois do clique (erro encerra a linha)
+    alerta: ALERTA_AVISO / ALERTA_ERRO para ler também a caixa de alerta
+    tentativas: tentativas do clicar_v2, se o clique direto não encontrar o elemento
+    """
+
+    def __init__(self, seletor, rotulo=None, contexto=ABA, by=By.XPATH, verificar=False, alerta=None, tentativas=5):
+        self.seletor = seletor
+        self.rotulo = rotulo
+        self.contexto = contexto
+        self.by = by
+        self.verificar = verificar
+        self.alerta = alerta
+        self.tentativas = tentativas
+
+
+class Campo:
+    """Campo de formulário; campos seguidos são escritos juntos (preencher_formulario)."""
+
+    def __init__(self, seletor, valor, commit=COMMIT_TECLADO, rotulo=None, contexto=ABA, by=By.XPATH):
+        self.seletor = seletor
+        self.valor = valor
+        self.commit = commit
+        self.rotulo = rotulo
+        self.contexto = contexto
+        self.by = by
+
+
+class Digitar:
+    """
+    Digitação isolada com escrever (campos de grade e lookups, que não podem
+    ser escritos em lote). conferir: confere com verificar_se_escreveu.
+    """
+
+    def __init__(self, seletor, valor, rotulo=None, conferir=False, contexto=ABA, by=By.XPATH):
+        self.seletor = seletor
+        self.valor = valor
+        self.rotulo = rotulo
+        self.conferir = conferir
+        self.contexto = contexto
+        self.by = by
+
+
+class Ler:
+    """Lê o valor de um campo para os dados da linha (dados[nome])."""
+
+    def __init__(self, seletor, nome, rotulo=None, contexto=ABA, by=By.XPATH):
+        self.seletor = seletor
+        self.nome = nome
+        self.rotulo = rotulo
+        self.contexto = contexto
+        self.by = by
+
+
+class AguardarElemento:
+    """Espera um elemento aparecer (ex.: modal de confirmação)."""
+
+    def __init__(self, seletor, rotulo=None, contexto=PRINCIPAL, by=By.XPATH, teto=None):
+        self.seletor = seletor
+        self.rotulo = rotulo
+        self.contexto = contexto
+        self.by = by
+        self.teto = teto
+
+
+class Pausa:
+    """
+    Espera o Innovaro responder (teto em segundos).
+    intercalar: permite ao ExecutorMultiAba avançar outra aba enquanto isso.
+    """
+
+    def __init__(self, teto=.5, intercalar=False):
+        self.teto = teto
+        self.intercalar = intercalar
+
+
+class Etapa:
+    """
+    Marca a etapa como concluída no checkpoint da linha (core/checkpoints.py).
+    A última Etapa dos passos confere as mensagens do último clique (ver MotorFluxo).
+    """
+
+    def __init__(self, nome):
+        self.nome = nome
+
+
+class _Formulario:
+    """Campos seguidos agrupados pelo compilador."""
+
+    def __init__(self, campos):
+        self.campos = campos
+        self.contexto = campos[0].contexto
+
+
+def compilar(passos):
+    """
+    Junta campos seguidos (descartando pausas entre eles) e pausas seguidas.
+    Retorna a lista de passos executada pelo motor.
+    """
+    compilado = []
+    for passo in passos:
+        anterior = compilado[-1] if compilado else None
+
+        if isinstance(passo, Campo):
+            # Pausa entre campos do mesmo documento: descartada, os campos são juntados
+            if (
+                isinstance(anterior, Pausa)
+                and len(compilado) >= 2
+                and isinstance(compilado[-2], _Formulario)
+                and compilado[-2].contexto == passo.contexto
+            ):
+                compilado.pop()
+                anterior = compilado[-1]
+            if isinstance(anterior, _Formulario) and anterior.contexto == passo.contexto:
+                anterior.campos.append(passo)
+            else:
+                compilado.append(_Formulario([passo]))
+            continue
+
+        if isinstance(passo, Pausa) and isinstance(anterior, Pausa):
+            compilado[-1] = Pausa(anterior.teto + passo.teto, anterior.intercalar and passo.intercalar)
+            continue
+
+        compilado.append(passo)
+    return compilado
+
+
+# =============================
+# MOTOR
+# =============================
+
+class _Linha:
+    """Estado de uma linha em execução (várias podem estar intercaladas)."""
+
+    def __init__(self, dados, contexto=ABA):
+        self.dados = dados
+        # Por padrão a linha começa dentro do iframe da aba (garantir_tela / ExecutorMultiAba)
+        self.contexto = contexto
+        # Checkpoint das mensagens antes do clique de gravação (None = desde a última ação)
+        self.desde_gravacao = None
+
+
+class MotorFluxo:
+    """
+    Executa os passos de uma tela para cada linha.
+
+    fluxo: instância de BaseERP já logada
+    passos: lista de passos (ver módulo)
+    reportar: callable(dados, status, chave) que devolve o status da linha
+    tipo: tipo da linha nos checkpoints (None = sem checkpoints)
+    validador: ValidadorLinha (core/cadastros.py) que recusa a linha antes de
+        abrir a tela e aprende os valores que o ERP não encontrou (None = sem validação)
+    """
+
+    def __init__(self, fluxo, passos, reportar, tipo=None, validador=None):
+        self.fluxo = fluxo
+        self.passos = compilar(passos)
+        self.reportar = reportar
+        self.tipo = tipo
+        self.validador = validador
+
+        # Última Etapa (gravação) e o último clique antes dela (o que grava)
+        etapas = [i for i, passo in enumerate(self.passos) if isinstance(passo, Etapa)]
+        self._gravacao = etapas[-1] if etapas else None
+        cliques = [i for i, passo in enumerate(self.passos[:self._gravacao]) if isinstance(passo, Clicar)]
+        self._clique_gravar = cliques[-1] if cliques else None
+
+    def _valor(self, valor, dados):
+        if callable(valor):
+            return valor(dados)
+        if isinstance(valor, str):
+            return valor.format(**dados)
+        return valor
+
+    def _localizar(self, passo):
+        """(by, value) do passo; Seletor registrado é resolvido no documento atual."""
+        if isinstance(passo.seletor, Seletor):
+            return self.fluxo.localizar(passo.seletor)
+        return passo.by, passo.seletor
+
+    def _entrar(self, linha, contexto):
+        """Vai para o documento do passo, só se for diferente do atual."""
+        if contexto is QUALQUER or contexto == linha.contexto:
+            return
+        if contexto == PRINCIPAL:
+            self.fluxo.sair_iframe()
+        else:
+            # Sem aba definida (execução em uma aba só) fica no último iframe, como iframes()
+            self.fluxo.entrar_iframe_da_aba(-1 if self.fluxo.aba_atual is None else self.fluxo.aba_atual)
+        linha.contexto = contexto
+
+    def _falhar(self, linha, erro):
+        print(f"[ERRO] Pulando item devido ao erro: {erro}")
+        self.fluxo.sair_iframe()
+        linha.contexto = PRINCIPAL
+        self.fluxo.fechar_aba_ate_fechar()
+        self.reportar(linha.dados, erro, None)
+
+    def _clicar(self, linha, passo):
+        if passo.contexto is not QUALQUER:
+            self._entrar(linha, passo.contexto)
+            by, value = self._localizar(passo)
+            if self.fluxo.clicar_direto(by, value, TETO_CLIQUE_DIRETO):
+                return
+            log.warning(f"Elemento fora do documento esperado ({passo.contexto}): {value}")
+        else:
+            by, value = self._localizar(passo)
+
+        self.fluxo.clicar_v2(by, value, passo.tentativas)
+        # O clicar_v2 pode ter parado em qualquer documento
+        linha.contexto = QUALQUER
+
+    def _mensagens(self, linha, passo):
+        """Lê as caixas marcadas no passo. Retorna o erro da linha ou None."""
+        if (passo.verificar or passo.alerta) and self.fluxo.espera_fixa:
+            # Sem o observador de mensagens as caixas são procuradas no documento principal
+            self._entrar(linha, PRINCIPAL)
+
+        if passo.verificar:
+            erro = self.fluxo.obter_mensagem_erro()
+            if erro:
+                return erro
+
+        if passo.alerta:
+            alerta = self.fluxo.obter_mensagem_alert()
+            if alerta:
+                if passo.alerta == ALERTA_ERRO:
+                    return alerta
+                print(f"[ALERTA] Apenas um alerta: {alerta}")
+        return None
+
+    def _marcar_gravacao(self, linha):
+        """Checkpoint das mensagens antes do clique de gravação (só no modo condicional)."""
+        if self.fluxo.espera_fixa:
+            return
+        try:
+            linha.desde_gravacao = self.fluxo.checkpoint_mensagens()
+        except Exception as e:
+            log.debug(f"Não foi possível ler o checkpoint das mensagens: {e}")
+
+    def _conferir_gravacao(self, linha):
+        """
+        Espera a resposta do clique de gravação e retorna o erro que apareceu
+        desde ele, ou None. No modo fixo as caixas já lidas pelo clique
+        (verificar/alerta) não são procuradas de novo.
+        """
+        clique = self.passos[self._clique_gravar] if self._clique_gravar is not None else None
+        verificado = self.fluxo.espera_fixa and clique is not None and clique.verificar
+        alertado = clique is not None and clique.alerta
+
+        if self.fluxo.espera_fixa:
+            if verificado and alertado:
+                return None
+            self._entrar(linha, PRINCIPAL)
+
+        if not verificado:
+            erro = self.fluxo.obter_mensagem_erro(desde=linha.desde_gravacao)
+            if erro:
+                return erro
+
+        if not alertado:
+            alerta = self.fluxo.obter_mensagem_alert(desde=linha.desde_gravacao)
+            if alerta:
+                print(f"[ALERTA] Apenas um alerta: {alerta}")
+        return None
+
+    def _preencher(self, linha, passo):
+        self._entrar(linha, passo.contexto)
+        rotulos = [campo.rotulo for campo in passo.campos if campo.rotulo]
+        if rotulos:
+            print(f"Escrevendo {', '.join(rotulos)}")
+
+        localizadores = [self._localizar(campo) for campo in passo.campos]
+        resultado = self.fluxo.preencher_formulario([
+            localizador + (self._valor(campo.valor, linha.dados), campo.commit)
+            for localizador, campo in zip(localizadores, passo.campos)
+        ])
+
+        if resultado["erro"] and self.validador is not None and resultado["campo"] in localizadores:
+            # Campo "{nome}" recusado pelo ERP: o validador guarda o valor de dados[nome]
+            campo = passo.campos[localizadores.index(resultado["campo"])]
+            nome = _CHAVE_CAMPO.fullmatch(campo.valor) if isinstance(campo.valor, str) else None
+            if nome:
+                self.validador.aprender(nome.group(1), linha.dados, resultado["erro"])
+        return resultado["erro"]
+
+    def _recusar(self, dados):
+        """Reporta a linha que não tem como passar no ERP (ver validador). Retorna True se recusou."""
+        if self.validador is None:
+            return False
+        motivo = self.validador.validar(dados)
+        if not motivo:
+            return False
+        print(f"[ERRO] Linha recusada antes do ERP: {motivo}")
+        self.reportar(dados, motivo, None)
+        return True
+
+    def recusar(self, dados):
+        """
+        Validação antecipada, antes de a linha chegar ao executor (que já abre
+        a tela): retorna True se a linha foi recusada e reportada. Linhas já
+        gravadas no ERP (checkpoint) nunca são recusadas.
+        """
+        if self.tipo is not None:
+            ponto = checkpoints.consultar(self.tipo, dados["id"])
+            if ponto is not None and ponto["etapa"] == checkpoints.GRAVADO:
+                return False
+        return self._recusar(dados)
+
+    def linha(self, dados, contexto=ABA):
+        """
+        Passos da linha, como gerador de Espera. `dados` precisa ter "id";
+        valores lidos (Ler) são guardados nele, e "chave" vai no status final.
+        contexto: documento em que a linha começa (QUALQUER = desconhecido, o
+        motor entra no documento do primeiro passo).
+        """
+        linha = _Linha(dados, contexto)
+
+        if self.tipo is not None:
+            ponto = checkpoints.retomar(self.tipo, dados["id"])
+            if ponto:
+                self.reportar(dados, 'OK', ponto["chave"])
+                return
+
+        if self._recusar(dados):
+            return
+
+        for indice, passo in enumerate(self.passos):
+            if isinstance(passo, Pausa):
+                yield Espera(passo.teto, exclusiva=not passo.intercalar)
+                continue
+
+            if isinstance(passo, Etapa):
+                if indice == self._gravacao:
+                    erro = self._conferir_gravacao(linha)
+                    if erro:
+                        self._falhar(linha, erro)
+                        return
+                if self.tipo is not None:
+                    checkpoints.marcar(self.tipo, dados["id"], passo.nome, dados.get("chave"))
+                continue
+
+            if isinstance(passo, _Formulario):
+                erro = self._preencher(linha, passo)
+                if erro:
+                    self._falhar(linha, erro)
+                    return
+                continue
+
+            if getattr(passo, "rotulo", None):
+                print(passo.rotulo)
+
+            if isinstance(passo, Clicar):
+                if indice == self._clique_gravar:
+                    self._marcar_gravacao(linha)
+                self._clicar(linha, passo)
+                erro = self._mensagens(linha, passo)
+                if erro:
+                    self._falhar(linha, erro)
+                    return
+
+            elif isinstance(passo, Digitar):
+                self._entrar(linha, passo.contexto)
+                by, value = self._localizar(passo)
+                texto = self._valor(passo.valor, dados)
+                self.fluxo.escrever(by, value, texto)
+                if passo.conferir:
+                    self.fluxo.verificar_se_escreveu(by, value, texto)
+
+            elif isinstance(passo, Ler):
+                self._entrar(linha, passo.contexto)
+                dados[passo.nome] = self.fluxo.buscar_valor(*self._localizar(passo))
+                # apenas para debugar
+                print(dados[passo.nome])
+
+            elif isinstance(passo, AguardarElemento):
+                self._entrar(linha, passo.contexto)
+                by, value = self._localizar(passo)
+                if not self.fluxo.aguardar(
+                    lambda: self.fluxo.driver.find_elements(by, value),
+                    teto=passo.teto,
+                    minimo=0,
+                ):
+                    log.warning(f"Elemento não apareceu: {value}")
+
+            else:
+                raise TypeError(f"Passo desconhecido: {passo!r}")
+
+        self.reportar(dados, 'OK', dados.get("chave"))
@@ -0,0 +1,278 @@
+"""
+Execução intercalada de várias linhas em abas do Innovaro.
+
+A maior parte do tempo de uma linha é o Innovaro respondendo ao servidor;
+enquanto isso o Selenium fica parado. Aqui cada linha roda em uma aba
+(processo) própria da mesma sessão e o executor avança a aba cuja espera
+já terminou, mantendo várias linhas em andamento sem abrir outro navegador.
+
+Para isso o fluxo de uma linha é escrito como gerador: em vez de chamar
+self.esperar(...) nos pontos em que aguarda o servidor, ele faz
+`yield Espera(...)` e devolve o controle ao executor.
+
+    def passos_linha(self, row):
+        self.clicar_v2(...)
+        yield Espera(0.5)                     # pode intercalar com outras abas
+        ...
+        yield Espera(0.5, exclusiva=True)     # espera aqui mesmo, sem trocar de aba
+
+Contrato: as caixas de erro/alerta do Innovaro são do documento principal
+(compartilhadas entre as abas). Só use espera não exclusiva depois de ações
+que não geram mensagens (mudar visualização, novo registro, carregar a
+tela); ações que podem gerar erro devem ter as mensagens lidas antes do
+próximo `yield` não exclusivo.
+
+executar_sequencial roda o mesmo gerador em uma aba só, com as esperas
+normais do BaseERP, e é o comportamento padrão (abas_simultaneas = 1).
+"""
+
+import time
+from collections import deque
+
+from core import erp_js, profiler
+from core.erp_core import TELAS, log
+
+
+class Espera:
+    """
+    Ponto de espera devolvido pelo gerador de uma linha.
+
+    teto: tempo máximo (e tempo exato no modo de espera fixo), em segundos
+    condicao: callable avaliado dentro do iframe da aba; None = aba ociosa
+    exclusiva: se True, espera sem ceder a vez para outras abas
+    """
+
+    __slots__ = ("teto", "condicao", "exclusiva")
+
+    def __init__(self, teto=0.5, condicao=None, exclusiva=False):
+        self.teto = teto
+        self.condicao = condicao
+        self.exclusiva = exclusiva
+
+
+def executar_sequencial(fluxo, tela, passos, rows, chave=lambda linha: linha[0]):
+    """Processa as linhas uma a uma na mesma aba (comportamento clássico)."""
+    for row in rows:
+        with profiler.medir_linha(chave(row)):
+            try:
+                fluxo.garantir_tela(tela)
+                for espera in passos(row):
+                    fluxo.esperar(espera.teto, espera.condicao)
+            except Exception:
+                fluxo.linha_com_falha = chave(row)
+                raise
+
+
+class _Slot:
+    """Uma aba do Innovaro ocupada por uma linha em andamento."""
+
+    def __init__(self, indice):
+        self.indice = indice
+        self.row = None
+        self.gerador = None
+        self.espera = None
+        self.desde = 0.0
+        self.inicio_linha = 0.0
+        self.em_iframe = True
+
+
+class ExecutorMultiAba:
+    """
+    Mantém até `abas` linhas em andamento, cada uma em uma aba da tela `tela`.
+
+    fluxo: instância de BaseERP já logada
+    tela: nome da tela em TELAS
+    passos: callable(row) -> gerador de Espera (ver módulo)
+    """
+
+    # Teto da espera pela tela carregar em uma aba nova ou recarregada
+    TETO_CARREGAR_ABA = 10
+
+    def __init__(self, fluxo, tela, passos, abas=2, chave=lambda linha: linha[0]):
+        self.fluxo = fluxo
+        self.tela = tela
+        self.passos = passos
+        self.abas = max(1, int(abas))
+        self.chave = chave
+        self._ativo = None
+
+    # =============================
+    # ABAS
+    # =============================
+
+    def _rotulos(self):
+        return self.fluxo.abas_abertas().get("rotulos", [])
+
+    def _abas_da_tela(self):
+        rotulo = TELAS[self.tela]["aba"]
+        return [i for i, r in enumerate(self._rotulos()) if r == rotulo]
+
+    def _abrir_aba(self):
+        """Abre mais uma aba da tela pelo menu. Retorna o índice ou -1."""
+        self.fluxo.sair_iframe()
+        self._ativo = None
+        antes = len(self._rotulos())
+
+        if not self.fluxo.navegar_menu(TELAS[self.tela]["caminho"]):
+            return -1
+        if not self.fluxo.aguardar(lambda: len(self._rotulos()) > antes, teto=self.fluxo.timeout):
+            # O Innovaro não abriu outra instância da tela: segue com as abas que já tem
+            return -1
+        return len(self._rotulos()) - 1
+
+    def _recarregar(self, slot):
+        self.fluxo.driver.execute_script(erp_js.RECARREGAR_ABA, slot.indice)
+
+    def _aba_fechada(self, indice, slots):
+        """Reindexa as abas à direita de uma aba que foi fechada."""
+        for outro in slots:
+            if outro.indice > indice:
+                outro.indice -= 1
+        if self._ativo is not None and self._ativo.indice == indice:
+            self._ativo = None
+
+    # =============================
+    # LINHAS
+    # =============================
+
+    def _iniciar(self, slot, row):
+        slot.row = row
+        slot.gerador = self.passos(row)
+        slot.inicio_linha = time.monotonic()
+        slot.em_iframe = True
+        # Primeira espera de toda linha: a tela da aba terminar de carregar
+        slot.espera = Espera(self.TETO_CARREGAR_ABA)
+        slot.desde = time.monotonic()
+
+    def _terminar(self, slot, falhou=False):
+        profiler.registrar(profiler.CHAVE_LINHA, time.monotonic() - slot.inicio_linha, falhou=falhou)
+        slot.row = None
+        slot.gerador = None
+        slot.espera = None
+
+    def _resolvida(self, slot):
+        """Indica se a espera pendente da aba já terminou (sem bloquear)."""
+        espera = slot.espera
+        decorrido = time.monotonic() - slot.desde
+
+        if decorrido >= espera.teto:
+            return True
+        if self.fluxo.espera_fixa or decorrido < self.fluxo.espera_minima:
+            return False
+
+        try:
+            if espera.condicao is None:
+                return self.fluxo.aba_ociosa(slot.indice)
+            self.fluxo.entrar_iframe_da_aba(slot.indice)
+            self._ativo = None
+            return bool(espera.condicao())
+        except Exception:
+            return False
+
+    def _proximo(self, slots):
+        """Espera até alguma aba poder avançar, começando pela seguinte à última avançada."""
+        inicio = slots.index(self._ativo) + 1 if self._ativo in slots else 0
+        ordem = slots[inicio:] + slots[:inicio]
+        while True:
+            for slot in ordem:
+                if self._resolvida(slot):
+                    return slot
+            time.sleep(self.fluxo.intervalo_verificacao)
+
+    def _restaurar_contexto(self, slot):
+        """Ativa a aba e volta ao documento em que a linha parou (pulado se nada mudou)."""
+        if self._ativo is slot:
+            return
+        driver = self.fluxo.driver
+        driver.switch_to.default_content()
+        self.fluxo.abas_abertas(slot.indice, ativar=True)
+        if slot.em_iframe:
+            self.fluxo.entrar_iframe_da_aba(slot.indice)
+        self._ativo = slot
+
+    def _avancar(self, slot):
+        """
+        Roda a linha da aba até o próximo `yield` não exclusivo.
+        Retorna False quando a linha terminou.
+        """
+        self._restaurar_contexto(slot)
+        self.fluxo.aba_atual = slot.indice
+        self.fluxo.ultima_aba_fechada = None
+        anterior = profiler.definir_linha(self.chave(slot.row))
+
+        try:
+            espera = next(slot.gerador)
+            while espera.exclusiva:
+                self.fluxo.esperar(espera.teto, espera.condicao)
+                espera = next(slot.gerador)
+        except StopIteration:
+            self._terminar(slot)
+            return False
+        except Exception:
+            self.fluxo.linha_com_falha = self.chave(slot.row)
+            self._terminar(slot, falhou=True)
+            raise
+        finally:
+            profiler.definir_linha(anterior)
+
+        slot.espera = espera
+        slot.desde = time.monotonic()
+        slot.em_iframe = not self.fluxo.driver.execute_script("return window === window.top;")
+        return True
+
+    # =============================
+    # EXECUÇÃO
+    # =============================
+
+    def executar(self, rows):
+        """Processa `rows` mantendo até `abas` linhas em andamento."""
+        pendentes = deque(rows)
+        slots = []
+        pode_abrir = True
+        self._ativo = None
+
+        try:
+            # Reaproveita as abas da tela que já estiverem abertas
+            for indice in self._abas_da_tela()[:self.abas]:
+                if not pendentes:
+                    break
+                slot = _Slot(indice)
+                self._recarregar(slot)
+                self._iniciar(slot, pendentes.popleft())
+                slots.append(slot)
+
+            while pendentes or slots:
+                while pendentes and pode_abrir and len(slots) < self.abas:
+                    indice = self._abrir_aba()
+                    if indice < 0:
+                        pode_abrir = False
+                        break
+                    slot = _Slot(indice)
+                    self._iniciar(slot, pendentes.popleft())
+                    slots.append(slot)
+
+                if not slots:
+                    log.warning(f"Nenhuma aba de '{self.tela}' disponível; seguindo em uma aba só.")
+                    self.fluxo.aba_atual = None
+                    executar_sequencial(self.fluxo, self.tela, self.passos, list(pendentes), self.chave)
+                    pendentes.clear()
+                    break
+
+                slot = self._proximo(slots)
+                if self._avancar(slot):
+                    continue
+
+                # Linha terminou: a aba pode ter sido fechada pelo próprio fluxo (erro)
+                if self.fluxo.ultima_aba_fechada == slot.indice:
+                    slots.remove(slot)
+                    self._aba_fechada(slot.indice, slots)
+                    pode_abrir = True
+                elif pendentes:
+                    self._recarregar(slot)
+                    self._ativo = None
+                    self._iniciar(slot, pendentes.popleft())
+                else:
+                    slots.remove(slot)
+        finally:
+            self.fluxo.aba_atual = None
+            self.fluxo.sair_iframe()
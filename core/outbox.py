@@ -0,0 +1,410 @@
+"""
+Caixa de saída durável para os status enviados à API do Django.
+
+Os fluxos não chamam mais a API diretamente: o status é gravado em um
+arquivo SQLite local (outbox/outbox.sqlite3) e uma thread em segundo plano
+entrega as mensagens com uma sessão HTTP reaproveitada (keep-alive), em
+lotes, com novas tentativas e um disjuntor que pausa os envios quando o
+servidor está fora. O bot segue para a próxima linha sem esperar a rede, e
+mensagens não entregues sobrevivem a quedas do processo.
+
+Mensagens descartadas (resposta 4xx definitiva ou ERP_OUTBOX_TENTATIVAS_MAX
+falhas) continuam bloqueando a linha em chaves_pendentes: o documento já
+existe no ERP e refazer a linha o duplicaria. Um operador decide o destino
+delas pelo gerenciador (listar_descartadas / resolver_descartada).
+
+Com `checkpoint` (tipo da linha em core/checkpoints.py), o checkpoint da
+linha só é encerrado (REPORTADO) quando o Django confirma a entrega: até lá
+uma linha GRAVADO continua marcada como gravada no ERP. Na entrega também
+é removida a reserva retida da linha (core/reservas.py, concluir).
+
+Configuração (por bot, ex.: ERP_OUTBOX_LOTE_REQUISITAR_ITEM, ou geral):
+    ERP_OUTBOX_LOTE               mensagens por rodada de envio (padrão 20)
+    ERP_OUTBOX_TENTATIVAS_MAX     tentativas até descartar a mensagem (padrão 10)
+    ERP_OUTBOX_DISJUNTOR_FALHAS   falhas seguidas que abrem o disjuntor (padrão 3)
+    ERP_OUTBOX_DISJUNTOR_PAUSA_S  tempo com o disjuntor aberto (padrão 60)
+    ERP_OUTBOX_ESPERA_SAIDA_S     tempo para esvaziar a fila ao encerrar (padrão 15)
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core import checkpoints, reservas
+from core.db import get_bot_setting
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OUTBOX_DIR = BASE_DIR / "outbox"
+OUTBOX_DB = OUTBOX_DIR / "outbox.sqlite3"
+
+TIMEOUT_ENVIO = 20
+
+# Respostas que não adianta repetir (payload inválido, rota inexistente...)
+_STATUS_DEFINITIVOS = {400, 401, 403, 404, 405, 410, 422}
+
+_lock = threading.Lock()
+_remetente: Optional["Remetente"] = None
+
+
+def _config(chave: str, padrao: str) -> str:
+    return get_bot_setting(os.getenv("BOT_NAME", "outbox"), chave, padrao)
+
+
+def _conectar() -> sqlite3.Connection:
+    OUTBOX_DIR.mkdir(exist_ok=True)
+    conn = sqlite3.connect(str(OUTBOX_DB), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mensagens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            destino TEXT NOT NULL,
+            chave TEXT,
+            payload TEXT NOT NULL,
+            headers TEXT,
+            descricao TEXT,
+            criado_em REAL NOT NULL,
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            proxima_tentativa REAL NOT NULL,
+            ultimo_erro TEXT,
+            descartada INTEGER NOT NULL DEFAULT 0,
+            checkpoint TEXT
+        )
+        """
+    )
+    colunas = {coluna for (_, coluna, *_) in conn.execute("PRAGMA table_info(mensagens)")}
+    if "checkpoint" not in colunas:
+        # Arquivo de uma versão anterior da caixa de saída
+        conn.execute("ALTER TABLE mensagens ADD COLUMN checkpoint TEXT")
+    return conn
+
+
+# =============================
+# FILA
+# =============================
+
+def enfileirar(destino: str, payload: Dict, headers: Optional[Dict] = None, descricao: Optional[str] = None,
+               checkpoint: Optional[str] = None) -> int:
+    """
+    Grava a mensagem na caixa de saída e acorda o remetente.
+    `checkpoint`: tipo da linha payload["id"] nos checkpoints, encerrado na entrega.
+    Retorna o id da mensagem. Não acessa a rede.
+    """
+    agora = time.time()
+    with _lock:
+        conn = _conectar()
+        try:
+            with conn:
+                cur = conn.execute(
+                    """
+                    INSERT INTO mensagens (destino, chave, payload, headers, descricao, criado_em, proxima_tentativa,
+                                           checkpoint)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        destino,
+                        None if payload.get("id") is None else str(payload.get("id")),
+                        json.dumps(payload),
+                        json.dumps(headers) if headers else None,
+                        descricao,
+                        agora,
+                        agora,
+                        checkpoint,
+                    ),
+                )
+                id_mensagem = cur.lastrowid
+        finally:
+            conn.close()
+
+    remetente().acordar()
+    return id_mensagem
+
+
+def chaves_pendentes(destino: str) -> Set[str]:
+    """
+    Ids (payload["id"]) com mensagem ainda não entregue para `destino`,
+    inclusive as descartadas que aguardam um operador. As consultas de
+    pendências ignoram essas linhas: o status já foi decidido, só falta
+    chegar ao Django.
+    """
+    with _lock:
+        conn = _conectar()
+        try:
+            linhas = conn.execute(
+                "SELECT DISTINCT chave FROM mensagens WHERE destino = ? AND chave IS NOT NULL",
+                (destino,),
+            ).fetchall()
+        finally:
+            conn.close()
+
+    if linhas:
+        # Sobras de uma execução anterior: garante que alguém está entregando
+        remetente().acordar()
+    return {chave for (chave,) in linhas}
+
+
+def quantidade_pendente() -> int:
+    with _lock:
+        conn = _conectar()
+        try:
+            (total,) = conn.execute("SELECT COUNT(*) FROM mensagens WHERE descartada = 0").fetchone()
+        finally:
+            conn.close()
+    return total
+
+
+def listar_descartadas() -> List[Dict]:
+    """Mensagens que o remetente desistiu de entregar, aguardando um operador."""
+    with _lock:
+        conn = _conectar()
+        try:
+            linhas = conn.execute(
+                """
+                SELECT id, destino, chave, payload, descricao, criado_em, tentativas, ultimo_erro
+                FROM mensagens
+                WHERE descartada = 1
+                ORDER BY id
+                """
+            ).fetchall()
+        finally:
+            conn.close()
+
+    colunas = ("id", "destino", "chave", "payload", "descricao", "criado_em", "tentativas", "ultimo_erro")
+    return [dict(zip(colunas, linha)) for linha in linhas]
+
+
+def resolver_descartada(id_mensagem: int, reenviar: bool = False) -> bool:
+    """
+    Resolve uma mensagem descartada: com `reenviar` ela volta para a fila com
+    as tentativas zeradas; sem, é apagada (o status foi acertado à mão no
+    Django), o checkpoint da linha é encerrado e a linha deixa de ser
+    bloqueada. Retorna False se não existe.
+    """
+    if not reenviar:
+        mensagem = _mensagem(id_mensagem)
+        if mensagem is None or not mensagem["descartada"]:
+            return False
+        _encerrar_checkpoint(mensagem["checkpoint"], mensagem["chave"])
+
+    with _lock:
+        conn = _conectar()
+        try:
+            with conn:
+                if reenviar:
+                    cur = conn.execute(
+                        """
+                        UPDATE mensagens
+                        SET descartada = 0, tentativas = 0, proxima_tentativa = ?
+                        WHERE id = ? AND descartada = 1
+                        """,
+                        (time.time(), id_mensagem),
+                    )
+                else:
+                    cur = conn.execute("DELETE FROM mensagens WHERE id = ? AND descartada = 1", (id_mensagem,))
+                return cur.rowcount > 0
+        finally:
+            conn.close()
+
+
+def _mensagem(id_mensagem: int) -> Optional[Dict]:
+    with _lock:
+        conn = _conectar()
+        try:
+            linha = conn.execute(
+                "SELECT chave, checkpoint, descartada FROM mensagens WHERE id = ?", (id_mensagem,)
+            ).fetchone()
+        finally:
+            conn.close()
+    if linha is None:
+        return None
+    return dict(zip(("chave", "checkpoint", "descartada"), linha))
+
+
+def _encerrar_checkpoint(tipo: Optional[str], chave: Optional[str]) -> None:
+    """
+    Status entregue (ou resolvido): a linha não precisa mais ser retomada nem
+    ficar reservada para esta instância.
+    """
+    if tipo and chave is not None:
+        checkpoints.marcar(tipo, chave, checkpoints.REPORTADO)
+        reservas.encerrar(tipo, chave)
+
+
+# =============================
+# REMETENTE
+# =============================
+
+class Remetente:
+    """Thread que entrega as mensagens da caixa de saída."""
+
+    def __init__(self):
+        self.lote = int(_config("ERP_OUTBOX_LOTE", "20"))
+        self.tentativas_max = int(_config("ERP_OUTBOX_TENTATIVAS_MAX", "10"))
+        self.falhas_para_abrir = int(_config("ERP_OUTBOX_DISJUNTOR_FALHAS", "3"))
+        self.pausa_disjuntor = float(_config("ERP_OUTBOX_DISJUNTOR_PAUSA_S", "60"))
+
+        self.sessao = requests.Session()
+        self.sessao.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+        self.sessao.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+        self.falhas_seguidas = 0
+        self.disjuntor_ate = 0.0
+
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._laco, name="outbox", daemon=True)
+        self._thread.start()
+
+    def acordar(self) -> None:
+        self._acordar.set()
+
+    def parar(self) -> None:
+        self._parar.set()
+        self._acordar.set()
+
+    @property
+    def disjuntor_aberto(self) -> bool:
+        return time.time() < self.disjuntor_ate
+
+    def _proximas(self):
+        with _lock:
+            conn = _conectar()
+            try:
+                return conn.execute(
+                    """
+                    SELECT id, destino, chave, payload, headers, descricao, tentativas, checkpoint
+                    FROM mensagens m
+                    WHERE descartada = 0 AND proxima_tentativa <= ?
+                      -- Mensagens da mesma linha saem na ordem em que foram gravadas
+                      AND NOT EXISTS (
+                          SELECT 1 FROM mensagens anterior
+                          WHERE anterior.destino = m.destino AND anterior.chave = m.chave
+                            AND anterior.id < m.id AND anterior.descartada = 0
+                      )
+                    ORDER BY id
+                    LIMIT ?
+                    """,
+                    (time.time(), self.lote),
+                ).fetchall()
+            finally:
+                conn.close()
+
+    def _atualizar(self, sql: str, parametros) -> None:
+        with _lock:
+            conn = _conectar()
+            try:
+                with conn:
+                    conn.execute(sql, parametros)
+            finally:
+                conn.close()
+
+    def _enviar(self, destino, payload, headers):
+        """Retorna (entregue, definitivo, erro)."""
+        try:
+            resposta = self.sessao.post(destino, data=payload, headers=headers, timeout=TIMEOUT_ENVIO)
+        except requests.exceptions.RequestException as e:
+            return False, False, f"Impossível conectar ao servidor Django: {e}"
+
+        if resposta.status_code == 200:
+            return True, False, None
+        erro = f"HTTP {resposta.status_code}: {resposta.text[:500]}"
+        return False, resposta.status_code in _STATUS_DEFINITIVOS, erro
+
+    def enviar_lote(self) -> int:
+        """Entrega uma rodada de mensagens vencidas. Retorna quantas foram entregues."""
+        entregues = 0
+        for id_mensagem, destino, chave, payload, headers, descricao, tentativas, checkpoint in self._proximas():
+            ok, definitivo, erro = self._enviar(destino, payload, json.loads(headers) if headers else None)
+
+            if ok:
+                self._atualizar("DELETE FROM mensagens WHERE id = ?", (id_mensagem,))
+                _encerrar_checkpoint(checkpoint, chave)
+                print(f"➜ API: Status {descricao or id_mensagem} enviado com sucesso.")
+                self.falhas_seguidas = 0
+                entregues += 1
+                continue
+
+            tentativas += 1
+            descartar = definitivo or tentativas >= self.tentativas_max
+            espera = min(3600, 5 * (2 ** (tentativas - 1)))
+            self._atualizar(
+                """
+                UPDATE mensagens
+                SET tentativas = ?, ultimo_erro = ?, proxima_tentativa = ?, descartada = ?
+                WHERE id = ?
+                """,
+                (tentativas, erro, time.time() + espera, int(descartar), id_mensagem),
+            )
+            print(f"✗ API ERRO: Falha ao enviar status {descricao or id_mensagem} "
+                  f"(tentativa {tentativas}{', descartada' if descartar else ''}). {erro}")
+
+            if definitivo:
+                # O servidor respondeu: não é indisponibilidade
+                continue
+
+            self.falhas_seguidas += 1
+            if self.falhas_seguidas >= self.falhas_para_abrir:
+                self.disjuntor_ate = time.time() + self.pausa_disjuntor
+                print(f"[AVISO] API indisponível: envios pausados por {self.pausa_disjuntor:.0f}s.")
+                break
+        return entregues
+
+    def _laco(self) -> None:
+        while not self._parar.is_set():
+            if self.disjuntor_aberto:
+                self._parar.wait(min(1.0, self.disjuntor_ate - time.time()))
+                continue
+
+            try:
+                entregues = self.enviar_lote()
+            except Exception as e:
+                print(f"[AVISO] Falha no envio da caixa de saída: {e}")
+                entregues = 0
+
+            if not entregues:
+                # Nada vencido (ou só falhas): espera nova mensagem ou a próxima tentativa
+                self._acordar.wait(5)
+                self._acordar.clear()
+
+    def esvaziar(self, timeout: float) -> bool:
+        """Espera a caixa de saída esvaziar por até `timeout` segundos."""
+        limite = time.time() + timeout
+        while time.time() < limite:
+            if quantidade_pendente() == 0:
+                return True
+            if self.disjuntor_aberto:
+                return False
+            self.acordar()
+            time.sleep(0.2)
+        return quantidade_pendente() == 0
+
+
+def remetente() -> Remetente:
+    """Remetente do processo (criado na primeira mensagem)."""
+    global _remetente
+    if _remetente is None:
+        with _lock:
+            if _remetente is None:
+                _remetente = Remetente()
+    return _remetente
+
+
+def _ao_encerrar() -> None:
+    # Tenta entregar o que falta antes do processo sair; o restante fica no
+    # arquivo e é enviado na próxima execução
+    if _remetente is None:
+        return
+    _remetente.esvaziar(float(_config("ERP_OUTBOX_ESPERA_SAIDA_S", "15")))
+    _remetente.parar()
+
+
+atexit.register(_ao_encerrar)
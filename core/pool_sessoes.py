@@ -0,0 +1,136 @@
+"""
+Pool de sessões Innovaro para processar linhas em paralelo.
+
+Cada worker é uma thread com a sua própria SessaoERP (um Chrome logado).
+Os workers consomem as linhas de uma fila compartilhada em memória, uma
+de cada vez, e guardam os seus próprios resultados. Com 1 worker o
+comportamento é o mesmo do processamento sequencial.
+
+Resultados com status None são linhas que não terminaram: com "tentativa"
+False a linha não chegou a ser tentada (sessão que não abriu, navegador que
+caiu em outra linha) e não deve contar tentativa (ver core/tentativas.py).
+"""
+
+import queue
+import threading
+from typing import Dict, List
+
+from core.erp_core import log
+from core.sessao import SessaoERP
+
+
+class PoolSessoes:
+    """
+    bot_name: nome do bot (credenciais, headless e modo de espera vêm do banco)
+    classe_fluxo: subclasse de BaseERP cujo executar(rows) processa as linhas
+    workers: quantidade de sessões simultâneas (ver get_workers_for_bot)
+    """
+
+    def __init__(self, bot_name: str, classe_fluxo, workers: int = 1, abrir_url: str = "abrir_url_140"):
+        self.bot_name = bot_name
+        workers = max(1, int(workers))
+        self.sessoes = [
+            SessaoERP(
+                bot_name,
+                classe_fluxo,
+                abrir_url=abrir_url,
+                identificador=f"w{i + 1}" if workers > 1 else None,
+            )
+            for i in range(workers)
+        ]
+
+    def _worker(self, sessao: SessaoERP, fila: queue.Queue, resultados: List[Dict], sem_sessao: List) -> None:
+        while True:
+            # Só abre (ou reabre) o navegador se ainda houver linha na fila
+            try:
+                lote = [fila.get_nowait()]
+            except queue.Empty:
+                return
+
+            try:
+                fluxo = sessao.obter()
+            except Exception as e:
+                log.error(f"[{sessao.nome}] Não foi possível abrir a sessão: {e}")
+                sessao.encerrar()
+                # Devolve a linha para outro worker (sem nenhum vivo, processar a devolve)
+                sem_sessao.append((sessao.nome, str(e)))
+                fila.put(lote[0])
+                return
+
+            # Com várias abas por sessão, o worker pega uma linha para cada aba
+            for _ in range(max(1, getattr(fluxo, "abas_simultaneas", 1)) - 1):
+                try:
+                    lote.append(fila.get_nowait())
+                except queue.Empty:
+                    break
+
+            fluxo.linha_com_falha = None
+            try:
+                resultados.extend(fluxo.executar(lote) or [])
+            except Exception as e:
+                # Navegador com problema: a sessão é descartada para o worker abrir
+                # outra no próximo lote. Só a linha (aba) que falhou conta tentativa
+                # e fica pendente para o próximo ciclo; as outras voltam para a fila
+                reportados = list(getattr(fluxo, "resultados", None) or [])
+                ja_reportados = {item["id"] for item in reportados}
+                falhou = fluxo.linha_com_falha
+                if falhou in ja_reportados or falhou not in {row[0] for row in lote}:
+                    falhou = None
+                log.error(f"[{sessao.nome}] Falha na linha {falhou}: {e}")
+                resultados.extend(reportados)
+                for row in lote:
+                    if row[0] in ja_reportados:
+                        continue
+                    if row[0] == falhou:
+                        resultados.append({"id": row[0], "status": None, "erro": str(e)})
+                    elif falhou is not None:
+                        fila.put(row)
+                    else:
+                        # Falha fora de uma linha (ex.: ao abrir as abas): nenhuma é culpada
+                        resultados.append({"id": row[0], "status": None, "erro": str(e), "tentativa": False})
+                sessao.encerrar()
+
+    def processar(self, rows) -> Dict[str, List[Dict]]:
+        """
+        Distribui `rows` entre os workers e espera todos terminarem.
+        Retorna os resultados de cada worker: {"requisitar_item/w1": [...], ...}.
+        """
+        fila: queue.Queue = queue.Queue()
+        for row in rows:
+            fila.put(row)
+
+        # Não abre mais navegadores do que linhas pendentes
+        ativas = self.sessoes[:max(1, min(len(self.sessoes), fila.qsize()))]
+        resultados = {sessao.nome: [] for sessao in ativas}
+        sem_sessao: List = []
+
+        threads = [
+            threading.Thread(
+                target=self._worker,
+                args=(sessao, fila, resultados[sessao.nome], sem_sessao),
+                name=sessao.nome,
+                daemon=True,
+            )
+            for sessao in ativas
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Linhas devolvidas por um worker sem sessão que nenhum outro pegou:
+        # voltam para quem chamou sem contar tentativa (a reserva é liberada)
+        while True:
+            try:
+                row = fila.get_nowait()
+            except queue.Empty:
+                break
+            nome, erro = sem_sessao[-1]
+            resultados[nome].append({"id": row[0], "status": None, "erro": erro, "tentativa": False})
+
+        return resultados
+
+    def encerrar(self) -> None:
+        """Fecha todos os navegadores do pool."""
+        for sessao in self.sessoes:
+            sessao.encerrar()
@@ -0,0 +1,184 @@
+"""
+Perfil de latência dos passos do ERP.
+
+Cada passo decorado com @log_passo registra aqui a sua duração (relógio
+monotônico), marcada com o nome do passo, o seletor usado e o bot. As
+linhas processadas pelos fluxos também são medidas (ver medir_linha).
+
+Os histogramas ficam em memória (últimas amostras de cada chave) e um
+resumo em JSON com p50/p95/máximo é gravado em perfil/ ao final do processo.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PERFIL_DIR = BASE_DIR / "perfil"
+
+# Quantidade máxima de amostras guardadas por chave (janela móvel)
+MAX_AMOSTRAS = 5000
+
+CHAVE_LINHA = "linha"
+
+_lock = threading.Lock()
+_amostras: Dict[str, deque] = defaultdict(lambda: deque(maxlen=MAX_AMOSTRAS))
+_totais: Dict[str, Dict[str, float]] = defaultdict(lambda: {"contagem": 0, "falhas": 0, "maximo": 0.0})
+_local = threading.local()
+
+
+def nome_bot() -> str:
+    """Nome do bot em execução (definido pelo gerenciador em BOT_NAME)."""
+    return os.getenv("BOT_NAME", "sem_bot")
+
+
+def _pilha() -> List[str]:
+    if not hasattr(_local, "pilha"):
+        _local.pilha = []
+    return _local.pilha
+
+
+def passo_atual() -> Optional[str]:
+    """Passo do BaseERP em execução nesta thread (o mais interno), se houver."""
+    pilha = _pilha()
+    return pilha[-1] if pilha else None
+
+
+def linha_atual():
+    """Identificador da linha do fluxo em execução nesta thread, se houver."""
+    return getattr(_local, "linha", None)
+
+
+def definir_linha(identificador=None):
+    """
+    Troca a linha corrente desta thread e devolve a anterior. Usado quando
+    várias linhas se alternam na mesma thread (execução em várias abas).
+    """
+    anterior = linha_atual()
+    _local.linha = identificador
+    return anterior
+
+
+def entrar_passo(passo: str) -> None:
+    _pilha().append(passo)
+
+
+def sair_passo() -> None:
+    pilha = _pilha()
+    if pilha:
+        pilha.pop()
+
+
+def registrar(passo: str, duracao: float, seletor: Optional[str] = None, falhou: bool = False) -> None:
+    """
+    Registra a duração (em segundos) de um passo.
+    Guarda uma amostra para o passo e outra para o par passo + seletor.
+    """
+    chaves = [passo]
+    if seletor:
+        chaves.append(f"{passo} | {seletor}")
+
+    with _lock:
+        for chave in chaves:
+            _amostras[chave].append(duracao)
+            totais = _totais[chave]
+            totais["contagem"] += 1
+            totais["maximo"] = max(totais["maximo"], duracao)
+            if falhou:
+                totais["falhas"] += 1
+
+
+@contextmanager
+def medir_linha(identificador=None):
+    """
+    Mede a duração de uma linha (requisição, transferência...) do fluxo.
+    Use dentro do laço, envolvendo o corpo da iteração:
+        for row in rows:
+            with medir_linha(row[0]):
+                ...
+    """
+    anterior = linha_atual()
+    _local.linha = identificador
+    inicio = time.monotonic()
+    falhou = False
+    try:
+        yield
+    except BaseException:
+        falhou = True
+        raise
+    finally:
+        registrar(CHAVE_LINHA, time.monotonic() - inicio, falhou=falhou)
+        _local.linha = anterior
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil `p` (0-100) por interpolação linear."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100.0
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    fracao = posicao - inferior
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * fracao
+
+
+def resumo() -> Dict:
+    """Resumo atual: para cada chave, contagem, falhas, p50, p95 e máximo (segundos)."""
+    with _lock:
+        copia = {chave: list(valores) for chave, valores in _amostras.items()}
+        totais = {chave: dict(valores) for chave, valores in _totais.items()}
+
+    passos = {}
+    for chave, valores in sorted(copia.items()):
+        passos[chave] = {
+            "contagem": int(totais[chave]["contagem"]),
+            "falhas": int(totais[chave]["falhas"]),
+            "p50": round(percentil(valores, 50), 4),
+            "p95": round(percentil(valores, 95), 4),
+            "max": round(totais[chave]["maximo"], 4),
+            "total": round(sum(valores), 4),
+        }
+
+    return {
+        "bot": nome_bot(),
+        "pid": os.getpid(),
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "passos": passos,
+    }
+
+
+def limpar() -> None:
+    """Descarta todas as amostras (útil entre execuções de benchmark)."""
+    with _lock:
+        _amostras.clear()
+        _totais.clear()
+
+
+def salvar_resumo(caminho: Optional[Path] = None) -> Optional[Path]:
+    """Grava o resumo em JSON. Não grava nada se nenhum passo foi medido."""
+    dados = resumo()
+    if not dados["passos"]:
+        return None
+
+    if caminho is None:
+        PERFIL_DIR.mkdir(exist_ok=True)
+        caminho = PERFIL_DIR / f"perfil_{dados['bot']}_{dados['pid']}.json"
+
+    try:
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+    except OSError:
+        return None
+    return caminho
+
+
+atexit.register(salvar_resumo)
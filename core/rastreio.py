@@ -0,0 +1,199 @@
+"""
+Rastreio dos comandos WebDriver enviados ao chromedriver.
+
+Cada método do BaseERP esconde várias idas e voltas ao chromedriver (um
+clicar_v2 faz switch_to, find_elements, execute_script...). Com o rastreio
+ligado (ERP_RASTREIO=1 para o bot), cada comando é registrado com o
+horário, a duração, o passo do BaseERP que o emitiu e a linha do fluxo em
+andamento (ver core/profiler.py).
+
+Os totais por linha, por passo e por comando ficam em memória e um resumo
+em JSON é gravado em perfil/ ao final do processo, junto com os últimos
+comandos em JSONL (um por linha) para análise detalhada.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from core import profiler
+from core.profiler import PERFIL_DIR, nome_bot, percentil
+
+
+# Quantidade máxima de comandos guardados individualmente (janela móvel)
+MAX_EVENTOS = 20000
+
+# Comandos emitidos fora de uma linha do fluxo (login, abertura de telas...)
+SEM_LINHA = "sem_linha"
+SEM_PASSO = "sem_passo"
+
+_lock = threading.Lock()
+_eventos: deque = deque(maxlen=MAX_EVENTOS)
+_por_comando: Dict[str, Dict[str, float]] = defaultdict(lambda: {"contagem": 0, "falhas": 0, "duracao": 0.0})
+_por_passo: Dict[str, Counter] = defaultdict(Counter)
+_por_linha: Dict[str, Dict] = {}
+_ativo = False
+
+
+def _linha(identificador) -> str:
+    return SEM_LINHA if identificador is None else str(identificador)
+
+
+def registrar(comando: str, inicio: float, duracao: float, falhou: bool = False) -> None:
+    """Registra um comando WebDriver (chamado pelo driver rastreado)."""
+    passo = profiler.passo_atual() or SEM_PASSO
+    linha = _linha(profiler.linha_atual())
+
+    with _lock:
+        _eventos.append({
+            "horario": round(inicio, 4),
+            "comando": comando,
+            "duracao": round(duracao, 5),
+            "passo": passo,
+            "linha": linha,
+            "falhou": falhou,
+        })
+
+        totais = _por_comando[comando]
+        totais["contagem"] += 1
+        totais["duracao"] += duracao
+        if falhou:
+            totais["falhas"] += 1
+
+        _por_passo[passo][comando] += 1
+
+        dados_linha = _por_linha.setdefault(linha, {"comandos": 0, "duracao": 0.0, "por_comando": Counter()})
+        dados_linha["comandos"] += 1
+        dados_linha["duracao"] += duracao
+        dados_linha["por_comando"][comando] += 1
+
+
+def rastrear(driver):
+    """
+    Passa a registrar todos os comandos do `driver` (envolve driver.execute).
+    Chamar duas vezes no mesmo driver não duplica o registro.
+    """
+    global _ativo
+
+    if getattr(driver, "_rastreado", False):
+        return driver
+
+    original = driver.execute
+
+    def execute(driver_command, params=None):
+        horario = time.time()
+        inicio = time.monotonic()
+        try:
+            resposta = original(driver_command, params)
+        except Exception:
+            registrar(driver_command, horario, time.monotonic() - inicio, falhou=True)
+            raise
+        registrar(driver_command, horario, time.monotonic() - inicio)
+        return resposta
+
+    driver.execute = execute
+    driver._rastreado = True
+    _ativo = True
+    return driver
+
+
+def total_comandos() -> int:
+    with _lock:
+        return int(sum(totais["contagem"] for totais in _por_comando.values()))
+
+
+def eventos() -> List[Dict]:
+    """Cópia dos últimos comandos registrados (mais antigo primeiro)."""
+    with _lock:
+        return list(_eventos)
+
+
+def resumo() -> Dict:
+    """
+    Resumo atual: totais por comando, comandos de cada passo e totais de
+    cada linha do fluxo, além da distribuição de comandos por linha.
+    """
+    with _lock:
+        por_comando = {
+            comando: {
+                "contagem": int(totais["contagem"]),
+                "falhas": int(totais["falhas"]),
+                "duracao": round(totais["duracao"], 4),
+            }
+            for comando, totais in sorted(_por_comando.items(), key=lambda item: -item[1]["contagem"])
+        }
+        por_passo = {
+            passo: {"comandos": sum(comandos.values()), "por_comando": dict(comandos.most_common())}
+            for passo, comandos in sorted(_por_passo.items())
+        }
+        por_linha = {
+            linha: {
+                "comandos": dados["comandos"],
+                "duracao": round(dados["duracao"], 4),
+                "por_comando": dict(dados["por_comando"].most_common()),
+            }
+            for linha, dados in _por_linha.items()
+        }
+
+    contagens = [dados["comandos"] for linha, dados in por_linha.items() if linha != SEM_LINHA]
+    return {
+        "bot": nome_bot(),
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "comandos": sum(totais["contagem"] for totais in por_comando.values()),
+        "comandos_por_linha": {
+            "linhas": len(contagens),
+            "media": round(sum(contagens) / len(contagens), 1) if contagens else 0.0,
+            "p50": percentil(contagens, 50),
+            "p95": percentil(contagens, 95),
+            "max": max(contagens, default=0),
+        },
+        "por_comando": por_comando,
+        "por_passo": por_passo,
+        "por_linha": por_linha,
+    }
+
+
+def limpar() -> None:
+    """Descarta os comandos registrados (útil entre execuções de benchmark)."""
+    with _lock:
+        _eventos.clear()
+        _por_comando.clear()
+        _por_passo.clear()
+        _por_linha.clear()
+
+
+def salvar_resumo(caminho: Optional[Path] = None) -> Optional[Path]:
+    """
+    Grava o resumo em JSON e os últimos comandos em JSONL ao lado
+    (perfil/rastreio_<bot>_<pid>.json e .jsonl). Não grava nada se nenhum
+    driver foi rastreado.
+    """
+    if not _ativo:
+        return None
+
+    dados = resumo()
+    if not dados["comandos"]:
+        return None
+
+    if caminho is None:
+        PERFIL_DIR.mkdir(exist_ok=True)
+        caminho = PERFIL_DIR / f"rastreio_{dados['bot']}_{os.getpid()}.json"
+
+    try:
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+        with open(caminho.with_suffix(".jsonl"), "w", encoding="utf-8") as f:
+            for evento in eventos():
+                f.write(json.dumps(evento, ensure_ascii=False) + "\n")
+    except OSError:
+        return None
+    return caminho
+
+
+atexit.register(salvar_resumo)
@@ -0,0 +1,273 @@
+"""
+Reserva (lease) de linhas pendentes entre várias instâncias de um bot.
+
+Cada linha pendente das tabelas de origem ganha um registro na tabela de
+reservas do RPA. Uma instância reserva um lote com SELECT ... FOR UPDATE
+SKIP LOCKED, grava o seu identificador e a validade da reserva, renova a
+validade enquanto processa e libera ao terminar. Se o processo cair, a
+reserva vence sozinha e outra instância assume as linhas.
+
+Uma linha já processada (status na caixa de saída, ver concluir) continua
+reservada até o status ser entregue ao Django (a caixa de saída chama
+encerrar), até sair das pendências ou, no máximo, por ERP_RESERVA_RETENCAO_S
+segundos (padrão 86400): enquanto o status está só na caixa de saída local,
+a linha ainda parece pendente para instâncias em outras máquinas.
+"""
+
+import os
+import socket
+import threading
+from typing import Iterable, List, Optional
+
+from core.db import get_active_schema, get_bot_setting, get_db_connection, get_reservas_table_name
+
+
+_TABELA_CRIADA = False
+_lock_tabela = threading.Lock()
+
+
+def _tabela() -> str:
+    schema = get_active_schema()
+    table = get_reservas_table_name()
+    return f"{schema}.{table}" if schema else table
+
+
+def _garantir_tabela(cur) -> None:
+    global _TABELA_CRIADA
+    if _TABELA_CRIADA:
+        return
+    with _lock_tabela:
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {_tabela()} (
+                tipo TEXT NOT NULL,
+                registro_id BIGINT NOT NULL,
+                worker TEXT,
+                reservado_em TIMESTAMP WITHOUT TIME ZONE,
+                expira_em TIMESTAMP WITHOUT TIME ZONE,
+                concluida_em TIMESTAMP WITHOUT TIME ZONE,
+                PRIMARY KEY (tipo, registro_id)
+            )
+            """
+        )
+        # Tabelas criadas antes da retenção das linhas concluídas
+        cur.execute(f"ALTER TABLE {_tabela()} ADD COLUMN IF NOT EXISTS concluida_em TIMESTAMP WITHOUT TIME ZONE")
+        _TABELA_CRIADA = True
+
+
+def id_worker(sufixo: Optional[str] = None) -> str:
+    """Identificador desta instância (máquina:pid[:sufixo]) gravado nas reservas."""
+    base = f"{socket.gethostname()}:{os.getpid()}"
+    return f"{base}:{sufixo}" if sufixo else base
+
+
+def reservar(tipo: str, consulta_pendentes: str, worker: str, limite: int, duracao_s: float,
+             excluir: Iterable[int] = ()) -> List[int]:
+    """
+    Reserva até `limite` linhas pendentes para `worker` por `duracao_s` segundos.
+
+    tipo: nome do tipo de linha (ex.: "requisicao", "transferencia")
+    consulta_pendentes: SELECT que devolve (id, ordem) das linhas pendentes na origem,
+        onde `ordem` é qualquer valor ordenável (menor = reservada primeiro);
+        linhas que saírem dessa consulta (concluídas) deixam de ser reservadas
+    excluir: ids que este worker não deve reservar (ex.: status ainda na caixa
+        de saída local); continuam pendentes para a limpeza das reservas
+
+    Retorna os ids reservados, na ordem de `ordem`.
+    """
+    tabela = _tabela()
+    conn = get_db_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                _garantir_tabela(cur)
+
+                # Descarta reservas vencidas ou concluídas de linhas que já saíram das pendências
+                cur.execute(
+                    f"""
+                    DELETE FROM {tabela} r
+                    WHERE r.tipo = %s
+                      AND (r.expira_em IS NULL OR r.expira_em < CURRENT_TIMESTAMP OR r.concluida_em IS NOT NULL)
+                      AND NOT EXISTS (
+                          SELECT 1 FROM ({consulta_pendentes}) AS p(id, ordem) WHERE p.id = r.registro_id
+                      )
+                    """,
+                    (tipo,),
+                )
+
+                # Registra as pendências novas
+                cur.execute(
+                    f"""
+                    INSERT INTO {tabela} (tipo, registro_id)
+                    SELECT %s, p.id FROM ({consulta_pendentes}) AS p(id, ordem)
+                    ON CONFLICT (tipo, registro_id) DO NOTHING
+                    """,
+                    (tipo,),
+                )
+
+                # Reserva um lote livre (ou vencido) sem esperar por outras instâncias
+                cur.execute(
+                    f"""
+                    WITH livres AS (
+                        SELECT r.tipo, r.registro_id, p.ordem
+                        FROM {tabela} r
+                        JOIN ({consulta_pendentes}) AS p(id, ordem) ON p.id = r.registro_id
+                        WHERE r.tipo = %s
+                          AND (r.expira_em IS NULL OR r.expira_em < CURRENT_TIMESTAMP)
+                          AND NOT (r.registro_id = ANY(%s))
+                        ORDER BY p.ordem, r.registro_id
+                        LIMIT %s
+                        FOR UPDATE OF r SKIP LOCKED
+                    )
+                    UPDATE {tabela} r
+                    SET worker = %s,
+                        reservado_em = CURRENT_TIMESTAMP,
+                        expira_em = CURRENT_TIMESTAMP + make_interval(secs => %s),
+                        concluida_em = NULL
+                    FROM livres
+                    WHERE r.tipo = livres.tipo AND r.registro_id = livres.registro_id
+                    RETURNING r.registro_id, livres.ordem
+                    """,
+                    (tipo, [int(id) for id in excluir], limite, worker, duracao_s),
+                )
+                reservados = sorted(cur.fetchall(), key=lambda linha: (linha[1] is None, linha[1], linha[0]))
+                return [registro_id for registro_id, _ in reservados]
+    finally:
+        conn.close()
+
+
+def renovar(tipo: str, ids: Iterable[int], worker: str, duracao_s: float) -> int:
+    """Estende a validade das reservas de `worker`. Retorna quantas ainda eram dele."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    conn = get_db_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    UPDATE {_tabela()}
+                    SET expira_em = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                    WHERE tipo = %s AND registro_id = ANY(%s) AND worker = %s AND concluida_em IS NULL
+                    """,
+                    (duracao_s, tipo, ids, worker),
+                )
+                return cur.rowcount
+    finally:
+        conn.close()
+
+
+def liberar(tipo: str, ids: Iterable[int], worker: str) -> int:
+    """
+    Remove as reservas de `worker` de linhas devolvidas para a fila. Linhas
+    concluídas (ver concluir) continuam reservadas até a retenção vencer.
+    """
+    ids = list(ids)
+    if not ids:
+        return 0
+    conn = get_db_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    DELETE FROM {_tabela()}
+                    WHERE tipo = %s AND registro_id = ANY(%s) AND worker = %s AND concluida_em IS NULL
+                    """,
+                    (tipo, ids, worker),
+                )
+                return cur.rowcount
+    finally:
+        conn.close()
+
+
+def concluir(tipo: str, registro_id) -> None:
+    """
+    Marca a reserva da linha como concluída (status reportado) e a mantém por
+    ERP_RESERVA_RETENCAO_S segundos, para outra instância não refazer a linha
+    enquanto o status não chega à origem. A limpeza de reservar() remove a
+    reserva assim que a linha sai das pendências. Nunca derruba o fluxo.
+    """
+    retencao = float(get_bot_setting(tipo, "ERP_RESERVA_RETENCAO_S", "86400"))
+    try:
+        conn = get_db_connection()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    _garantir_tabela(cur)
+                    cur.execute(
+                        f"""
+                        UPDATE {_tabela()}
+                        SET concluida_em = CURRENT_TIMESTAMP,
+                            expira_em = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                        WHERE tipo = %s AND registro_id = %s
+                        """,
+                        (retencao, tipo, registro_id),
+                    )
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[AVISO] Falha ao concluir a reserva de {tipo} {registro_id}: {e}")
+
+
+def encerrar(tipo: str, registro_id) -> None:
+    """Status da linha concluída entregue à origem: remove a reserva retida. Nunca derruba o fluxo."""
+    try:
+        conn = get_db_connection()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    _garantir_tabela(cur)
+                    cur.execute(
+                        f"DELETE FROM {_tabela()} WHERE tipo = %s AND registro_id = %s AND concluida_em IS NOT NULL",
+                        (tipo, registro_id),
+                    )
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[AVISO] Falha ao encerrar a reserva de {tipo} {registro_id}: {e}")
+
+
+class ReservaLote:
+    """
+    Mantém a reserva de um lote enquanto ele é processado:
+
+        with ReservaLote("requisicao", ids, worker):
+            fluxo.executar(rows)
+
+    Uma thread renova a validade a cada terço da duração e, ao sair do
+    bloco (com sucesso ou erro), as reservas das linhas não concluídas são
+    liberadas (ver concluir).
+    """
+
+    def __init__(self, tipo: str, ids: Iterable[int], worker: str, duracao_s: float = 300):
+        self.tipo = tipo
+        self.ids = list(ids)
+        self.worker = worker
+        self.duracao_s = duracao_s
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _renovar_periodicamente(self) -> None:
+        while not self._parar.wait(self.duracao_s / 3):
+            try:
+                renovar(self.tipo, self.ids, self.worker, self.duracao_s)
+            except Exception as e:
+                print(f"[AVISO] Falha ao renovar reservas ({self.tipo}): {e}")
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._renovar_periodicamente, name=f"reserva-{self.tipo}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        try:
+            liberar(self.tipo, self.ids, self.worker)
+        except Exception as e:
+            # Sem liberar, a reserva apenas vence no tempo normal
+            print(f"[AVISO] Falha ao liberar reservas ({self.tipo}): {e}")
+        return False
@@ -0,0 +1,276 @@
+"""
+Registro central de seletores das telas do Innovaro.
+
+Cada elemento usado pelos fluxos é registrado uma vez, por tela, com uma ou
+mais alternativas de localização (ex.: o input pelo atributo name, pelo id
+do formulário e, por último, o XPath absoluto antigo). BaseERP.localizar
+resolve o seletor no documento atual tentando as alternativas na ordem do
+ranking e devolve o (by, value) que encontrou, para ser usado com os
+métodos de sempre:
+
+    self.escrever(*self.localizar(SALDOS["deposito"]), 'Almox Central')
+
+Para cada alternativa são medidos o custo da busca (find_elements) e
+quantas vezes ela não encontrou o elemento. O ranking coloca primeiro as
+alternativas confiáveis (que quase nunca erram) e, entre elas, a mais
+rápida; alternativas ainda sem amostras suficientes são experimentadas.
+A telemetria vai para o profiler (chave "seletor <tela>.<nome>") e para
+perfil/seletores_<bot>.json, carregado na próxima execução para o ranking
+começar de onde parou.
+"""
+
+import atexit
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from selenium.webdriver.common.by import By
+
+from core import profiler
+
+
+# Amostras de uma alternativa antes de o ranking confiar nas suas medidas
+MIN_AMOSTRAS = 5
+# Taxa de acerto mínima para a alternativa ser considerada confiável
+TAXA_CONFIAVEL = 0.95
+
+_lock = threading.Lock()
+_estatisticas: Dict[Tuple[str, str], Dict[str, float]] = {}
+_carregado = False
+
+# Tela -> nome -> Seletor
+REGISTRO: Dict[str, Dict[str, "Seletor"]] = {}
+
+
+class Seletor:
+    """Elemento de uma tela com as suas alternativas de localização [(by, value), ...]."""
+
+    def __init__(self, tela: str, nome: str, alternativas: List[Tuple[str, str]]):
+        if not alternativas:
+            raise ValueError(f"Seletor {tela}.{nome} sem alternativas")
+        self.tela = tela
+        self.nome = nome
+        self.alternativas = [tuple(alternativa) for alternativa in alternativas]
+
+    @property
+    def chave(self) -> str:
+        return f"{self.tela}.{self.nome}"
+
+    def ordenadas(self) -> List[Tuple[str, str]]:
+        """Alternativas na ordem em que devem ser tentadas."""
+        _carregar()
+
+        def posicao(item):
+            indice, (_, value) = item
+            est = _estatisticas.get((self.chave, value))
+            if not est or est["tentativas"] < MIN_AMOSTRAS:
+                # Sem medidas suficientes: experimenta, na ordem declarada
+                return (0, 0.0, indice)
+            taxa = est["acertos"] / est["tentativas"]
+            if taxa < TAXA_CONFIAVEL:
+                return (1, -taxa, indice)
+            return (0, est["custo_total"] / est["tentativas"], indice)
+
+        return [alternativa for _, alternativa in sorted(enumerate(self.alternativas), key=posicao)]
+
+    def __repr__(self):
+        return f"Seletor({self.chave})"
+
+
+def registrar(tela: str, nome: str, *alternativas: Tuple[str, str]) -> Seletor:
+    """Registra (ou substitui) o seletor `nome` da tela `tela` e o devolve."""
+    seletor = Seletor(tela, nome, list(alternativas))
+    REGISTRO.setdefault(tela, {})[nome] = seletor
+    return seletor
+
+
+def _medir(seletor: Seletor, value: str, custo: float, achou: bool) -> None:
+    with _lock:
+        est = _estatisticas.setdefault(
+            (seletor.chave, value), {"tentativas": 0, "acertos": 0, "custo_total": 0.0}
+        )
+        est["tentativas"] += 1
+        est["custo_total"] += custo
+        if achou:
+            est["acertos"] += 1
+
+
+def resolver(driver, seletor: Seletor, teto: float, intervalo: float = 0.05) -> Tuple[str, str]:
+    """
+    Procura o elemento no documento atual até `teto` segundos, tentando as
+    alternativas na ordem do ranking a cada rodada. Retorna o (by, value) que
+    encontrou; se nenhuma encontrar, o primeiro do ranking (o passo que
+    usar o seletor cuida do erro como antes).
+
+    Falhas contam só na última rodada (a que encontrou ou a que estourou o
+    teto), para a espera pela página carregar não pesar como erro do seletor.
+    """
+    inicio = time.monotonic()
+    limite = inicio + teto
+    ordem = seletor.ordenadas()
+
+    while True:
+        rodada = []
+        for by, value in ordem:
+            antes = time.monotonic()
+            try:
+                achou = bool(driver.find_elements(by, value))
+            except Exception:
+                achou = False
+            rodada.append((value, time.monotonic() - antes))
+
+            if achou:
+                for tentado, custo in rodada[:-1]:
+                    _medir(seletor, tentado, custo, False)
+                _medir(seletor, value, rodada[-1][1], True)
+                profiler.registrar(f"seletor {seletor.chave}", time.monotonic() - inicio, value)
+                return by, value
+
+        if time.monotonic() >= limite:
+            for tentado, custo in rodada:
+                _medir(seletor, tentado, custo, False)
+            profiler.registrar(f"seletor {seletor.chave}", time.monotonic() - inicio, falhou=True)
+            return ordem[0]
+
+        time.sleep(intervalo)
+
+
+# =============================
+# TELEMETRIA
+# =============================
+
+def _arquivo() -> Path:
+    return profiler.PERFIL_DIR / f"seletores_{profiler.nome_bot()}.json"
+
+
+def _carregar() -> None:
+    """Carrega as medidas da execução anterior deste bot (uma vez por processo)."""
+    global _carregado
+    if _carregado:
+        return
+    with _lock:
+        if _carregado:
+            return
+        _carregado = True
+        try:
+            with open(_arquivo(), encoding="utf-8") as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return
+        for chave, alternativas in (dados.get("seletores") or {}).items():
+            for alternativa in alternativas:
+                _estatisticas[(chave, alternativa["value"])] = {
+                    "tentativas": int(alternativa.get("tentativas", 0)),
+                    "acertos": int(alternativa.get("acertos", 0)),
+                    "custo_total": float(alternativa.get("custo_medio_ms", 0.0)) / 1000 * int(alternativa.get("tentativas", 0)),
+                }
+
+
+def resumo() -> Dict:
+    """Para cada seletor medido, as alternativas no ranking atual com tentativas, falhas e custo médio."""
+    with _lock:
+        copia = {chave: dict(est) for chave, est in _estatisticas.items()}
+
+    seletores = {}
+    for tela, nomes in REGISTRO.items():
+        for seletor in nomes.values():
+            alternativas = []
+            for by, value in seletor.ordenadas():
+                est = copia.get((seletor.chave, value))
+                if not est or not est["tentativas"]:
+                    continue
+                alternativas.append({
+                    "by": by,
+                    "value": value,
+                    "tentativas": int(est["tentativas"]),
+                    "acertos": int(est["acertos"]),
+                    "falhas": int(est["tentativas"] - est["acertos"]),
+                    "custo_medio_ms": round(est["custo_total"] / est["tentativas"] * 1000, 3),
+                })
+            if alternativas:
+                seletores[seletor.chave] = alternativas
+
+    return {"bot": profiler.nome_bot(), "seletores": seletores}
+
+
+def salvar_resumo(caminho: Optional[Path] = None) -> Optional[Path]:
+    """Grava a telemetria em JSON (lida de volta na próxima execução do bot)."""
+    dados = resumo()
+    if not dados["seletores"]:
+        return None
+
+    if caminho is None:
+        profiler.PERFIL_DIR.mkdir(exist_ok=True)
+        caminho = _arquivo()
+
+    try:
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+    except OSError:
+        return None
+    return caminho
+
+
+atexit.register(salvar_resumo)
+
+
+# =============================
+# TELAS
+# =============================
+
+# Saldos de Recursos - CEMAG: os filtros ficam na tabela #vars do formulário;
+# os XPaths absolutos antigos ficam como última alternativa
+_VARS = '//*[@id="vars"]/tbody/tr[1]/td[1]/table/tbody'
+_VARS_ABSOLUTO = '/html/body/div[2]/form/table/tbody/tr[1]/td[1]/table/tbody'
+_CAMPO = 'td[2]/table/tbody/tr/td[1]/input'
+
+SALDOS = {
+    nome: registrar(
+        "Saldos de Recursos - CEMAG",
+        nome,
+        (By.XPATH, f'{_VARS}/{caminho}/{_CAMPO}'),
+        (By.XPATH, f'{_VARS_ABSOLUTO}/{caminho}/{_CAMPO}'),
+    )
+    for nome, caminho in {
+        "data": "tr[2]/td/table/tbody/tr[3]",
+        "deposito": "tr[8]/td/table/tbody/tr[3]",
+        "recursos": "tr[10]/td/table/tbody/tr[3]",
+        "materia_prima": "tr[10]/td/table/tbody/tr[15]",
+        "agrupamento": "tr[20]/td/table/tbody/tr[5]",
+    }.items()
+}
+
+# Transferência simples de recursos (grade grdMovDepos): campos pelo name,
+# primeiro por CSS (mais rápido que a busca // do XPath)
+MOV_DEPOSITOS = {
+    nome: registrar(
+        "Transferência simples de recursos",
+        nome,
+        (By.CSS_SELECTOR, f'#grdMovDepos input[name="{campo}"]'),
+        (By.XPATH, f'//*[@id="grdMovDepos"]//input[@name="{campo}"]'),
+        (By.XPATH, f'//input[@name="{campo}"]'),
+    )
+    for nome, campo in {
+        "classe": "CLASSE",
+        "movimentacao": "MOVIMENTAC",
+        "deposito": "DEPOSITO",
+        "recurso": "RECURSO",
+        "quantidade": "QUANTIDADE",
+        "custo_mat": "CUSTOMAT",
+    }.items()
+}
+MOV_DEPOSITOS.update({
+    nome: registrar(
+        "Transferência simples de recursos",
+        nome,
+        (By.CSS_SELECTOR, f'#grdMovDepos #{botao}'),
+        (By.XPATH, f'//*[@id="grdMovDepos"]//div[@id="{botao}"]'),
+    )
+    for nome, botao in {
+        "mudar_visualizacao": "changeViewButton",
+        "inserir": "insertButton",
+        "confirmar": "postButton",
+    }.items()
+})
@@ -0,0 +1,254 @@
+"""
+Sessão de navegador de longa duração para os bots do ERP.
+
+Em vez de abrir um Chrome novo, logar e fechar a cada lote de linhas
+pendentes, a SessaoERP mantém o navegador logado entre os ciclos de
+polling. Antes de cada lote a saúde da sessão é verificada e o navegador
+só é reciclado em caso de falha, sessão expirada ou idade máxima.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.chrome.options import Options
+
+from core.db import (
+    get_bot_flag,
+    get_bot_setting,
+    get_erp_credentials_for_bot,
+    get_headless_mode_for_bot,
+    get_wait_mode_for_bot,
+)
+from core import rastreio
+from core.erp_core import log
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SESSOES_DIR = BASE_DIR / "sessoes"
+
+_pid_lock = threading.Lock()
+
+
+def registrar_pid_driver(driver) -> None:
+    """
+    Registra o PID do chromedriver em arquivo para o gerenciador poder
+    encerrar apenas este navegador. Com vários workers no mesmo processo,
+    cada navegador acrescenta uma linha ao arquivo.
+    """
+    pid_file = os.getenv("BOT_PID_FILE")
+    try:
+        service = getattr(driver, "service", None)
+        process = getattr(service, "process", None) if service else None
+        driver_pid = getattr(process, "pid", None) if process else None
+
+        if pid_file and driver_pid is not None:
+            with _pid_lock:
+                with open(pid_file, "a", encoding="utf-8") as f:
+                    f.write(f"{driver_pid}\n")
+    except Exception:
+        # Se não conseguir registrar, apenas segue a execução normal
+        pass
+
+
+class SessaoERP:
+    """
+    Mantém um navegador logado no Innovaro para um bot.
+
+    bot_name: nome do bot (credenciais, headless e modo de espera vêm do banco)
+    classe_fluxo: subclasse de BaseERP que será instanciada sobre o driver
+    abrir_url: nome do método do BaseERP que abre o ERP (ex.: "abrir_url_140",
+               "abrir_url_simulador"); ERP_URL, se definida, tem precedência
+    idade_maxima_min: recicla o navegador após esse tempo (ERP_SESSAO_IDADE_MAX_MIN)
+    identificador: distingue sessões do mesmo bot (ex.: "w2" para o worker 2)
+    """
+
+    def __init__(self, bot_name: str, classe_fluxo, abrir_url: str = "abrir_url_140",
+                 idade_maxima_min: Optional[float] = None, identificador: Optional[str] = None):
+        self.bot_name = bot_name
+        self.classe_fluxo = classe_fluxo
+        self.abrir_url = abrir_url
+        self.identificador = identificador
+
+        if idade_maxima_min is None:
+            idade_maxima_min = float(get_bot_setting(bot_name, "ERP_SESSAO_IDADE_MAX_MIN", "240"))
+        self.idade_maxima = idade_maxima_min * 60
+
+        self.driver = None
+        self.fluxo = None
+        self.criada_em: Optional[float] = None
+
+    # =============================
+    # CICLO DE VIDA
+    # =============================
+
+    @property
+    def nome(self) -> str:
+        return f"{self.bot_name}/{self.identificador}" if self.identificador else self.bot_name
+
+    @property
+    def aberta(self) -> bool:
+        return self.driver is not None
+
+    def _criar_driver(self):
+        options = Options()
+        # ERP_HEADLESS força o headless sem depender da tabela de agendamento (ex.: máquina de build)
+        if get_bot_flag(self.bot_name, "ERP_HEADLESS") or get_headless_mode_for_bot(self.bot_name):
+            options.add_argument("--headless=new")
+        driver = webdriver.Chrome(options=options)
+        # ERP_RASTREIO registra cada comando WebDriver (ver core/rastreio.py)
+        if get_bot_flag(self.bot_name, "ERP_RASTREIO"):
+            rastreio.rastrear(driver)
+        return driver
+
+    def _logar(self) -> None:
+        creds = get_erp_credentials_for_bot(self.bot_name)
+        self.fluxo.login(creds.get("erp_username"), creds.get("erp_password"))
+        self.fluxo.esperar(5)
+
+    # =============================
+    # COOKIES DA SESSÃO
+    # =============================
+
+    @property
+    def arquivo_cookies(self) -> Path:
+        """Arquivo de cookies por bot e por host do ERP (ex.: sessoes/requisitar_item_192.168.3.140.json)."""
+        host = urlparse(self.driver.current_url).netloc.replace(":", "_") or "sem_host"
+        return SESSOES_DIR / f"{self.nome.replace('/', '_')}_{host}.json"
+
+    def salvar_cookies(self) -> None:
+        """Guarda os cookies da sessão logada para reaproveitar no próximo início."""
+        try:
+            cookies = self.driver.get_cookies()
+            SESSOES_DIR.mkdir(exist_ok=True)
+            arquivo = self.arquivo_cookies
+            with open(arquivo, "w", encoding="utf-8") as f:
+                json.dump(cookies, f)
+            # Cookies de sessão valem como senha: só o dono lê
+            os.chmod(arquivo, 0o600)
+        except Exception as e:
+            log.warning(f"Não foi possível salvar os cookies da sessão: {e}")
+
+    def restaurar_cookies(self) -> bool:
+        """
+        Tenta reaproveitar a sessão salva: injeta os cookies, recarrega a
+        página e confere se o ERP não pediu login. Retorna True se deu certo.
+        """
+        arquivo = self.arquivo_cookies
+        if not arquivo.exists():
+            return False
+
+        try:
+            with open(arquivo, "r", encoding="utf-8") as f:
+                cookies = json.load(f)
+
+            for cookie in cookies:
+                if "expiry" in cookie:
+                    cookie["expiry"] = int(cookie["expiry"])
+                self.driver.add_cookie(cookie)
+
+            self.driver.refresh()
+            self.fluxo.aguardar_pagina_pronta(teto=10)
+        except Exception as e:
+            log.warning(f"Não foi possível restaurar os cookies da sessão: {e}")
+            return False
+
+        if self.logada():
+            log.info(f"Sessão ERP restaurada a partir de cookies para o bot {self.nome}.")
+            return True
+
+        # Sessão expirada no servidor: descarta o arquivo e faz login completo
+        try:
+            arquivo.unlink()
+        except OSError:
+            pass
+        return False
+
+    def abrir(self):
+        """
+        Abre um navegador novo e entra no ERP, reaproveitando os cookies
+        salvos quando ainda válidos; senão faz o login completo.
+        """
+        self.encerrar()
+
+        self.driver = self._criar_driver()
+        registrar_pid_driver(self.driver)
+        self.criada_em = time.monotonic()
+
+        self.fluxo = self.classe_fluxo(self.driver, modo_espera=get_wait_mode_for_bot(self.bot_name))
+        # Linhas em andamento ao mesmo tempo, cada uma em uma aba (ver core/multiaba.py)
+        self.fluxo.abas_simultaneas = max(1, int(get_bot_setting(self.bot_name, "ERP_ABAS_SIMULTANEAS", "1")))
+        # ERP_URL aponta a sessão para outro endereço (ex.: o simulador em outra máquina)
+        url = get_bot_setting(self.bot_name, "ERP_URL")
+        if url:
+            self.fluxo.abrir_url(url)
+        else:
+            getattr(self.fluxo, self.abrir_url)()
+
+        if not self.restaurar_cookies():
+            self._logar()
+            if self.logada():
+                self.salvar_cookies()
+
+        log.info(f"Sessão ERP aberta para o bot {self.nome}.")
+        return self.fluxo
+
+    def encerrar(self) -> None:
+        """Fecha o navegador, se houver, guardando os cookies da sessão ativa."""
+        if self.driver is not None:
+            if self.logada():
+                self.salvar_cookies()
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+        self.fluxo = None
+        self.criada_em = None
+
+    def reciclar(self, motivo: str = ""):
+        """Descarta o navegador atual e abre outro."""
+        log.warning(f"Reciclando sessão ERP do bot {self.nome}. Motivo: {motivo}")
+        return self.abrir()
+
+    # =============================
+    # SAÚDE
+    # =============================
+
+    def expirada_por_idade(self) -> bool:
+        if self.criada_em is None:
+            return False
+        return time.monotonic() - self.criada_em >= self.idade_maxima
+
+    def logada(self) -> bool:
+        """
+        Verificação barata: o navegador responde e não voltou para a tela
+        de login (sessão expirada no Innovaro).
+        """
+        try:
+            self.driver.switch_to.default_content()
+            return not self.driver.find_elements(By.ID, "password")
+        except Exception:
+            return False
+
+    def obter(self):
+        """
+        Retorna o fluxo pronto para processar um lote, abrindo ou reciclando
+        o navegador quando necessário.
+        """
+        if not self.aberta:
+            return self.abrir()
+
+        if self.expirada_por_idade():
+            return self.reciclar("idade máxima atingida")
+
+        if not self.logada():
+            return self.reciclar("sessão inválida ou expirada")
+
+        return self.fluxo
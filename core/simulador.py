@@ -0,0 +1,375 @@
+"""
+Simulador local do Innovaro para rodar os fluxos de ponta a ponta sem o ERP.
+
+Serve, em /sistema, as telas e os elementos que os bots usam: login, árvore
+do menu, abas com iframe (tab-frame), Requisições (grdRequisicoes),
+Solicitação de transferência entre depósitos (solicitacoes), Transferência
+simples de recursos (grdMovDepos), Saldos de Recursos - CEMAG com exportação
+do CSV, diálogos de pesquisa (grLookup) e as caixas de erro/alerta. Os
+caminhos (ids e XPaths) são os mesmos que os fluxos usam no Innovaro real;
+o comportamento é só o suficiente para os fluxos avançarem.
+
+Toda ação que no Innovaro vai ao servidor (validar um campo, inserir,
+aprovar, baixar, gravar, exportar) passa por /sistema/api/<acao>, com
+latência e injeção de erros configuráveis:
+
+    SIMULADOR_LATENCIA_MS       latência base de cada chamada (padrão 150)
+    SIMULADOR_VARIACAO_MS       variação aleatória somada à latência (padrão 100)
+    SIMULADOR_TAXA_ERRO         probabilidade (0 a 1) de erro em validações e gravações (padrão 0)
+    SIMULADOR_PROCESSAMENTO_MS  duração mínima do "carregando" da exportação (padrão 1500)
+    SIMULADOR_INVALIDOS         valores sempre rejeitados com "Não encontrou ocorrência" (padrão INVALIDO)
+    SIMULADOR_SEMENTE           semente do sorteio de latência/erros (opcional)
+
+A configuração também pode ser trocada com o simulador no ar (POST
+/simulador/config) e o que foi gravado consultado em /simulador/estado.
+/simulador/rpa/<rota> faz as vezes da API do Django que recebe os status.
+
+Para subir (porta 8765, a mesma de BaseERP.abrir_url_simulador):
+
+    python -m core.simulador
+"""
+
+import asyncio
+import itertools
+import os
+import random
+import secrets
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+from fastapi.staticfiles import StaticFiles
+from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+TEMPLATES_DIR = BASE_DIR / "web" / "templates"
+STATIC_DIR = BASE_DIR / "web" / "static"
+
+PORTA = 8765
+COOKIE_SESSAO = "JSESSIONID"
+
+MENSAGEM_SEM_OCORRENCIA = "Não encontrou ocorrência para a pesquisa."
+
+# Telas do menu: rótulo da aba -> (caminho no menu, template)
+TELAS: Dict[str, Dict] = {
+    "Requisições": {
+        "caminho": ("Estoque", "Requisição", "Requisições"),
+        "template": "simulador/requisicoes.html",
+    },
+    "Solicitação de transferência entre depósitos": {
+        "caminho": ("Estoque", "Transferência", "Solicitação de transferência entre depósitos"),
+        "template": "simulador/solicitacoes.html",
+    },
+    "Transferência simples de recursos": {
+        "caminho": ("Estoque", "Transferência", "Transferência simples de recursos"),
+        "template": "simulador/mov_depositos.html",
+    },
+    "Saldos de Recursos - CEMAG": {
+        "caminho": ("Estoque", "Consultas", "Saldos de Recursos - CEMAG"),
+        "template": "simulador/saldos.html",
+    },
+}
+
+# Linhas do CSV de saldos: (1o. agrupamento, 2o. agrupamento, código, descrição, unidade, saldo, custo médio)
+SALDOS_CSV = [
+    ("Almox Central", "Matéria Prima", "110565", "CHAPA ACO 1020 3/16", "KG", 1520.5, 7.42),
+    ("Almox Central", "Matéria Prima", "110570", "CHAPA ACO 1020 1/4", "KG", 980.0, 7.38),
+    ("Almox Central", "", "033316", "EIXO CARRETA 2 EIXOS", "UN", 12.0, 1843.1),
+    ("Almox Central", "Em Processo", "024511", "TUBO QUADRADO 50X50", "M", 310.25, 21.9),
+    ("Almox Serra", "", "021027", "PARAFUSO SEXTAVADO 1/2", "UN", 4200.0, 0.87),
+]
+
+
+def _numero_br(valor: float) -> str:
+    """1234.5 -> '1.234,50' (formato das colunas numéricas do Innovaro)."""
+    return f"{valor:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+class ConfigSimulador(BaseModel):
+    latencia_ms: float = 150
+    variacao_ms: float = 100
+    taxa_erro: float = 0.0
+    processamento_ms: float = 1500
+    invalidos: List[str] = ["INVALIDO"]
+
+    @classmethod
+    def do_ambiente(cls) -> "ConfigSimulador":
+        invalidos = os.getenv("SIMULADOR_INVALIDOS", "INVALIDO")
+        return cls(
+            latencia_ms=float(os.getenv("SIMULADOR_LATENCIA_MS", "150")),
+            variacao_ms=float(os.getenv("SIMULADOR_VARIACAO_MS", "100")),
+            taxa_erro=float(os.getenv("SIMULADOR_TAXA_ERRO", "0")),
+            processamento_ms=float(os.getenv("SIMULADOR_PROCESSAMENTO_MS", "1500")),
+            invalidos=[v.strip() for v in invalidos.split(",") if v.strip()],
+        )
+
+
+class AlteracaoConfig(BaseModel):
+    latencia_ms: Optional[float] = None
+    variacao_ms: Optional[float] = None
+    taxa_erro: Optional[float] = None
+    processamento_ms: Optional[float] = None
+    invalidos: Optional[List[str]] = None
+
+
+class EstadoSimulador:
+    """Sessões, documentos gravados e contadores do simulador (em memória)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        semente = os.getenv("SIMULADOR_SEMENTE")
+        self.sorteio = random.Random(int(semente) if semente else None)
+        self.config = ConfigSimulador.do_ambiente()
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        with self.lock:
+            self.sessoes = set()
+            self.chaves = itertools.count(500001)
+            self.documentos: List[Dict] = []
+            self.chamadas: Dict[str, int] = {}
+            self.erros_injetados = 0
+            self.status_rpa: List[Dict] = []
+
+    def nova_chave(self) -> str:
+        with self.lock:
+            return str(next(self.chaves))
+
+    def contar(self, acao: str) -> None:
+        with self.lock:
+            self.chamadas[acao] = self.chamadas.get(acao, 0) + 1
+
+    def sortear_erro(self) -> bool:
+        with self.lock:
+            if self.sorteio.random() < self.config.taxa_erro:
+                self.erros_injetados += 1
+                return True
+            return False
+
+    def latencia(self) -> float:
+        with self.lock:
+            return (self.config.latencia_ms + self.sorteio.uniform(0, self.config.variacao_ms)) / 1000
+
+    def resumo(self) -> Dict:
+        with self.lock:
+            return {
+                "config": self.config.model_dump(),
+                "sessoes": len(self.sessoes),
+                "documentos": list(self.documentos),
+                "gravados": len(self.documentos),
+                "chamadas": dict(self.chamadas),
+                "erros_injetados": self.erros_injetados,
+                "status_rpa": list(self.status_rpa),
+            }
+
+
+estado = EstadoSimulador()
+
+app = FastAPI(title="Simulador Innovaro", version="1.0.0")
+
+templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+app.mount("/sistema/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+
+
+def _logado(request: Request) -> bool:
+    return request.cookies.get(COOKIE_SESSAO) in estado.sessoes
+
+
+async def _latencia(minimo: float = 0.0) -> None:
+    await asyncio.sleep(max(minimo, estado.latencia()))
+
+
+# =============================
+# LOGIN E PÁGINA PRINCIPAL
+# =============================
+
+@app.get("/sistema", response_class=HTMLResponse)
+@app.get("/sistema/", response_class=HTMLResponse)
+async def principal(request: Request):
+    await _latencia()
+    if not _logado(request):
+        return templates.TemplateResponse(request, "simulador/login.html", {"erro": None})
+    return templates.TemplateResponse(request, "simulador/principal.html", {"telas": TELAS})
+
+
+@app.post("/sistema/login")
+async def login(request: Request):
+    await _latencia()
+
+    # Formulário lido à mão: Form() do FastAPI exigiria o python-multipart
+    campos = parse_qs((await request.body()).decode("utf-8"))
+    username = (campos.get("username") or [""])[0]
+    password = (campos.get("password") or [""])[0]
+
+    usuario = os.getenv("SIMULADOR_USUARIO")
+    senha = os.getenv("SIMULADOR_SENHA")
+    if not username or (usuario and (username, password) != (usuario, senha)):
+        return templates.TemplateResponse(
+            request, "simulador/login.html", {"erro": "Usuário ou senha inválidos."}, status_code=401
+        )
+
+    token = secrets.token_hex(16)
+    with estado.lock:
+        estado.sessoes.add(token)
+
+    resposta = RedirectResponse("/sistema", status_code=303)
+    resposta.set_cookie(COOKIE_SESSAO, token, httponly=True)
+    return resposta
+
+
+@app.get("/sistema/tela/{nome}", response_class=HTMLResponse)
+async def tela(request: Request, nome: str):
+    await _latencia()
+    if not _logado(request):
+        return HTMLResponse("Sessão expirada", status_code=401)
+    if nome not in TELAS:
+        return HTMLResponse(f"Tela {nome} não existe no simulador", status_code=404)
+    return templates.TemplateResponse(
+        request,
+        TELAS[nome]["template"],
+        {"tela": nome, "hoje": datetime.now().strftime("%d/%m/%Y")},
+    )
+
+
+# =============================
+# AÇÕES (AJAX DAS TELAS)
+# =============================
+
+def _validar(dados: Dict) -> Dict:
+    campo = (dados.get("campo") or "").upper()
+    valor = (dados.get("valor") or "").strip()
+
+    if valor and valor.upper() in {v.upper() for v in estado.config.invalidos}:
+        return {"erro": MENSAGEM_SEM_OCORRENCIA}
+    if valor and estado.sortear_erro():
+        return {"erro": MENSAGEM_SEM_OCORRENCIA}
+
+    resposta = {"ok": True}
+    if campo == "QUANTIDADE" and valor:
+        # Custo da movimentação calculado pelo Innovaro ao informar a quantidade
+        try:
+            quantidade = float(valor.replace(".", "").replace(",", "."))
+        except ValueError:
+            return {"erro": f"Valor inválido para quantidade: {valor}"}
+        resposta["custo"] = _numero_br(quantidade * 21.939)
+    return resposta
+
+
+def _gravar(dados: Dict) -> Dict:
+    if estado.sortear_erro():
+        return {"erro": "Não foi possível gravar o registro: saldo insuficiente no depósito de origem."}
+
+    documento = {
+        "tela": dados.get("tela"),
+        "chave": dados.get("chave") or estado.nova_chave(),
+        "campos": dados.get("campos") or {},
+        "linhas": dados.get("linhas") or [],
+        "gravado_em": datetime.now().isoformat(timespec="seconds"),
+    }
+    with estado.lock:
+        estado.documentos.append(documento)
+    return {"ok": True, "chave": documento["chave"], "alerta": "Registro gravado com sucesso."}
+
+
+@app.post("/sistema/api/{acao}")
+async def acao(request: Request, acao: str):
+    if not _logado(request):
+        return JSONResponse({"erro": "Sessão expirada"}, status_code=401)
+
+    try:
+        dados = await request.json()
+    except ValueError:
+        dados = {}
+
+    estado.contar(acao)
+    await _latencia(estado.config.processamento_ms / 1000 if acao == "processar" else 0.0)
+
+    if acao == "validar":
+        return _validar(dados)
+    if acao == "inserir":
+        return {"ok": True, "chave": estado.nova_chave()}
+    if acao == "aprovar":
+        if dados.get("tela") == "Requisições":
+            return {"ok": True, "alerta": "Requisição aprovada com sucesso!"}
+        return {"ok": True}
+    if acao == "gravar":
+        return _gravar(dados)
+    if acao in ("confirmar", "baixar", "postar", "processar", "exportar"):
+        return {"ok": True}
+
+    return JSONResponse({"erro": f"Ação {acao} não existe no simulador"}, status_code=404)
+
+
+@app.get("/sistema/exportar/saldos.csv")
+async def exportar_saldos(request: Request):
+    await _latencia()
+    if not _logado(request):
+        return Response("Sessão expirada", status_code=401)
+
+    linhas = ["1o. Agrupamento;2o. Agrupamento;3o. Agrupamento;Recurso#Unid. Medida;Saldo;Custo#Total;Custo#Médio"]
+    for deposito, grupo, codigo, descricao, unidade, saldo, custo in SALDOS_CSV:
+        linhas.append(";".join([
+            f'="{deposito}"',
+            f'="{grupo}"' if grupo else "",
+            f"{codigo} - {descricao}",
+            unidade,
+            _numero_br(saldo),
+            _numero_br(saldo * custo),
+            _numero_br(custo),
+        ]))
+
+    nome = f"saldos_{datetime.now():%Y%m%d_%H%M%S}.csv"
+    return Response(
+        ("\r\n".join(linhas) + "\r\n").encode("latin-1"),
+        media_type="text/csv; charset=iso-8859-1",
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'},
+    )
+
+
+# =============================
+# CONTROLE DO SIMULADOR
+# =============================
+
+@app.get("/simulador/estado")
+def consultar_estado():
+    return estado.resumo()
+
+
+@app.post("/simulador/config")
+def alterar_config(alteracao: AlteracaoConfig):
+    with estado.lock:
+        atual = estado.config.model_dump()
+        atual.update({k: v for k, v in alteracao.model_dump().items() if v is not None})
+        estado.config = ConfigSimulador(**atual)
+    return estado.resumo()
+
+
+@app.post("/simulador/rpa/{rota:path}")
+async def receber_status_rpa(request: Request, rota: str):
+    """Recebe os status que os bots mandariam à API do Django (ex.: nos benchmarks)."""
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    with estado.lock:
+        estado.status_rpa.append({"rota": rota, "payload": payload})
+    return {"ok": True}
+
+
+@app.post("/simulador/reiniciar")
+def reiniciar():
+    """Apaga documentos, status, contadores e sessões (a configuração é mantida)."""
+    estado.reiniciar()
+    return estado.resumo()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("core.simulador:app", host="127.0.0.1", port=int(os.getenv("SIMULADOR_PORTA", PORTA)), reload=False)
@@ -0,0 +1,205 @@
+"""
+Controle de tentativas das linhas que falham no ERP.
+
+Cada falha de uma linha (requisição, transferência...) incrementa o número
+de tentativas, guarda o último erro e agenda a próxima tentativa com espera
+exponencial. Ao atingir o máximo de tentativas a linha entra em quarentena
+e deixa de ser buscada até alguém liberá-la pelo gerenciador.
+
+Configuração (por tipo, ex.: ERP_TENTATIVAS_MAX_REQUISICAO, ou geral):
+    ERP_TENTATIVAS_MAX      tentativas até a quarentena (padrão 5)
+    ERP_TENTATIVAS_BASE_S   espera após a 1ª falha, dobrando a cada falha (padrão 60)
+    ERP_TENTATIVAS_TETO_S   espera máxima entre tentativas (padrão 3600)
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+from core.db import get_active_schema, get_bot_setting, get_db_connection, get_tentativas_table_name
+
+
+_TABELA_CRIADA = False
+_lock_tabela = threading.Lock()
+
+
+def tabela_tentativas() -> str:
+    schema = get_active_schema()
+    table = get_tentativas_table_name()
+    return f"{schema}.{table}" if schema else table
+
+
+def garantir_tabela() -> bool:
+    """Cria a tabela de tentativas se preciso. Retorna False se o banco não permitir."""
+    global _TABELA_CRIADA
+    if _TABELA_CRIADA:
+        return True
+
+    with _lock_tabela:
+        if _TABELA_CRIADA:
+            return True
+        try:
+            conn = get_db_connection()
+        except Exception:
+            return False
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"""
+                        CREATE TABLE IF NOT EXISTS {tabela_tentativas()} (
+                            tipo TEXT NOT NULL,
+                            registro_id BIGINT NOT NULL,
+                            tentativas INTEGER NOT NULL DEFAULT 0,
+                            ultimo_erro TEXT,
+                            ultima_tentativa TIMESTAMP WITHOUT TIME ZONE,
+                            proxima_tentativa TIMESTAMP WITHOUT TIME ZONE,
+                            quarentena BOOLEAN NOT NULL DEFAULT FALSE,
+                            PRIMARY KEY (tipo, registro_id)
+                        )
+                        """
+                    )
+            _TABELA_CRIADA = True
+        except Exception as e:
+            print(f"[AVISO] Tabela de tentativas indisponível: {e}")
+        finally:
+            conn.close()
+    return _TABELA_CRIADA
+
+
+def filtro_pendentes(tipo: str, alias: str) -> Dict[str, str]:
+    """
+    Trechos SQL para a consulta de pendentes da linha `alias`:
+        join    -> LEFT JOIN com as tentativas do tipo
+        where   -> exclui linhas em quarentena ou aguardando a próxima tentativa
+        ordem   -> linhas novas (sem falhas) primeiro
+
+    Se a tabela não estiver disponível, devolve trechos neutros.
+    """
+    if not garantir_tabela():
+        return {"join": "", "where": "", "ordem": ""}
+
+    return {
+        "join": (
+            f"LEFT JOIN {tabela_tentativas()} rpa_t "
+            f"ON rpa_t.tipo = '{tipo}' AND rpa_t.registro_id = {alias}.id"
+        ),
+        "where": (
+            "AND (rpa_t.registro_id IS NULL OR "
+            "(NOT rpa_t.quarentena AND rpa_t.proxima_tentativa <= CURRENT_TIMESTAMP))"
+        ),
+        "ordem": "COALESCE(rpa_t.tentativas, 0),",
+    }
+
+
+def registrar_falha(tipo: str, registro_id: int, erro: Optional[str]) -> None:
+    """Conta mais uma falha da linha e agenda a próxima tentativa (ou a quarentena)."""
+    if not garantir_tabela():
+        return
+
+    maximo = int(get_bot_setting(tipo, "ERP_TENTATIVAS_MAX", "5"))
+    base = float(get_bot_setting(tipo, "ERP_TENTATIVAS_BASE_S", "60"))
+    teto = float(get_bot_setting(tipo, "ERP_TENTATIVAS_TETO_S", "3600"))
+
+    tabela = tabela_tentativas()
+    conn = get_db_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    INSERT INTO {tabela} AS t (tipo, registro_id, tentativas, ultimo_erro, ultima_tentativa)
+                    VALUES (%s, %s, 1, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (tipo, registro_id)
+                    DO UPDATE SET tentativas = t.tentativas + 1,
+                                  ultimo_erro = EXCLUDED.ultimo_erro,
+                                  ultima_tentativa = EXCLUDED.ultima_tentativa
+                    RETURNING tentativas
+                    """,
+                    (tipo, registro_id, erro),
+                )
+                (tentativas,) = cur.fetchone()
+
+                espera = min(teto, base * (2 ** (tentativas - 1)))
+                cur.execute(
+                    f"""
+                    UPDATE {tabela}
+                    SET proxima_tentativa = CURRENT_TIMESTAMP + make_interval(secs => %s),
+                        quarentena = %s
+                    WHERE tipo = %s AND registro_id = %s
+                    """,
+                    (espera, tentativas >= maximo, tipo, registro_id),
+                )
+    finally:
+        conn.close()
+
+
+def registrar_sucesso(tipo: str, registro_id: int) -> None:
+    """Linha concluída: esquece o histórico de falhas."""
+    if not garantir_tabela():
+        return
+
+    conn = get_db_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"DELETE FROM {tabela_tentativas()} WHERE tipo = %s AND registro_id = %s",
+                    (tipo, registro_id),
+                )
+    finally:
+        conn.close()
+
+
+def registrar_resultado(tipo: str, registro_id: int, status: Optional[str]) -> None:
+    """Registra o status devolvido ao banco: 'OK' é sucesso, qualquer outro é falha."""
+    try:
+        if status == "OK":
+            registrar_sucesso(tipo, registro_id)
+        else:
+            registrar_falha(tipo, registro_id, status)
+    except Exception as e:
+        # O controle de tentativas nunca deve derrubar o fluxo
+        print(f"[AVISO] Falha ao registrar tentativa de {tipo} {registro_id}: {e}")
+
+
+def listar_quarentena(tipo: Optional[str] = None) -> List[Dict]:
+    """Linhas em quarentena (todas ou de um tipo), da falha mais recente para a mais antiga."""
+    if not garantir_tabela():
+        return []
+
+    filtro = "AND tipo = %s" if tipo else ""
+    conn = get_db_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    SELECT tipo, registro_id, tentativas, ultimo_erro, ultima_tentativa
+                    FROM {tabela_tentativas()}
+                    WHERE quarentena {filtro}
+                    ORDER BY ultima_tentativa DESC
+                    """,
+                    (tipo,) if tipo else None,
+                )
+                colunas = [c[0] for c in cur.description]
+                return [dict(zip(colunas, linha)) for linha in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def liberar_quarentena(tipo: str, registro_id: int) -> bool:
+    """Devolve a linha para a fila, zerando as tentativas. Retorna False se não estava lá."""
+    if not garantir_tabela():
+        return False
+
+    conn = get_db_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"DELETE FROM {tabela_tentativas()} WHERE tipo = %s AND registro_id = %s",
+                    (tipo, registro_id),
+                )
+                return cur.rowcount > 0
+    finally:
+        conn.close()
@@ -25,6 +25,8 @@ async function loadBots() {
 
             const erpUser = bot.erp_username || "";
             const headless = bot.headless_mode === true;
+            const waitMode = bot.wait_mode || "condicional";
+            const workers = bot.workers || 1;
 
             tr.innerHTML = `
                 <td>${bot.name}</td>
@@ -42,6 +44,15 @@ async function loadBots() {
                 <td>
                     <input type="checkbox" class="headless-checkbox" data-name="${bot.name}" ${headless ? "checked" : ""} />
                 </td>
+                <td>
+                    <select class="wait-mode-select" data-name="${bot.name}">
+                        <option value="condicional">Condicional</option>
+                        <option value="fixo">Fixa (compatibilidade)</option>
+                    </select>
+                </td>
+                <td>
+                    <input type="number" class="workers-input" data-name="${bot.name}" min="1" max="8" value="${workers}" />
+                </td>
                 <td>
                     <span class="erp-label">${erpUser || "Nǜo configurado"}</span>
                     <button class="button button--secondary" data-action="config-erp" data-name="${bot.name}">Configurar</button>
@@ -60,6 +71,11 @@ async function loadBots() {
                 select.value = interval ? String(interval) : "";
             }
 
+            const waitSelect = tr.querySelector(".wait-mode-select");
+            if (waitSelect) {
+                waitSelect.value = waitMode;
+            }
+
             tbody.appendChild(tr);
         });
     } catch (e) {
@@ -147,8 +163,10 @@ document.addEventListener("change", (event) => {
 
     const isSchedule = target.classList.contains("schedule-select");
     const isHeadless = target.classList.contains("headless-checkbox");
+    const isWaitMode = target.classList.contains("wait-mode-select");
+    const isWorkers = target.classList.contains("workers-input");
 
-    if (!isSchedule && !isHeadless) return;
+    if (!isSchedule && !isHeadless && !isWaitMode && !isWorkers) return;
 
     const botName = target.getAttribute("data-name");
     if (!botName) return;
@@ -159,12 +177,16 @@ document.addEventListener("change", (event) => {
 
     const scheduleSelect = row.querySelector(".schedule-select");
     const headlessCheckbox = row.querySelector(".headless-checkbox");
+    const waitModeSelect = row.querySelector(".wait-mode-select");
+    const workersInput = row.querySelector(".workers-input");
 
     const value = scheduleSelect ? scheduleSelect.value : "";
     const interval = value ? parseInt(value, 10) : null;
     const headless = headlessCheckbox ? headlessCheckbox.checked : null;
+    const waitMode = waitModeSelect ? waitModeSelect.value : null;
+    const workers = workersInput && workersInput.value ? parseInt(workersInput.value, 10) : null;
 
-    updateSchedule(botName, interval, headless);
+    updateSchedule(botName, interval, headless, waitMode, workers);
 });
 
 document.addEventListener("DOMContentLoaded", () => {
@@ -186,12 +208,12 @@ document.addEventListener("DOMContentLoaded", () => {
         }
 });
 
-async function updateSchedule(name, intervalMinutes, headlessMode) {
+async function updateSchedule(name, intervalMinutes, headlessMode, waitMode, workers) {
     try {
         const resp = await fetch(`/api/bots/${encodeURIComponent(name)}/schedule`, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ interval_minutes: intervalMinutes, headless_mode: headlessMode })
+            body: JSON.stringify({ interval_minutes: intervalMinutes, headless_mode: headlessMode, wait_mode: waitMode, workers: workers })
         });
         if (!resp.ok) {
             const err = await resp.json().catch(() => ({}));
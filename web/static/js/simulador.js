@@ -0,0 +1,498 @@
+// Simulador do Innovaro (ver core/simulador.py).
+// O mesmo script roda na página principal e nos iframes das telas: ids,
+// classes e estrutura das tabelas seguem o Innovaro real, o comportamento é
+// só o necessário para os fluxos dos bots avançarem.
+
+const topo = window.top;
+
+function mostrar(el, visivel = true) {
+    if (el) {
+        el.style.display = visivel ? "" : "none";
+    }
+}
+
+function hoje() {
+    const d = new Date();
+    const dois = (n) => String(n).padStart(2, "0");
+    return `${dois(d.getDate())}/${dois(d.getMonth() + 1)}/${d.getFullYear()}`;
+}
+
+// Chamada ao "servidor do Innovaro": mostra o carregando na página principal
+// e abre a caixa de erro/alerta que vier na resposta.
+async function chamar(acao, dados = {}) {
+    topo.simulador.carregando(1);
+    try {
+        const resp = await fetch(`/sistema/api/${acao}`, {
+            method: "POST",
+            headers: {"Content-Type": "application/json"},
+            body: JSON.stringify(dados),
+        });
+        const resposta = await resp.json();
+        if (resposta.erro) {
+            topo.simulador.mensagem("erro", resposta.erro);
+        } else if (resposta.alerta) {
+            topo.simulador.mensagem("alerta", resposta.alerta);
+        }
+        return resposta;
+    } catch (e) {
+        topo.simulador.mensagem("erro", `Falha de comunicação com o servidor: ${e}`);
+        return {erro: String(e)};
+    } finally {
+        topo.simulador.carregando(-1);
+    }
+}
+
+// =============================
+// PÁGINA PRINCIPAL
+// =============================
+
+function iniciarPrincipal() {
+    const menu = document.getElementById("menu");
+    const arvore = document.getElementById("menuArvore");
+    const tabs = document.getElementById("tabs");
+    const frames = document.getElementById("frames");
+    const statusBox = document.getElementById("content_statusMessageBox");
+    const question = document.getElementById("question");
+    let processando = 0;
+    let aoResponder = null;
+    let aoExportar = null;
+
+    function abas() {
+        return Array.from(tabs.querySelectorAll(".process-tab"));
+    }
+
+    function abaAtiva() {
+        return tabs.querySelector(".process-tab.ativa");
+    }
+
+    function atualizarBarra() {
+        const aba = abaAtiva();
+        const rotulos = (aba && aba.frame.contentWindow && aba.frame.contentWindow.simuladorTela
+            && aba.frame.contentWindow.simuladorTela.botoes) || ["Confirmar", "Gravar"];
+        document.querySelectorAll("#barraPrincipal .barras__rotulo").forEach((el, i) => {
+            el.textContent = rotulos[i];
+        });
+    }
+
+    function ativarAba(aba) {
+        abas().forEach((outra) => {
+            outra.classList.toggle("ativa", outra === aba);
+            mostrar(outra.frame, outra === aba);
+        });
+        atualizarBarra();
+    }
+
+    function fecharAba(aba) {
+        const eraAtiva = aba.classList.contains("ativa");
+        aba.frame.remove();
+        aba.remove();
+        const restantes = abas();
+        if (eraAtiva && restantes.length) {
+            ativarAba(restantes[restantes.length - 1]);
+        }
+    }
+
+    // Cada clique no item do menu abre uma nova instância da tela
+    function abrirTela(rotulo) {
+        const aba = document.createElement("div");
+        aba.className = "process-tab";
+        aba.innerHTML = '<span class="process-tab-label"></span>'
+            + '<span class="process-tab-close" onclick="Environment.getInstance().closeTab(this.parentNode)"><div>&times;</div></span>';
+        aba.querySelector(".process-tab-label").textContent = rotulo;
+
+        const frame = document.createElement("iframe");
+        frame.className = "tab-frame";
+        frame.src = `/sistema/tela/${encodeURIComponent(rotulo)}`;
+        frame.addEventListener("load", atualizarBarra);
+        aba.frame = frame;
+
+        tabs.appendChild(aba);
+        frames.appendChild(frame);
+        ativarAba(aba);
+    }
+
+    function montarMenu(telas) {
+        for (const [rotulo, tela] of Object.entries(telas)) {
+            let nivel = arvore;
+            tela.caminho.forEach((nome, i) => {
+                let no = Array.from(nivel.children).find((filho) => filho.dataset.nome === nome);
+                if (!no) {
+                    no = document.createElement("div");
+                    no.className = "webguiTreeNode";
+                    no.dataset.nome = nome;
+                    no.innerHTML = '<span class="webguiTreeNodeLabel"></span>'
+                        + '<div class="webguiTreeNodeChildren" style="display: none"></div>';
+                    no.firstChild.textContent = nome;
+                    nivel.appendChild(no);
+                }
+                if (i === tela.caminho.length - 1) {
+                    no.dataset.tela = rotulo;
+                }
+                nivel = no.lastChild;
+            });
+        }
+    }
+
+    function mensagem(tipo, texto) {
+        const id = tipo === "erro" ? "errorMessageBox" : "alertMessageBox";
+        const anterior = document.getElementById(id);
+        if (anterior) {
+            anterior.remove();
+        }
+        const caixa = document.createElement("div");
+        caixa.id = id;
+        caixa.className = `dialog dialog--${tipo}`;
+        caixa.innerHTML = `<div class="dialog-title">${tipo === "erro" ? "Erro" : "Alerta"}</div>`
+            + '<div class="dialog-content"><div></div></div>'
+            + '<div class="dialog-buttons"><span id="confirm" class="wf-button">OK</span></div>';
+        caixa.querySelector(".dialog-content div").textContent = texto;
+        caixa.querySelector("#confirm").addEventListener("click", () => caixa.remove());
+        document.body.appendChild(caixa);
+    }
+
+    // Pergunta com Sim (answers_0) / Não (answers_1)
+    function perguntar(texto, aoConfirmar) {
+        document.getElementById("questionText").textContent = texto;
+        aoResponder = aoConfirmar;
+        mostrar(question);
+    }
+
+    // Modal de confirmação com o botão #confirm (aprovação de solicitações)
+    function confirmar(texto, aoConfirmar) {
+        const modal = document.createElement("div");
+        modal.className = "dialog dialog--confirmacao";
+        modal.innerHTML = '<div class="dialog-content"><div></div></div>'
+            + '<div class="dialog-buttons"><span id="confirm" class="wf-button">Sim</span></div>';
+        modal.querySelector(".dialog-content div").textContent = texto;
+        modal.querySelector("#confirm").addEventListener("click", () => {
+            modal.remove();
+            aoConfirmar();
+        });
+        document.body.appendChild(modal);
+    }
+
+    // Exportar -> formato -> Executar; depois a tela mostra o link do download
+    function exportar(aoExecutar) {
+        aoExportar = aoExecutar;
+        mostrar(document.getElementById("dialogoExportar"));
+    }
+
+    window.Environment = {getInstance: () => ({closeTab: fecharAba})};
+
+    window.simulador = {
+        carregando(delta) {
+            processando = Math.max(0, processando + delta);
+            mostrar(statusBox, processando > 0);
+        },
+        mensagem,
+        perguntar,
+        confirmar,
+        exportar,
+    };
+
+    document.querySelector(".menuBar-button-label").addEventListener("click", () => {
+        mostrar(menu, menu.style.display === "none");
+    });
+    document.querySelector("#bt_1898143037 td:nth-child(2)").addEventListener("click", () => {
+        mostrar(menu, menu.style.display === "none");
+    });
+
+    arvore.addEventListener("click", (e) => {
+        const rotulo = e.target.closest(".webguiTreeNodeLabel");
+        if (!rotulo) {
+            return;
+        }
+        const no = rotulo.parentNode;
+        if (no.dataset.tela) {
+            abrirTela(no.dataset.tela);
+        } else {
+            mostrar(no.lastChild, no.lastChild.style.display === "none");
+        }
+    });
+
+    tabs.addEventListener("click", (e) => {
+        const rotulo = e.target.closest(".process-tab-label");
+        if (rotulo) {
+            ativarAba(rotulo.parentNode);
+        }
+    });
+
+    document.querySelectorAll("#barraPrincipal [data-botao]").forEach((botao) => {
+        botao.addEventListener("click", () => {
+            const aba = abaAtiva();
+            const tela = aba && aba.frame.contentWindow && aba.frame.contentWindow.simuladorTela;
+            if (tela && tela.barra) {
+                tela.barra(Number(botao.dataset.botao));
+            }
+        });
+    });
+
+    document.getElementById("answers_0").addEventListener("click", () => {
+        mostrar(question, false);
+        const acao = aoResponder;
+        aoResponder = null;
+        if (acao) {
+            acao();
+        }
+    });
+    document.getElementById("answers_1").addEventListener("click", () => {
+        mostrar(question, false);
+        aoResponder = null;
+    });
+
+    document.querySelector("#dialogoExportar .wf-button").addEventListener("click", () => {
+        mostrar(document.getElementById("dialogoExportar"), false);
+        mostrar(document.getElementById("formatosExportacao"));
+    });
+    document.querySelectorAll("#formatosExportacao .formato").forEach((formato) => {
+        formato.addEventListener("click", () => {
+            mostrar(document.getElementById("formatosExportacao"), false);
+            mostrar(document.getElementById("barraExecutar"));
+        });
+    });
+    document.getElementById("executarExportacao").addEventListener("click", () => {
+        mostrar(document.getElementById("barraExecutar"), false);
+        const acao = aoExportar;
+        aoExportar = null;
+        if (acao) {
+            acao();
+        }
+    });
+
+    montarMenu(window.TELAS_SIMULADOR || {});
+}
+
+// =============================
+// TELAS (IFRAMES)
+// =============================
+
+// Valores dos campos (name -> value) dentro de `raiz`
+function valores(raiz) {
+    const campos = {};
+    raiz.querySelectorAll("input[name], textarea[name]").forEach((el) => {
+        campos[el.name] = el.value;
+    });
+    return campos;
+}
+
+// Diálogo de pesquisa (grLookup): lista as ocorrências do valor digitado
+function abrirPesquisa(campo) {
+    const dialogo = document.getElementById("grLookup");
+    const linhas = dialogo.querySelector(".pesquisa__linhas");
+    const texto = campo.value.trim();
+    linhas.innerHTML = "";
+    [texto, `${texto} - Ajuste`].forEach((opcao, i) => {
+        const tr = document.createElement("tr");
+        tr.id = String(i + 1);
+        tr.innerHTML = "<td></td>";
+        tr.firstChild.textContent = opcao;
+        linhas.appendChild(tr);
+    });
+    dialogo.campo = campo;
+    dialogo.escolhido = linhas.firstChild;
+    mostrar(dialogo);
+}
+
+// Validação dos campos ao sair (TAB): data "h" vira hoje, pesquisas abrem o
+// grLookup e os demais vão ao servidor, que pode responder com erro
+function ligarCampos(raiz, aoValidar) {
+    raiz.addEventListener("change", async (e) => {
+        const el = e.target;
+        if (!el.name) {
+            return;
+        }
+        if (el.dataset.data !== undefined && el.value.trim().toLowerCase() === "h") {
+            el.value = hoje();
+        }
+        if (el.dataset.pesquisa !== undefined && el.value.trim()) {
+            abrirPesquisa(el);
+            return;
+        }
+        if (el.dataset.validar !== undefined && el.value.trim()) {
+            const resposta = await chamar("validar", {campo: el.name, valor: el.value});
+            if (aoValidar) {
+                aoValidar(el, resposta);
+            }
+        }
+    });
+}
+
+// Cliques em elementos com data-acao viram chamadas a acoes[nome](elemento)
+function ligarAcoes(acoes) {
+    document.addEventListener("click", (e) => {
+        const alvo = e.target.closest("[data-acao]");
+        if (alvo && acoes[alvo.dataset.acao]) {
+            acoes[alvo.dataset.acao](alvo);
+        }
+    });
+
+    const dialogo = document.getElementById("grLookup");
+    if (!dialogo) {
+        return;
+    }
+    dialogo.addEventListener("click", (e) => {
+        const linha = e.target.closest(".pesquisa__linhas tr");
+        if (linha) {
+            dialogo.escolhido = linha;
+            dialogo.querySelectorAll(".pesquisa__linhas tr").forEach((tr) => tr.classList.toggle("selecionada", tr === linha));
+        }
+    });
+    document.querySelector("#buttonsBar_grLookup td:nth-child(1)").addEventListener("click", () => {
+        if (dialogo.campo && dialogo.escolhido) {
+            dialogo.campo.value = dialogo.escolhido.textContent;
+        }
+        mostrar(dialogo, false);
+    });
+    document.querySelector("#buttonsBar_grLookup td:nth-child(2)").addEventListener("click", () => {
+        mostrar(dialogo, false);
+    });
+}
+
+// Grade com visualização de lista / formulário (grdRequisicoes, solicitacoes).
+// O corpo da grade é trocado inteiro a cada renderização, como no Innovaro.
+function criarGrade(config) {
+    const corpo = document.querySelector(`#${config.id} .grade__corpo > tbody`);
+    const modelo = document.getElementById(`${config.id}_formulario`);
+    const estado = {modo: "lista", registros: [], atual: null, selecionado: null};
+
+    function renderizar() {
+        corpo.innerHTML = "";
+        if (estado.modo === "formulario") {
+            corpo.appendChild(modelo.content.cloneNode(true));
+            const chave = corpo.querySelector('input[name="CHAVE"]');
+            if (chave && estado.atual) {
+                chave.value = estado.atual.chave;
+            }
+            Object.entries((estado.atual && estado.atual.campos) || {}).forEach(([nome, valor]) => {
+                const el = corpo.querySelector(`[name="${nome}"]`);
+                if (el && nome !== "CHAVE") {
+                    el.value = valor;
+                }
+            });
+            return;
+        }
+
+        // Lista: cabeçalho, filtro e separador; registros a partir da 4a linha
+        const linhas = ['<tr class="lista__cabecalho"><td></td><td>Chave</td><td>Data</td><td>Recurso</td><td>Quantidade</td><td>Situação</td><td></td></tr>',
+            '<tr class="lista__filtro"><td colspan="7"></td></tr>',
+            '<tr class="lista__separador"><td colspan="7"></td></tr>'];
+        const total = Math.max(estado.registros.length, 12);
+        for (let i = 0; i < total; i++) {
+            const reg = estado.registros[i];
+            if (!reg) {
+                linhas.push('<tr class="lista__vazia"><td></td><td></td><td></td><td></td><td></td><td></td><td data-acao="situacao"><div>&nbsp;</div></td></tr>');
+                continue;
+            }
+            const marcado = reg.chave === estado.selecionado ? "checked" : "";
+            linhas.push(`<tr><td data-acao="selecionar" data-chave="${reg.chave}"><input type="checkbox" ${marcado} /></td>`
+                + `<td>${reg.chave}</td><td>${hoje()}</td><td>${reg.campos.RECURSO || ""}</td>`
+                + `<td>${reg.campos.QUANTIDADE || ""}</td><td>${reg.situacao}</td>`
+                + '<td data-acao="situacao"><div>&nbsp;</div></td></tr>');
+        }
+        corpo.innerHTML = linhas.join("");
+    }
+
+    function chaveAtual() {
+        return estado.selecionado || (estado.atual && estado.atual.chave);
+    }
+
+    const acoes = {
+        visualizacao() {
+            estado.modo = estado.modo === "lista" ? "formulario" : "lista";
+            renderizar();
+        },
+        async inserir() {
+            const resposta = await chamar("inserir", {tela: config.tela});
+            if (resposta.chave) {
+                estado.atual = {chave: resposta.chave, campos: {}, situacao: "Digitada"};
+                estado.selecionado = null;
+                estado.modo = "formulario";
+                renderizar();
+            }
+        },
+        excluir() {},
+        async confirmar() {
+            if (!estado.atual || estado.modo !== "formulario") {
+                return;
+            }
+            const campos = valores(corpo);
+            const resposta = await chamar("confirmar", {tela: config.tela, chave: estado.atual.chave, campos});
+            if (resposta.ok) {
+                estado.atual.campos = campos;
+                if (!estado.registros.includes(estado.atual)) {
+                    estado.registros.unshift(estado.atual);
+                }
+            }
+        },
+        selecionar(el) {
+            const chave = el.dataset.chave;
+            estado.selecionado = estado.selecionado === chave ? null : chave;
+            renderizar();
+        },
+        situacao() {},
+        async aprovar() {
+            const chave = chaveAtual();
+            if (!chave) {
+                topo.simulador.mensagem("erro", "Nenhum registro selecionado.");
+                return;
+            }
+            const aprovar = async () => {
+                const resposta = await chamar("aprovar", {tela: config.tela, chave});
+                const reg = estado.registros.find((r) => r.chave === chave);
+                if (resposta.ok && reg) {
+                    reg.situacao = "Aprovada";
+                }
+            };
+            if (config.confirmarAprovacao) {
+                topo.simulador.confirmar("Confirma a aprovação?", aprovar);
+            } else {
+                await aprovar();
+            }
+        },
+        reprovar() {},
+        baixar() {
+            if (!chaveAtual()) {
+                topo.simulador.mensagem("erro", "Nenhum registro selecionado.");
+                return;
+            }
+            mostrar(document.getElementById(config.painelBaixa));
+        },
+    };
+
+    window.simuladorTela = {
+        botoes: ["Confirmar", "Gravar"],
+        // 1: confirmar baixa, 2: gravar (botões da página principal)
+        async barra(botao) {
+            const chave = chaveAtual();
+            const painel = document.getElementById(config.painelBaixa);
+            if (botao === 1) {
+                if (painel.style.display === "none") {
+                    return;
+                }
+                const resposta = await chamar("baixar", {tela: config.tela, chave, campos: valores(painel)});
+                if (resposta.ok) {
+                    mostrar(painel, false);
+                }
+                return;
+            }
+            const gravar = () => chamar("gravar", {
+                tela: config.tela,
+                chave,
+                campos: (estado.atual && estado.atual.campos) || {},
+            });
+            if (config.perguntarAoGravar) {
+                topo.simulador.perguntar("Deseja gravar as alterações?", gravar);
+            } else {
+                await gravar();
+            }
+        },
+    };
+
+    ligarAcoes(acoes);
+    ligarCampos(document.body);
+    renderizar();
+}
+
+if (window === topo) {
+    iniciarPrincipal();
+}